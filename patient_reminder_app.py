@@ -1,43 +1,88 @@
+import time
+STARTUP_STARTED = time.perf_counter()  # Indítási időmérés kezdete (az importok előtt)
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
 import sqlite3
 import json
+import csv
 import smtplib
 import schedule
 import threading
-import time
-import pandas as pd
-from datetime import datetime, timedelta
+import queue
+import importlib.util
+from datetime import datetime, timedelta, timezone
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
+import sys
+import signal
+import argparse
+import socket
+import uuid
 import hashlib
+import hmac
 import base64
+import unicodedata
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import bisect
+import heapq
 from cryptography.fernet import Fernet
 import webbrowser
 
-# Google Calendar API imports
-try:
-    from google.auth.transport.requests import Request
-    from google.oauth2.credentials import Credentials
-    from google_auth_oauthlib.flow import InstalledAppFlow
-    from googleapiclient.discovery import build
-    GOOGLE_API_AVAILABLE = True
-except ImportError:
-    GOOGLE_API_AVAILABLE = False
+# Google Calendar API - csak elérhetőség ellenőrzés, az import az első authentikációkor történik
+# (a googleapiclient betöltése lassú, és nem kell az ablak megjelenéséhez)
+GOOGLE_API_AVAILABLE = all(
+    importlib.util.find_spec(package) is not None
+    for package in ('googleapiclient', 'google_auth_oauthlib', 'google')
+)
+if not GOOGLE_API_AVAILABLE:
     print("Google API kliens nincs telepítve. pip install google-api-python-client google-auth-oauthlib telepítés szükséges")
 
 class DatabaseManager:
     """Adatbázis kezelő osztály"""    
+    # Alapértelmezett emlékeztető időpont: 1 nappal előtte, 12:00-kor
+    DEFAULT_REMINDER_OFFSETS = [{'key': '1d', 'days_before': 1, 'send_time': '12:00'}]
+    # Az esedékesség számításának verziója: változásakor az emlékeztető sor induláskor újraépül
+    REMINDER_QUEUE_VERSION = 2
+    
+    # Ismétlődő sorozatok már kibontott ablakai (folyamaton belüli memo, ablakok száma)
+    SERIES_WINDOW_CACHE_SIZE = 64
+    
     def __init__(self, db_name="patient_reminder.db"):
         self.db_name = db_name
+        self.reminder_offsets = list(self.DEFAULT_REMINDER_OFFSETS)
+        self.series_windows = OrderedDict()  # (ablak kezdete, vége) -> {sorozat id: kibontott verzió}
+        self.series_lock = threading.Lock()
+        self.pii = None             # PiiCipher, ha a páciens adatok titkosítva vannak
+        self.pii_snapshot = None    # (patients_version, visszafejtett páciensek, {szűrés: rendezés})
+        self.pii_lock = threading.Lock()
         self.init_database()
     
+    def _connect(self, timeout=5.0):
+        """Adatbázis kapcsolat a páciens adatok SQL függvényeivel
+        
+        email_key(email): email kulcs (titkosításnál vak index); pii_seal /
+        pii_open: mező titkosítása / visszafejtése. Titkosítás nélkül az
+        utóbbi kettő az értéket változatlanul adja vissza, így a lekérdezések
+        mindkét módban ugyanazok.
+        """
+        conn = sqlite3.connect(self.db_name, timeout=timeout)
+        conn.create_function('email_key', 1, self.email_key, deterministic=True)
+        conn.create_function('pii_seal', 1, self.seal_pii)
+        conn.create_function('pii_open', 1, self.open_pii, deterministic=True)
+        return conn
+    
     def init_database(self):
         """Adatbázis inicializálása"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
+        # WAL napló: a párhuzamos küldő workerek írásai nem blokkolják az olvasókat (GUI)
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Páciensek tábla
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS patients (
@@ -47,7 +92,9 @@ class DatabaseManager:
                 phone TEXT,
                 language TEXT DEFAULT 'hu',
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                active INTEGER DEFAULT 1
+                active INTEGER DEFAULT 1,
+                last_contacted_at TIMESTAMP,
+                email_key TEXT
             )
         ''')
         
@@ -87,9 +134,139 @@ class DatabaseManager:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 reminder_sent INTEGER DEFAULT 0,
                 is_new_appointment INTEGER DEFAULT 0,
-                new_appointment_notified INTEGER DEFAULT 0
+                new_appointment_notified INTEGER DEFAULT 0,
+                change_seq INTEGER DEFAULT 0,
+                series_id INTEGER,
+                notify_claimed_by TEXT,
+                notify_claimed_until TIMESTAMP
+            )
+        ''')
+        
+        # Régi formátumú (eseményenként egy esedékességű) emlékeztető sor eldobása - származtatott adat, újraépül
+        cursor.execute("PRAGMA table_info(reminder_queue)")
+        if 'due_at' in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('DROP TABLE reminder_queue')
+            print("Adatbázis migráció: reminder_queue újraépítése eseményenkénti emlékeztetőkhöz")
+        
+        # Emlékeztető sor tábla - szinkronizáláskor előre kiszámolt sablon paraméterek eseményenként
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'reminder_queue'")
+        reminder_queue_exists = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reminder_queue (
+                event_id INTEGER PRIMARY KEY,
+                patient_email TEXT NOT NULL,
+                patient_name TEXT NOT NULL,
+                language TEXT DEFAULT 'hu',
+                appointment_date TEXT NOT NULL,
+                appointment_time TEXT NOT NULL
+            )
+        ''')
+        
+        # Esemény emlékeztetők tábla - emlékeztető időpontonként (offset) külön állapot
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS event_reminders (
+                event_id INTEGER NOT NULL,
+                offset_key TEXT NOT NULL,
+                days_before INTEGER NOT NULL,
+                due_at TIMESTAMP NOT NULL,
+                due_until TIMESTAMP NOT NULL,
+                sent_at TIMESTAMP,
+                claimed_by TEXT,
+                claimed_until TIMESTAMP,
+                PRIMARY KEY (event_id, offset_key)
+            )
+        ''')
+        # Részleges index: csak a még el nem küldött emlékeztetők, esedékesség szerint
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_event_reminders_pending 
+            ON event_reminders(due_at) WHERE sent_at IS NULL
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_patients_email ON patients(email)')
+        # Lapozó (keyset) lekérdezések indexei a rendezhető oszlopokra
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_patients_active_name ON patients(active, name)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_patients_active_email ON patients(active, email)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_patients_active_created ON patients(active, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_calendar_events_patient_email ON calendar_events(patient_email)')
+        # Naptár lapozás: kezdési idő szerinti tartomány lekérdezések
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_calendar_events_start_time ON calendar_events(start_time)')
+        # Napló szűrés (szint / páciens) id szerinti lapozással
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_level_id ON logs(level, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_patient_email_id ON logs(patient_email, id)')
+        
+        # Alkalmazás metaadatok (pl. az emlékeztető sor felépítéséhez használt offsetek)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS app_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        
+        # Feladat zárolások (lease) tábla - több példány közötti koordinációhoz
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_locks (
+                job_name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at TIMESTAMP NOT NULL,
+                acquired_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Kampányok (körlevelek) és címzett pillanatképük címzettenkénti állapottal
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS campaigns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'draft',
+                total INTEGER DEFAULT 0,
+                sent_count INTEGER DEFAULT 0,
+                failed_count INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                selector TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS campaign_recipients (
+                campaign_id INTEGER NOT NULL,
+                patient_id INTEGER NOT NULL,
+                email TEXT NOT NULL,
+                name TEXT NOT NULL,
+                language TEXT DEFAULT 'hu',
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                error TEXT,
+                sent_at TIMESTAMP,
+                claimed_by TEXT,
+                claimed_until TIMESTAMP,
+                PRIMARY KEY (campaign_id, patient_id)
             )
         ''')
+        # Részleges index: csak a még küldendő címzettek
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_campaign_recipients_pending 
+            ON campaign_recipients(campaign_id, patient_id) WHERE status = 'pending'
+        ''')
+        
+        # Címzett szűrők (kampány célzás) oszlopai és indexei
+        self._setup_recipient_targeting(cursor)
+        
+        # Naptár változásszámláló (diff alapú nézet frissítéshez)
+        self._setup_calendar_change_tracking(cursor)
+        
+        # Ismétlődő sorozatok (szabály + kivételek, lusta kibontás)
+        self._setup_calendar_series(cursor)
+        
+        # Páciens adat titkosítás állapota (az FTS index előtt kell)
+        self._setup_pii(cursor)
+        
+        # Teljes szöveges keresés (FTS5) táblák és szinkron triggerek
+        self.fts_available = self._setup_full_text_search(cursor)
+        
+        # Egyedi normalizált email kulcs (duplikátumok összevonásával)
+        self._setup_email_key(cursor)
         
         conn.commit()
         conn.close()
@@ -99,11 +276,585 @@ class DatabaseManager:
         
         # Alapértelmezett sablonok beszúrása
         self.insert_default_templates()
+        
+        # Emlékeztető sor első feltöltése (meglévő adatbázis esetén)
+        if not reminder_queue_exists:
+            self.rebuild_reminder_queue()
+    
+    def _setup_recipient_targeting(self, cursor):
+        """Kampány címzett szűrők oszlopai és indexei (régi adatbázis migrációval)
+        
+        A patients.last_contacted_at az utolsó sikeres email küldés ideje;
+        migrációkor az eddig elküldött emlékeztetőkből és értesítésekből töltődik
+        fel. Régi adatbázisban az event_reminders még üres, ott a
+        calendar_events jelzőiből becsüljük: emlékeztető az előző nap 12:00-kor,
+        új időpont értesítés az esemény felvételekor.
+        """
+        cursor.execute("PRAGMA table_info(patients)")
+        if 'last_contacted_at' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE patients ADD COLUMN last_contacted_at TIMESTAMP')
+            cursor.execute('''
+                UPDATE patients SET last_contacted_at = (
+                    SELECT MAX(contacted_at) FROM (
+                        SELECT r.sent_at AS contacted_at FROM event_reminders r 
+                        JOIN calendar_events e ON e.id = r.event_id 
+                        WHERE e.patient_email = patients.email 
+                        UNION ALL 
+                        SELECT min(date(e.start_time, '-1 day') || ' 12:00:00', ?) FROM calendar_events e 
+                        WHERE e.patient_email = patients.email AND e.reminder_sent = 1 
+                        UNION ALL 
+                        SELECT e.created_at FROM calendar_events e 
+                        WHERE e.patient_email = patients.email AND e.new_appointment_notified = 1
+                    )
+                )
+            ''', (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),))
+            print("Adatbázis migráció: last_contacted_at oszlop hozzáadva")
+        
+        cursor.execute("PRAGMA table_info(campaigns)")
+        if 'selector' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE campaigns ADD COLUMN selector TEXT')
+            print("Adatbázis migráció: campaigns.selector oszlop hozzáadva")
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_patients_active_language ON patients(active, language)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_patients_active_contacted ON patients(active, last_contacted_at)')
+    
+    def email_key(self, email):
+        """Normalizált email kulcs (egyediség és keresés email alapján); titkosításnál kulcsolt vak index"""
+        if self.pii is not None:
+            return self.pii.blind_index(email)
+        return (email or '').strip().lower()
+    
+    def seal_pii(self, value):
+        """Páciens mező titkosítása tároláshoz (titkosítás nélkül változatlan)"""
+        return value if self.pii is None else self.pii.seal(value)
+    
+    def open_pii(self, value):
+        """Tárolt páciens mező visszafejtése (titkosítatlan érték változatlan)"""
+        return value if self.pii is None else self.pii.open_cached(value)
+    
+    # Titkosított oszlopok a patients sorban: név, email, telefon
+    PATIENT_PII_COLUMNS = (1, 2, 3)
+    
+    def _setup_pii(self, cursor):
+        """Páciens adat titkosítás állapota és a páciens változásszámláló
+        
+        A titkosítás állapotát az adatbázis tárolja (app_meta 'pii_encryption'),
+        így minden belépési pont (GUI, szolgáltatás, parancssori import) a
+        kulcsfájllal olvasni és írni tudja. A patients_version számláló jelzi,
+        mikor kell a titkosított módban memóriában tartott listát frissíteni.
+        """
+        cursor.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('patients_version', '0')")
+        bump = "UPDATE app_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'patients_version';"
+        for name, event in (('insert', 'INSERT'), ('delete', 'DELETE'),
+                            ('update', 'UPDATE OF name, email, phone, language, active')):
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS patients_version_{name} AFTER {event} ON patients BEGIN {bump} END')
+        
+        cursor.execute("SELECT value FROM app_meta WHERE key = 'pii_encryption'")
+        row = cursor.fetchone()
+        if row and row[0] == '1':
+            self.pii = PiiCipher(SecurityManager.shared())
+    
+    def set_pii_encryption(self, enabled):
+        """Páciens adatok titkosításának be- / kikapcsolása
+        
+        Változáskor a páciensek neve, email címe, telefonszáma és email kulcsa
+        (normalizált cím / vak index), valamint a belőlük másolt mezők
+        (emlékeztető sor, kampány címzettek, napló) egy tranzakcióban íródnak át.
+        Bekapcsoláskor a napló bejegyzésekből a páciensek neve és email címe
+        kikerül; ez kikapcsoláskor nem áll vissza.
+        Titkosított módban a páciens FTS index nem létezik (nyílt szöveget
+        tárolna), a keresés a visszafejtett listán fut.
+        Visszatérési érték: True, ha az állapot változott.
+        """
+        enabled = bool(enabled)
+        if enabled == (self.pii is not None):
+            return False
+        
+        previous = self.pii
+        cipher = previous or PiiCipher(SecurityManager.shared())
+        
+        def convert(rows, columns):
+            if enabled:
+                return [tuple(cipher.seal(value) if index in columns else value for index, value in enumerate(row))
+                        for row in rows]
+            return cipher.open_rows(rows, columns)
+        
+        def plain_email_key(email):
+            return cipher.blind_index(email) if enabled else (email or '').strip().lower()
+        
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            if enabled:
+                # Az FTS index törlése az átírás előtt (különben a triggerek feleslegesen újraindexelnének)
+                self.pii = cipher
+                self.fts_available = self._setup_full_text_search(cursor)
+            
+            cursor.execute('SELECT id, name, email, phone FROM patients')
+            patients = cursor.fetchall()
+            plain = patients if enabled else cipher.open_rows(patients, (1, 2, 3))
+            cursor.executemany('UPDATE patients SET name = ?, email = ?, phone = ?, email_key = ? WHERE id = ?',
+                               [(name, email, phone, plain_email_key(plain_row[2]), patient_id)
+                                for (patient_id, name, email, phone), plain_row in zip(convert(patients, (1, 2, 3)), plain)])
+            
+            cursor.execute('SELECT rowid, email, name FROM campaign_recipients')
+            cursor.executemany('UPDATE campaign_recipients SET email = ?, name = ? WHERE rowid = ?',
+                               [(email, name, rowid) for rowid, email, name in convert(cursor.fetchall(), (1, 2))])
+            cursor.execute('SELECT event_id, patient_name FROM reminder_queue')
+            cursor.executemany('UPDATE reminder_queue SET patient_name = ? WHERE event_id = ?',
+                               [(name, event_id) for event_id, name in convert(cursor.fetchall(), (1,))])
+            
+            # Napló: páciens email <-> vak index; bekapcsoláskor a név és a cím kikerül az üzenetből
+            log_patients = [(row[1] or '', row[2], cipher.blind_index(row[2])) for row in plain if row[2]]
+            if enabled:
+                cursor.executemany('''
+                    UPDATE logs SET message = replace(replace(message, ?, '[email]'), ?, '[név]'), patient_email = ? 
+                    WHERE patient_email = ?
+                ''', [(email, name, key, email) for name, email, key in log_patients])
+                if self.fts_available:
+                    cursor.execute("INSERT INTO logs_fts(logs_fts) VALUES ('optimize')")
+            else:
+                cursor.executemany('UPDATE logs SET patient_email = ? WHERE patient_email = ?',
+                                   [(email, key) for name, email, key in log_patients])
+            
+            if not enabled:
+                self.pii = None
+                self.fts_available = self._setup_full_text_search(cursor)
+            cursor.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES ('pii_encryption', ?)",
+                           ('1' if enabled else '0',))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            self.pii = previous
+            raise
+        finally:
+            conn.close()
+        
+        with self.pii_lock:
+            self.pii_snapshot = None
+        self.add_log("INFO", f"Páciens adatok titkosítása {'bekapcsolva' if enabled else 'kikapcsolva'} "
+                             f"({len(patients)} páciens átírva)")
+        return True
+    
+    def _pii_patients(self):
+        """Titkosított módban a visszafejtett páciensek (patients_version szerint gyorsítótárazva)
+        
+        Visszatérés: (verzió, sorok, {(rendezési oszlop, csak aktív, keresés): (kulcsok, sorok)}).
+        A verziót a sorok előtt olvassuk, így egy közbeni módosítás a következő hívásnál újratöltést okoz.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM app_meta WHERE key = 'patients_version'")
+        version = cursor.fetchone()[0]
+        snapshot = self.pii_snapshot
+        if snapshot is not None and snapshot[0] == version:
+            conn.close()
+            return snapshot
+        
+        cursor.execute('SELECT * FROM patients')
+        rows = cursor.fetchall()
+        conn.close()
+        
+        snapshot = (version, self.pii.open_rows(rows, self.PATIENT_PII_COLUMNS), {})
+        with self.pii_lock:
+            self.pii_snapshot = snapshot
+        return snapshot
+    
+    @staticmethod
+    def _pii_sort_key(value, patient_id):
+        """Rendezési kulcs a SQLite sorrendjében (NULL elöl), azonos értéknél id szerint"""
+        return (value is not None, value if value is not None else 0, patient_id)
+    
+    def _pii_ordered(self, sort_column='name', active_only=True, search=None):
+        """Szűrt, (sort_column, id) szerint növekvő visszafejtett páciensek: (rendezési kulcsok, sorok)
+        
+        A _patient_filter / keyset lapozás megfelelője titkosított módban
+        (a titkosított oszlopokon az SQL LIKE és ORDER BY nem használható).
+        """
+        _, patients, orderings = self._pii_patients()
+        ordering_key = (sort_column, active_only, search or '')
+        ordering = orderings.get(ordering_key)
+        if ordering is None:
+            column = self.PATIENT_SORT_COLUMNS[sort_column]
+            rows = [row for row in patients if row[6] == 1] if active_only else list(patients)
+            if search:
+                term = search.casefold()
+                rows = [row for row in rows if term in (row[1] or '').casefold() or term in (row[2] or '').casefold()]
+            keys = [self._pii_sort_key(row[column], row[0]) for row in rows]
+            order = sorted(range(len(rows)), key=keys.__getitem__)
+            ordering = ([keys[index] for index in order], [rows[index] for index in order])
+            if len(orderings) >= 16:
+                orderings.clear()
+            orderings[ordering_key] = ordering
+        return ordering
+    
+    def _setup_email_key(self, cursor):
+        """patients.email_key oszlop és egyedi index; régi adatbázisban a duplikátumok összevonása
+        
+        Azonos kulcsú páciensek közül az aktív, legkisebb azonosítójú marad
+        meg; üres telefonszáma a duplikátumokból töltődik ki. A duplikátumokra
+        hivatkozó naptár események és kampány címzettek a megmaradó
+        pácienshez kerülnek.
+        """
+        cursor.execute("PRAGMA table_info(patients)")
+        if 'email_key' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE patients ADD COLUMN email_key TEXT')
+        
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_patients_email_key'")
+        if cursor.fetchone():
+            return
+        
+        cursor.execute('UPDATE patients SET email_key = email_key(email) WHERE email_key IS NULL')
+        
+        cursor.execute('''
+            CREATE TEMP TABLE patient_merge AS 
+            SELECT p.id, p.email_key, (
+                SELECT k.id FROM patients k WHERE k.email_key = p.email_key ORDER BY k.active DESC, k.id LIMIT 1
+            ) AS keeper_id 
+            FROM patients p 
+            WHERE p.email_key IN (SELECT email_key FROM patients GROUP BY email_key HAVING COUNT(*) > 1)
+        ''')
+        cursor.execute('SELECT COUNT(*) FROM temp.patient_merge WHERE id != keeper_id')
+        merged = cursor.fetchone()[0]
+        
+        if merged:
+            cursor.execute('''
+                UPDATE patients SET phone = (
+                    SELECT d.phone FROM patients d JOIN temp.patient_merge m ON m.id = d.id 
+                    WHERE m.keeper_id = patients.id AND COALESCE(d.phone, '') != '' 
+                    ORDER BY d.id DESC LIMIT 1
+                ) 
+                WHERE COALESCE(phone, '') = '' 
+                AND id IN (SELECT keeper_id FROM temp.patient_merge)
+            ''')
+            # Eltérő írásmódú email címre hivatkozó események a megmaradó páciens címére
+            cursor.execute('''
+                UPDATE calendar_events SET patient_email = (
+                    SELECT k.email FROM temp.patient_merge m JOIN patients k ON k.id = m.keeper_id 
+                    WHERE m.id = (SELECT d.id FROM patients d WHERE d.email = calendar_events.patient_email LIMIT 1)
+                ) 
+                WHERE patient_email IN (
+                    SELECT d.email FROM patients d JOIN temp.patient_merge m ON m.id = d.id WHERE m.id != m.keeper_id
+                )
+            ''')
+            cursor.execute('''
+                UPDATE OR IGNORE campaign_recipients SET patient_id = (
+                    SELECT keeper_id FROM temp.patient_merge WHERE id = campaign_recipients.patient_id
+                ) 
+                WHERE patient_id IN (SELECT id FROM temp.patient_merge WHERE id != keeper_id)
+            ''')
+            cursor.execute('''
+                DELETE FROM campaign_recipients 
+                WHERE patient_id IN (SELECT id FROM temp.patient_merge WHERE id != keeper_id)
+            ''')
+            cursor.execute('DELETE FROM patients WHERE id IN (SELECT id FROM temp.patient_merge WHERE id != keeper_id)')
+            self._refresh_reminder_queue(
+                cursor, 'e.patient_email IN (SELECT k.email FROM patients k WHERE k.id IN (SELECT keeper_id FROM temp.patient_merge))', ()
+            )
+            print(f"Adatbázis migráció: {merged} duplikált páciens összevonva")
+        
+        cursor.execute('DROP TABLE temp.patient_merge')
+        cursor.execute('CREATE UNIQUE INDEX idx_patients_email_key ON patients(email_key)')
+    
+    # Megtartott törlési bejegyzések száma; ennél régebbi állapotú nézet teljes újratöltést kap
+    CALENDAR_CHANGE_RETENTION = 10000
+    # Megjelenített / változáskövetett naptár oszlopok
+    CALENDAR_TRACKED_COLUMNS = ('patient_email', 'event_title', 'event_description', 'start_time', 'end_time',
+                                'reminder_sent', 'is_new_appointment', 'new_appointment_notified')
+    
+    def _setup_calendar_change_tracking(self, cursor):
+        """Naptár események változásszámlálója triggerekkel
+        
+        Minden beszúrás / tényleges módosítás / törlés növeli az app_meta
+        'calendar_change_seq' számlálót. A módosult sor change_seq értéke a
+        számláló új értéke lesz, törléskor egy bejegyzés kerül a
+        calendar_event_deletions táblába. Így egy nézet a legutóbb látott
+        számláló óta történt változásokat kérdezheti le.
+        """
+        cursor.execute("PRAGMA table_info(calendar_events)")
+        if 'change_seq' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE calendar_events ADD COLUMN change_seq INTEGER DEFAULT 0')
+            print("Adatbázis migráció: change_seq oszlop hozzáadva")
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_calendar_events_change_seq ON calendar_events(change_seq)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS calendar_event_deletions (
+                change_seq INTEGER PRIMARY KEY,
+                event_id INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('calendar_change_seq', '0')")
+        
+        next_seq = "UPDATE app_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'calendar_change_seq';"
+        current_seq = "(SELECT CAST(value AS INTEGER) FROM app_meta WHERE key = 'calendar_change_seq')"
+        changed = ' OR '.join(f'old.{column} IS NOT new.{column}' for column in self.CALENDAR_TRACKED_COLUMNS)
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS calendar_events_change_insert AFTER INSERT ON calendar_events BEGIN
+                {next_seq}
+                UPDATE calendar_events SET change_seq = {current_seq} WHERE id = new.id;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS calendar_events_change_update 
+            AFTER UPDATE OF {', '.join(self.CALENDAR_TRACKED_COLUMNS)} ON calendar_events 
+            WHEN {changed} BEGIN
+                {next_seq}
+                UPDATE calendar_events SET change_seq = {current_seq} WHERE id = new.id;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS calendar_events_change_delete AFTER DELETE ON calendar_events BEGIN
+                {next_seq}
+                INSERT INTO calendar_event_deletions (change_seq, event_id) VALUES ({current_seq}, old.id);
+                DELETE FROM calendar_event_deletions WHERE change_seq < {current_seq} - {self.CALENDAR_CHANGE_RETENTION};
+            END
+        ''')
+    
+    def _setup_calendar_series(self, cursor):
+        """Ismétlődő sorozatok táblája és az előfordulások sorozat hivatkozása (régi adatbázis migrációval)
+        
+        Egy sorozat egyszer tárolódik (DTSTART, RRULE, kivételek); az
+        előfordulások calendar_events sorai csak a ténylegesen lekérdezett
+        ablakokra jönnek létre (materialize_series). A materialized_from /
+        materialized_until a már kibontott összefüggő tartomány.
+        """
+        cursor.execute("PRAGMA table_info(calendar_events)")
+        if 'series_id' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE calendar_events ADD COLUMN series_id INTEGER')
+            print("Adatbázis migráció: series_id oszlop hozzáadva")
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_calendar_events_series 
+            ON calendar_events(series_id, start_time) WHERE series_id IS NOT NULL
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS calendar_series (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                series_key TEXT UNIQUE NOT NULL,
+                patient_email TEXT,
+                event_title TEXT,
+                event_description TEXT,
+                dtstart TEXT NOT NULL,
+                tzid TEXT,
+                duration_seconds INTEGER DEFAULT 0,
+                rrule TEXT NOT NULL,
+                rdates TEXT DEFAULT '[]',
+                exceptions TEXT DEFAULT '[]',
+                first_start TIMESTAMP NOT NULL,
+                last_start TIMESTAMP,
+                version INTEGER DEFAULT 1,
+                materialized_from TIMESTAMP,
+                materialized_until TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    
+    def get_calendar_change_seq(self):
+        """Naptár változásszámláló aktuális értéke"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT CAST(value AS INTEGER) FROM app_meta WHERE key = 'calendar_change_seq'")
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else 0
+    
+    def get_calendar_event_changes(self, since_seq):
+        """since_seq óta módosult / létrejött események és törölt azonosítók
+        
+        Visszatérési érték: (aktuális számláló, módosult sorok, törölt id-k),
+        vagy None, ha since_seq túl régi (a nézetet teljesen újra kell tölteni).
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT CAST(value AS INTEGER) FROM app_meta WHERE key = 'calendar_change_seq'")
+        current_seq = cursor.fetchone()[0]
+        if current_seq - since_seq > self.CALENDAR_CHANGE_RETENTION:
+            conn.close()
+            return None
+        
+        cursor.execute('SELECT * FROM calendar_events WHERE change_seq > ? ORDER BY change_seq', (since_seq,))
+        changed = cursor.fetchall()
+        cursor.execute('SELECT event_id FROM calendar_event_deletions WHERE change_seq > ?', (since_seq,))
+        deleted = [row[0] for row in cursor.fetchall()]
+        
+        conn.close()
+        return current_seq, changed, deleted
+    
+    def get_calendar_intervals(self):
+        """Összes esemény időintervalluma az ütközés-indexhez
+        
+        Visszatérés: (változásszámláló, [(id, patient_email, event_title, start_time, end_time)]).
+        A számlálót ugyanabban a kapcsolatban, a sorok előtt olvassuk.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT CAST(value AS INTEGER) FROM app_meta WHERE key = 'calendar_change_seq'")
+        row = cursor.fetchone()
+        cursor.execute('SELECT id, patient_email, event_title, start_time, end_time FROM calendar_events')
+        intervals = cursor.fetchall()
+        conn.close()
+        return (row[0] if row else 0), intervals
+    
+    # FTS5 tükörtáblák: tábla -> (FTS tábla, indexelt oszlopok)
+    FULL_TEXT_TABLES = {
+        'patients': ('patients_fts', ('name', 'email', 'phone')),
+        'calendar_events': ('calendar_events_fts', ('event_title', 'event_description')),
+        'logs': ('logs_fts', ('message',)),
+    }
+    
+    def _setup_full_text_search(self, cursor):
+        """FTS5 virtuális táblák létrehozása (external content) és triggerek a szinkronhoz
+        
+        Az FTS táblák csak az indexet tárolják, a szöveget az eredeti táblából
+        olvassák. Ha a SQLite FTS5 nélkül lett fordítva, a keresések LIKE
+        lekérdezésre esnek vissza.
+        """
+        try:
+            for table, (fts_table, columns) in self.FULL_TEXT_TABLES.items():
+                if table == 'patients' and self.pii is not None:
+                    # Titkosított páciens adatok: az FTS index nyílt szöveget tárolna
+                    for suffix in ('insert', 'delete', 'update'):
+                        cursor.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{suffix}')
+                    cursor.execute(f'DROP TABLE IF EXISTS {fts_table}')
+                    continue
+                
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,))
+                fts_exists = cursor.fetchone() is not None
+                
+                column_list = ', '.join(columns)
+                new_values = ', '.join(f'new.{column}' for column in columns)
+                old_values = ', '.join(f'old.{column}' for column in columns)
+                
+                # Ékezetfüggetlen tokenizálás, 2-3 karakteres prefix index a gépelés közbeni kereséshez
+                cursor.execute(f'''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                        {column_list},
+                        content='{table}', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                    )
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN
+                        INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});
+                    END
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN
+                        INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                    END
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE OF {column_list} ON {table} BEGIN
+                        INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                        INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});
+                    END
+                ''')
+                
+                # Meglévő adatok indexelése az FTS tábla első létrehozásakor
+                if not fts_exists:
+                    cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+            
+            return True
+        
+        except sqlite3.OperationalError as e:
+            print(f"FTS5 nem elérhető, a keresés LIKE alapú lesz: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _fts_query(text):
+        """Felhasználói keresőszöveg FTS5 prefix lekérdezéssé alakítása
+        
+        Minden szó idézőjelbe kerül (így az FTS operátorok és írásjelek nem
+        okoznak szintaktikai hibát) és prefixként illeszkedik: 'kov év' ->
+        '"kov"* "év"*'.
+        """
+        terms = [term.replace('"', '') for term in text.split()]
+        return ' '.join(f'"{term}"*' for term in terms if term)
+    
+    def _full_text_search(self, table, select_sql, query, limit, extra_where='', extra_params=()):
+        """Rangsorolt (bm25) prefix keresés egy tábla FTS tükrében, LIKE visszaeséssel"""
+        fts_table, columns = self.FULL_TEXT_TABLES[table]
+        fts_query = self._fts_query(query or '')
+        if not fts_query:
+            return []
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        if self.fts_available:
+            cursor.execute(f'''
+                SELECT {select_sql} FROM {fts_table} 
+                JOIN {table} t ON t.id = {fts_table}.rowid 
+                WHERE {fts_table} MATCH ? {extra_where} 
+                ORDER BY bm25({fts_table}) 
+                LIMIT ?
+            ''', (fts_query, *extra_params, limit))
+        else:
+            conditions = []
+            params = []
+            for term in query.split():
+                conditions.append('(' + ' OR '.join(f't.{column} LIKE ?' for column in columns) + ')')
+                params.extend([f'%{term}%'] * len(columns))
+            cursor.execute(f'''
+                SELECT {select_sql} FROM {table} t 
+                WHERE {' AND '.join(conditions)} {extra_where} 
+                ORDER BY t.id DESC 
+                LIMIT ?
+            ''', (*params, *extra_params, limit))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    
+    def search_patients_fulltext(self, query, limit=50, active_only=True):
+        """Páciensek teljes szöveges keresése (név, email, telefon), relevancia szerint"""
+        if self.pii is not None:
+            # Titkosított módban a visszafejtett listán: minden szó szerepeljen valamelyik mezőben
+            terms = [term.casefold() for term in (query or '').split()]
+            if not terms:
+                return []
+            matches = []
+            for row in self._pii_ordered('name', active_only)[1]:
+                text = ' '.join(value or '' for value in row[1:4]).casefold()
+                if all(term in text for term in terms):
+                    matches.append(row)
+                    if len(matches) >= limit:
+                        break
+            return matches
+        return self._full_text_search(
+            'patients', 't.*', query, limit,
+            'AND t.active = 1' if active_only else ''
+        )
+    
+    def search_calendar_events(self, query, limit=50):
+        """Naptár események keresése (cím, leírás), relevancia szerint
+        
+        Sorok: (id, start_time, event_title, patient_email, event_description)
+        """
+        return self._full_text_search(
+            'calendar_events', 't.id, t.start_time, t.event_title, t.patient_email, t.event_description',
+            query, limit
+        )
+    
+    def search_logs(self, query, limit=200, level=None, patient_email=None):
+        """Napló bejegyzések keresése az üzenet szövegében, relevancia szerint
+        
+        Sorok: (id, timestamp, level, message, patient_email)
+        """
+        conditions, params = self._log_filter(level, patient_email)
+        extra_where = ''.join(f' AND t.{condition}' for condition in conditions)
+        return self._open_log_rows(self._full_text_search(
+            'logs', 't.id, t.timestamp, t.level, t.message, t.patient_email', query, limit,
+            extra_where, params
+        ))
     
     def migrate_database(self):
         """Adatbázis migráció - új oszlopok hozzáadása"""
         try:
-            conn = sqlite3.connect(self.db_name)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Ellenőrizzük, hogy léteznek-e az új oszlopok
@@ -120,6 +871,12 @@ class DatabaseManager:
                 cursor.execute('ALTER TABLE calendar_events ADD COLUMN new_appointment_notified INTEGER DEFAULT 0')
                 print("Adatbázis migráció: new_appointment_notified oszlop hozzáadva")
             
+            # Új időpont értesítés foglalása (claim) több példány / worker esetén
+            if 'notify_claimed_by' not in columns:
+                cursor.execute('ALTER TABLE calendar_events ADD COLUMN notify_claimed_by TEXT')
+                cursor.execute('ALTER TABLE calendar_events ADD COLUMN notify_claimed_until TIMESTAMP')
+                print("Adatbázis migráció: notify_claimed_by / notify_claimed_until oszlopok hozzáadva")
+            
             conn.commit()
             conn.close()
             
@@ -162,7 +919,7 @@ Mit freundlichen Grüßen,
             }
         ]
         
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
         
         for template in templates:
@@ -179,22 +936,116 @@ Mit freundlichen Grüßen,
     def add_patient(self, name, email, phone="", language="hu"):
         """Páciens hozzáadása"""
         try:
-            conn = sqlite3.connect(self.db_name)
+            conn = self._connect()
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT INTO patients (name, email, phone, language) 
-                VALUES (?, ?, ?, ?)
-            ''', (name, email, phone, language))
-            conn.commit()
+                INSERT INTO patients (name, email, phone, language, email_key) 
+                VALUES (?, ?, ?, ?, ?)
+            ''', (self.seal_pii(name), self.seal_pii(email), self.seal_pii(phone), language, self.email_key(email)))
             patient_id = cursor.lastrowid
+            self._refresh_reminder_queue(cursor, 'e.patient_email = ?', (email,))
+            conn.commit()
             conn.close()
             return patient_id
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Ezzel az email címmel már létezik páciens: {email}")
         except Exception as e:
             raise ValueError(f"Páciens hozzáadási hiba: {str(e)}")
     
+    def upsert_patients_batch(self, rows, update_existing=True):
+        """Páciensek tömeges importja normalizált email kulcs szerint (halmaz alapú upsert)
+        
+        rows: (name, email, phone, language) sorok. Új email címnél beszúrás,
+        meglévőnél (update_existing esetén) a név, telefon és nyelv frissítése;
+        az azonos adatú sorok érintetlenek maradnak, így az ismételt import
+        olcsó és idempotens. Egy adagon belül ugyanarra a kulcsra az utolsó
+        sor érvényes.
+        Visszatérési érték: {'inserted': n, 'updated': n, 'unchanged': n, 'duplicates': n}
+        (duplicates: az adagon belül ismétlődő, felülírt sorok).
+        """
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0}
+        if not rows:
+            return counts
+        
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS patient_import (
+                email_key TEXT PRIMARY KEY, name TEXT, email TEXT, phone TEXT, language TEXT, action TEXT
+            )
+        ''')
+        cursor.execute('DELETE FROM temp.patient_import')
+        cursor.executemany('''
+            INSERT OR REPLACE INTO temp.patient_import (email_key, name, email, phone, language) 
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(self.email_key(row[1]),) + tuple(row) for row in rows])
+        
+        cursor.execute('''
+            UPDATE temp.patient_import SET action = COALESCE((
+                SELECT CASE WHEN pii_open(p.name) IS patient_import.name AND pii_open(p.phone) IS patient_import.phone 
+                            AND p.language IS patient_import.language 
+                            THEN 'unchanged' ELSE ? END 
+                FROM patients p WHERE p.email_key = patient_import.email_key
+            ), 'inserted')
+        ''', ('updated' if update_existing else 'unchanged',))
+        
+        cursor.execute('SELECT action, COUNT(*) FROM temp.patient_import GROUP BY action')
+        counts.update(dict(cursor.fetchall()))
+        counts['duplicates'] = len(rows) - (counts['inserted'] + counts['updated'] + counts['unchanged'])
+        
+        # Egyetlen halmaz alapú utasítás: új sorok beszúrása, változott sorok frissítése
+        cursor.execute('''
+            INSERT INTO patients (name, email, phone, language, email_key) 
+            SELECT pii_seal(name), pii_seal(email), pii_seal(phone), language, email_key FROM temp.patient_import 
+            WHERE action != 'unchanged' 
+            ON CONFLICT(email_key) DO UPDATE SET 
+                name = excluded.name, 
+                phone = excluded.phone, 
+                language = excluded.language
+        ''')
+        
+        # Beszúrt / módosított páciensek emlékeztetői (név, nyelv a sorban)
+        if counts['inserted'] or counts['updated']:
+            self._refresh_reminder_queue(cursor, '''e.patient_email IN (
+                SELECT pii_open(p.email) FROM patients p JOIN temp.patient_import i ON i.email_key = p.email_key 
+                WHERE i.action != 'unchanged'
+            )''', ())
+        
+        cursor.execute('DELETE FROM temp.patient_import')
+        conn.commit()
+        conn.close()
+        return counts
+    
+    def update_patient(self, patient_id, name, email, phone, language):
+        """Páciens adatainak módosítása"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT pii_open(email) FROM patients WHERE id = ?', (patient_id,))
+        row = cursor.fetchone()
+        old_email = row[0] if row else None
+        
+        cursor.execute('''
+            UPDATE patients 
+            SET name = ?, email = ?, phone = ?, language = ?, email_key = ? 
+            WHERE id = ?
+        ''', (self.seal_pii(name), self.seal_pii(email), self.seal_pii(phone), language, self.email_key(email), patient_id))
+        updated = cursor.rowcount > 0
+        
+        # Régi és új email címhez tartozó emlékeztetők újraszámolása
+        for affected_email in {old_email, email}:
+            if affected_email:
+                self._refresh_reminder_queue(cursor, 'e.patient_email = ?', (affected_email,))
+        
+        conn.commit()
+        conn.close()
+        return updated
+    
     def get_patients(self, active_only=True):
         """Páciensek lekérése"""
-        conn = sqlite3.connect(self.db_name)
+        if self.pii is not None:
+            return list(self._pii_ordered('name', active_only)[1])
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
         if active_only:
@@ -206,23 +1057,153 @@ Mit freundlichen Grüßen,
         conn.close()
         return patients
     
+    # Rendezhető oszlopok a lapozott lekérdezésekhez (oszlopnév -> sor index)
+    PATIENT_SORT_COLUMNS = {'name': 1, 'email': 2, 'created_at': 5, 'id': 0}
+    
+    def _patient_filter(self, active_only=True, search=None):
+        """Páciens lekérdezések közös WHERE feltételei"""
+        conditions = []
+        params = []
+        
+        if active_only:
+            conditions.append('active = 1')
+        if search and self.pii is not None:
+            # Titkosított oszlopokon a LIKE nem működik: egyezések a visszafejtett listából
+            conditions.append('id IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps([row[0] for row in self._pii_ordered('id', active_only, search)[1]]))
+        elif search:
+            like = f"%{search}%"
+            conditions.append('(name LIKE ? OR email LIKE ?)')
+            params.extend([like, like])
+        
+        return conditions, params
+    
+    def count_patients(self, active_only=True, search=None):
+        """Páciensek száma"""
+        if self.pii is not None:
+            return len(self._pii_ordered('id', active_only, search)[1])
+        
+        conditions, params = self._patient_filter(active_only, search)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT COUNT(*) FROM patients {where}', params)
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def get_patients_page(self, after_key=None, limit=100, sort_column='name', descending=False,
+                          active_only=True, search=None):
+        """Páciensek egy oldala keyset lapozással
+        
+        A sorrend (sort_column, id), az after_key az előző oldal utolsó
+        sorának (rendezési érték, id) kulcsa. OFFSET nélkül, indexről olvas.
+        """
+        if sort_column not in self.PATIENT_SORT_COLUMNS:
+            raise ValueError(f"Nem rendezhető oszlop: {sort_column}")
+        
+        if self.pii is not None:
+            keys, rows = self._pii_ordered(sort_column, active_only, search)
+            if descending:
+                end = len(rows) if after_key is None else bisect.bisect_left(keys, self._pii_sort_key(*after_key))
+                return rows[max(0, end - limit):end][::-1]
+            start = 0 if after_key is None else bisect.bisect_right(keys, self._pii_sort_key(*after_key))
+            return rows[start:start + limit]
+        
+        conditions, params = self._patient_filter(active_only, search)
+        if after_key is not None:
+            operator = '<' if descending else '>'
+            conditions.append(f'({sort_column}, id) {operator} (?, ?)')
+            params.extend(after_key)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        direction = 'DESC' if descending else 'ASC'
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT * FROM patients {where} 
+            ORDER BY {sort_column} {direction}, id {direction} 
+            LIMIT ?
+        ''', params + [limit])
+        patients = cursor.fetchall()
+        conn.close()
+        return patients
+    
+    def get_patient_sort_key_at(self, position, sort_column='name', descending=False,
+                                active_only=True, search=None):
+        """Adott pozíción álló páciens (rendezési érték, id) kulcsa - távoli ugráshoz a lapozásban"""
+        if sort_column not in self.PATIENT_SORT_COLUMNS:
+            raise ValueError(f"Nem rendezhető oszlop: {sort_column}")
+        
+        if self.pii is not None:
+            _, rows = self._pii_ordered(sort_column, active_only, search)
+            if not 0 <= position < len(rows):
+                return None
+            row = rows[len(rows) - 1 - position] if descending else rows[position]
+            return row[self.PATIENT_SORT_COLUMNS[sort_column]], row[0]
+        
+        conditions, params = self._patient_filter(active_only, search)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        direction = 'DESC' if descending else 'ASC'
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {sort_column}, id FROM patients {where} 
+            ORDER BY {sort_column} {direction}, id {direction} 
+            LIMIT 1 OFFSET ?
+        ''', params + [position])
+        key = cursor.fetchone()
+        conn.close()
+        return key
+    
+    def get_patients_by_ids(self, patient_ids):
+        """Páciensek lekérése azonosítók alapján (név szerint rendezve)"""
+        patient_ids = list(patient_ids)
+        if not patient_ids:
+            return []
+        
+        patients = []
+        conn = self._connect()
+        cursor = conn.cursor()
+        # SQLite paraméter limit miatt darabolva
+        for start in range(0, len(patient_ids), 500):
+            chunk = patient_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'SELECT * FROM patients WHERE id IN ({placeholders})', chunk)
+            patients.extend(cursor.fetchall())
+        conn.close()
+        
+        if self.pii is not None:
+            patients = self.pii.open_rows(patients, self.PATIENT_PII_COLUMNS)
+        patients.sort(key=lambda patient: (patient[1], patient[0]))
+        return patients
+    
     def get_patient_by_email(self, email):
         """Páciens lekérése email alapján"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM patients WHERE email = ? AND active = 1', (email,))
+        cursor.execute('SELECT * FROM patients WHERE email_key = ? AND active = 1', (self.email_key(email),))
         patient = cursor.fetchone()
         conn.close()
+        if patient is not None and self.pii is not None:
+            patient = self.pii.open_rows([patient], self.PATIENT_PII_COLUMNS)[0]
         return patient
     
     def delete_patient(self, patient_id):
         """Páciens fizikai törlése az adatbázisból"""
         try:
-            conn = sqlite3.connect(self.db_name)
+            conn = self._connect()
             cursor = conn.cursor()
+            cursor.execute('SELECT pii_open(email) FROM patients WHERE id = ?', (patient_id,))
+            row = cursor.fetchone()
             cursor.execute('DELETE FROM patients WHERE id = ?', (patient_id,))
-            conn.commit()
             deleted_count = cursor.rowcount
+            if row:
+                self._refresh_reminder_queue(cursor, 'e.patient_email = ?', (row[0],))
+            conn.commit()
             conn.close()
             return deleted_count > 0
         except Exception as e:
@@ -230,63 +1211,536 @@ Mit freundlichen Grüßen,
             return False
     
     def add_calendar_event(self, google_event_id, patient_email, event_title, event_description, start_time, end_time, is_new=False):
-        """Naptár esemény hozzáadása"""
+        """Naptár esemény hozzáadása vagy frissítése (az emlékeztető sor inkrementális frissítésével)"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO calendar_events 
-                (google_event_id, patient_email, event_title, event_description, start_time, end_time, is_new_appointment) 
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (google_event_id, patient_email, event_title, event_description, start_time, end_time, 1 if is_new else 0))
-            conn.commit()
-            conn.close()
+            self.upsert_calendar_events_batch([
+                (google_event_id, patient_email, event_title, event_description, start_time, end_time, is_new)
+            ])
             return True
         except Exception as e:
             print(f"Naptár esemény hozzáadási hiba: {str(e)}")
             return False
     
-    def get_calendar_events(self, days_ahead=30):
-        """Naptár események lekérése"""
-        conn = sqlite3.connect(self.db_name)
+    def upsert_calendar_events_batch(self, events):
+        """Naptár események tömeges upsertje egy tranzakcióban (Google szinkron, ICS import)
+        
+        events: (google_event_id, patient_email, event_title, event_description,
+        start_time, end_time, is_new) sorok. Az esemény azonosítója megmarad,
+        változatlan sor nem íródik újra; az emlékeztető állapot csak időpont
+        változáskor nullázódik. Az érintett események emlékeztetői egyetlen
+        halmaz alapú frissítéssel számolódnak újra.
+        Visszatérési érték: a feldolgozott események száma.
+        """
+        if not events:
+            return 0
+        
+        conn = self._connect(timeout=30)
         cursor = conn.cursor()
+        count = self._upsert_calendar_events(cursor, events)
+        conn.commit()
+        conn.close()
+        return count
+    
+    def _upsert_calendar_events(self, cursor, events):
+        """Tömeges upsert a megadott kurzoron (a hívó tranzakciójában); opcionális 8. elem: series_id"""
+        rows = [(event[0], event[1], event[2], event[3], event[4], event[5], 1 if event[6] else 0,
+                 event[7] if len(event) > 7 else None) for event in events]
+        
+        # Időpont változáskor a korábban elküldött emlékeztetők is újra esedékessé válnak
+        cursor.executemany('''
+            DELETE FROM event_reminders 
+            WHERE event_id = (SELECT id FROM calendar_events WHERE google_event_id = ? AND start_time IS NOT ?)
+        ''', [(row[0], row[4]) for row in rows])
+        
+        cursor.executemany('''
+            INSERT INTO calendar_events 
+            (google_event_id, patient_email, event_title, event_description, start_time, end_time, is_new_appointment, 
+             series_id) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?) 
+            ON CONFLICT(google_event_id) DO UPDATE SET 
+                patient_email = excluded.patient_email, 
+                event_title = excluded.event_title, 
+                event_description = excluded.event_description, 
+                reminder_sent = CASE WHEN calendar_events.start_time = excluded.start_time 
+                                     THEN calendar_events.reminder_sent ELSE 0 END, 
+                start_time = excluded.start_time, 
+                end_time = excluded.end_time, 
+                is_new_appointment = excluded.is_new_appointment, 
+                series_id = excluded.series_id
+            WHERE calendar_events.patient_email IS NOT excluded.patient_email 
+               OR calendar_events.event_title IS NOT excluded.event_title 
+               OR calendar_events.event_description IS NOT excluded.event_description 
+               OR calendar_events.start_time IS NOT excluded.start_time 
+               OR calendar_events.end_time IS NOT excluded.end_time 
+               OR calendar_events.is_new_appointment IS NOT excluded.is_new_appointment 
+               OR calendar_events.series_id IS NOT excluded.series_id
+        ''', rows)
+        
+        self._refresh_reminder_queue(
+            cursor, 'e.google_event_id IN (SELECT value FROM json_each(?))', (json.dumps([row[0] for row in rows]),)
+        )
+        return len(rows)
+    
+    def delete_calendar_events_by_google_ids(self, google_event_ids):
+        """Események törlése külső azonosító szerint (pl. ICS-ben lemondott előfordulások)"""
+        if not google_event_ids:
+            return 0
         
-        end_date = (datetime.now() + timedelta(days=days_ahead)).strftime('%Y-%m-%d %H:%M:%S')
-        current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        cursor.execute('''
-            SELECT * FROM calendar_events 
-            WHERE start_time BETWEEN ? AND ? 
-            ORDER BY start_time
-        ''', (current_date, end_date))
-        
-        events = cursor.fetchall()
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        deleted = self._delete_calendar_events(
+            cursor, 'e.google_event_id IN (SELECT value FROM json_each(?))', (json.dumps(list(google_event_ids)),)
+        )
+        conn.commit()
         conn.close()
-        return events
+        return deleted
     
-    def get_tomorrows_reminders(self):
-        """Holnapi emlékeztetők lekérése"""
-        conn = sqlite3.connect(self.db_name)
+    def _delete_calendar_events(self, cursor, where_sql, params):
+        """Feltételnek megfelelő események törlése az emlékeztető soraikkal együtt (a hívó tranzakciójában)"""
+        id_filter = f'SELECT e.id FROM calendar_events e WHERE {where_sql}'
+        cursor.execute(f'DELETE FROM reminder_queue WHERE event_id IN ({id_filter})', params)
+        cursor.execute(f'DELETE FROM event_reminders WHERE event_id IN ({id_filter})', params)
+        cursor.execute(f'DELETE FROM calendar_events WHERE id IN ({id_filter})', params)
+        return cursor.rowcount
+    
+    # Példányonként (singleEvents=True) szinkronizált régi Google sor: '{sorozat id}_{ÉÉÉÉHHNN[THHMMSSZ]}'
+    # (a Google azonosítóban nincs aláhúzás); paraméter: sorozat kulcsok JSON listája
+    LEGACY_INSTANCE_SQL = '''e.series_id IS NULL 
+        AND e.google_event_id GLOB '*_[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]*' 
+        AND substr(e.google_event_id, 1, instr(e.google_event_id, '_') - 1) IN (SELECT value FROM json_each(?))'''
+    
+    # Sorozat oszlopok (IcsCalendar.series_row kulcsai)
+    SERIES_COLUMNS = ('series_key', 'patient_email', 'event_title', 'event_description', 'dtstart', 'tzid',
+                      'duration_seconds', 'rrule', 'rdates', 'exceptions', 'first_start', 'last_start')
+    
+    def upsert_calendar_series(self, series):
+        """Ismétlődő sorozatok mentése (series: IcsCalendar.series_row szótárak)
+        
+        Változatlan sorozat nem íródik újra. Új vagy módosult sorozatnál a
+        verzió nő és a kibontott tartomány nullázódik, így a következő
+        lekérdezett ablak újra kibontja (a meglévő előfordulás sorok és
+        emlékeztető állapotuk azonos azonosító esetén megmaradnak). A
+        napi példányonként szinkronizált régi sorok ({kulcs}_{időpont}) a
+        mai naptól törlődnek; a már emlékeztetett / értesített sorok a
+        kibontásig megmaradnak, hogy állapotukat az új előfordulás átvegye.
+        Visszatérés: új / módosult sorozatok száma.
+        """
+        if not series:
+            return 0
+        
+        columns = ', '.join(self.SERIES_COLUMNS)
+        placeholders = ', '.join(['?'] * len(self.SERIES_COLUMNS))
+        updates = ', '.join(f'{column} = excluded.{column}' for column in self.SERIES_COLUMNS[1:])
+        changed = ' OR '.join(f'calendar_series.{column} IS NOT excluded.{column}' for column in self.SERIES_COLUMNS[1:])
+        today_start = datetime.now().strftime('%Y-%m-%d 00:00:00')
+        
+        conn = self._connect(timeout=30)
         cursor = conn.cursor()
+        changed_keys = []
+        for row in series:
+            cursor.execute(f'''
+                INSERT INTO calendar_series ({columns}) VALUES ({placeholders}) 
+                ON CONFLICT(series_key) DO UPDATE SET {updates}, 
+                    version = calendar_series.version + 1, 
+                    materialized_from = NULL, 
+                    materialized_until = NULL, 
+                    updated_at = CURRENT_TIMESTAMP 
+                WHERE {changed}
+            ''', [row[column] for column in self.SERIES_COLUMNS])
+            if cursor.rowcount:
+                changed_keys.append(row['series_key'])
+        
+        if changed_keys:
+            self._delete_calendar_events(cursor, f'''e.start_time >= ? AND {self.LEGACY_INSTANCE_SQL} 
+                AND e.reminder_sent = 0 AND e.new_appointment_notified = 0 
+                AND NOT EXISTS (SELECT 1 FROM event_reminders r WHERE r.event_id = e.id AND r.sent_at IS NOT NULL)''',
+                (today_start, json.dumps(changed_keys)))
         
-        tomorrow = datetime.now() + timedelta(days=1)
-        tomorrow_start = tomorrow.replace(hour=0, minute=0, second=0, microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
-        tomorrow_end = tomorrow.replace(hour=23, minute=59, second=59, microsecond=999999).strftime('%Y-%m-%d %H:%M:%S')
+        conn.commit()
+        conn.close()
+        return len(changed_keys)
+    
+    def delete_calendar_series(self, series_keys):
+        """Sorozatok törlése a mai naptól kezdődő előfordulásaikkal (lemondott ismétlődő időpont)"""
+        if not series_keys:
+            return 0
         
-        cursor.execute('''
-            SELECT * FROM calendar_events 
-            WHERE start_time BETWEEN ? AND ? 
-            AND reminder_sent = 0
-            ORDER BY start_time
-        ''', (tomorrow_start, tomorrow_end))
+        keys_json = json.dumps(list(series_keys))
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        deleted = self._delete_calendar_events(cursor, '''e.start_time >= ? AND e.series_id IN (
+            SELECT id FROM calendar_series WHERE series_key IN (SELECT value FROM json_each(?))
+        )''', (datetime.now().strftime('%Y-%m-%d 00:00:00'), keys_json))
+        cursor.execute('DELETE FROM calendar_series WHERE series_key IN (SELECT value FROM json_each(?))', (keys_json,))
+        conn.commit()
+        conn.close()
+        return deleted
+    
+    def add_calendar_series_exceptions(self, exceptions):
+        """Előfordulás kulcsok felvétele sorozatok kivételei közé (exceptions: sorozat kulcs -> kulcsok)
         
-        events = cursor.fetchall()
+        A kivételként megjelölt előfordulást a kibontás nem hozza létre
+        (módosított példány külön sorként, vagy törölt előfordulás).
+        """
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        for series_key, keys in exceptions.items():
+            cursor.execute('SELECT exceptions FROM calendar_series WHERE series_key = ?', (series_key,))
+            row = cursor.fetchone()
+            if not row:
+                continue
+            merged = sorted(set(json.loads(row[0] or '[]')) | set(keys))
+            cursor.execute('''
+                UPDATE calendar_series SET exceptions = ?, version = version + 1, updated_at = CURRENT_TIMESTAMP 
+                WHERE series_key = ? AND exceptions IS NOT ?
+            ''', (json.dumps(merged), series_key, json.dumps(merged)))
+        conn.commit()
         conn.close()
-        return events
     
-    def get_todays_new_appointments(self):
-        """Mai új időpontok lekérése"""
-        conn = sqlite3.connect(self.db_name)
+    def materialize_series(self, range_start, range_end):
+        """Ismétlődő sorozatok előfordulásainak létrehozása a [range_start, range_end] ablakra
+        
+        range_start / range_end: 'YYYY-MM-DD HH:MM:SS'. Csak az ablakot
+        érintő sorozatok bontódnak ki, és azok sem, amelyeknél az ablakot
+        a tárolt kibontott tartomány vagy a folyamaton belüli memo már
+        lefedi. Az ablakban lévő, már nem létező előfordulások (szabály
+        változás, régi példány azonosítók) törlődnek.
+        Visszatérés: a kibontott előfordulások száma.
+        """
+        window = (range_start, range_end)
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, series_key, patient_email, event_title, event_description, dtstart, tzid, 
+                   duration_seconds, rrule, rdates, exceptions, version 
+            FROM calendar_series 
+            WHERE first_start <= ? AND (last_start IS NULL OR last_start >= ?) 
+            AND NOT (materialized_from IS NOT NULL AND materialized_from <= ? AND materialized_until >= ?)
+        ''', (range_end, range_start, range_start, range_end))
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        conn.close()
+        
+        with self.series_lock:
+            expanded_versions = self.series_windows.get(window, {})
+            if window in self.series_windows:
+                self.series_windows.move_to_end(window)
+        pending = [dict(zip(columns, row)) for row in rows if expanded_versions.get(row[0]) != row[-1]]
+        if not pending:
+            return 0
+        
+        calendar = IcsCalendar(self)
+        window_start = datetime.strptime(range_start, '%Y-%m-%d %H:%M:%S')
+        window_end = datetime.strptime(range_end, '%Y-%m-%d %H:%M:%S')
+        occurrences = []
+        for series in pending:
+            occurrences.extend(calendar.series_occurrences(series, window_start, window_end))
+        series_ids = json.dumps([series['id'] for series in pending])
+        
+        # Egy tranzakció az összes érintett sorozatra
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        if occurrences:
+            self._upsert_calendar_events(cursor, occurrences)
+            self._carry_over_legacy_state(cursor, range_start, range_end, json.dumps([series['series_key'] for series in pending]))
+        
+        # Az ablakban maradt, a szabály szerint már nem létező előfordulások és régi példány azonosítók
+        self._delete_calendar_events(cursor, f'''e.start_time BETWEEN ? AND ? 
+            AND (e.series_id IN (SELECT value FROM json_each(?)) OR ({self.LEGACY_INSTANCE_SQL})) 
+            AND e.google_event_id NOT IN (SELECT value FROM json_each(?))''',
+            (range_start, range_end, series_ids, json.dumps([series['series_key'] for series in pending]),
+             json.dumps([occurrence[0] for occurrence in occurrences])))
+        
+        # Összefüggő ablak esetén a tárolt kibontott tartomány bővül (verzió egyezésnél)
+        cursor.executemany('''
+            UPDATE calendar_series SET 
+                materialized_from = min(coalesce(materialized_from, ?), ?), 
+                materialized_until = max(coalesce(materialized_until, ?), ?) 
+            WHERE id = ? AND version = ? 
+            AND (materialized_from IS NULL OR (? <= materialized_until AND ? >= materialized_from))
+        ''', [(range_start, range_start, range_end, range_end, series['id'], series['version'], range_start, range_end)
+              for series in pending])
+        conn.commit()
+        conn.close()
+        
+        with self.series_lock:
+            versions = self.series_windows.setdefault(window, {})
+            versions.update((series['id'], series['version']) for series in pending)
+            self.series_windows.move_to_end(window)
+            while len(self.series_windows) > self.SERIES_WINDOW_CACHE_SIZE:
+                self.series_windows.popitem(last=False)
+        return len(occurrences)
+    
+    def _carry_over_legacy_state(self, cursor, range_start, range_end, series_keys_json):
+        """Régi példány sorok küldési állapotának átvitele a megfelelő új előfordulásra
+        
+        Párosítás: '{kulcs}_{időpont}' -> '{kulcs}:{időpont}' azonosító, vagy azonos kezdési idő.
+        
+        A régi sor törlésével az elküldött emlékeztetői is törlődnek; átvitel
+        nélkül az új azonosítójú előfordulás emlékeztetője újra kimenne.
+        """
+        cursor.execute(f'''
+            SELECT e.id, n.id, e.reminder_sent, e.new_appointment_notified 
+            FROM calendar_events e 
+            JOIN calendar_series s ON s.series_key = substr(e.google_event_id, 1, instr(e.google_event_id, '_') - 1) 
+            JOIN calendar_events n ON n.series_id = s.id AND (
+                n.google_event_id = s.series_key || ':' || substr(e.google_event_id, instr(e.google_event_id, '_') + 1) 
+                OR n.start_time = e.start_time
+            ) 
+            WHERE e.start_time BETWEEN ? AND ? AND {self.LEGACY_INSTANCE_SQL}
+        ''', (range_start, range_end, series_keys_json))
+        pairs = cursor.fetchall()
+        if not pairs:
+            return
+        
+        cursor.executemany('''
+            INSERT OR REPLACE INTO event_reminders (event_id, offset_key, days_before, due_at, due_until, sent_at) 
+            SELECT ?, offset_key, days_before, due_at, due_until, sent_at 
+            FROM event_reminders WHERE event_id = ? AND sent_at IS NOT NULL
+        ''', [(new_id, legacy_id) for legacy_id, new_id, _, _ in pairs])
+        cursor.executemany('''
+            UPDATE calendar_events SET 
+                reminder_sent = max(reminder_sent, ?), 
+                new_appointment_notified = max(new_appointment_notified, ?) 
+            WHERE id = ?
+        ''', [(reminder_sent or 0, notified or 0, new_id) for _, new_id, reminder_sent, notified in pairs])
+        # Régi jelzős (event_reminders nélküli) állapot esetén az emlékeztetők újraszámolása
+        self._refresh_reminder_queue(cursor, 'e.id IN (SELECT value FROM json_each(?))',
+                                     (json.dumps([new_id for _, new_id, _, _ in pairs]),))
+    
+    def materialize_reminder_window(self):
+        """Sorozatok kibontása az emlékeztetők által lekérdezett ablakra (ma - legnagyobb offset + 1 nap)"""
+        days = max([int(offset['days_before']) for offset in self.reminder_offsets] + [0]) + 1
+        today = datetime.now()
+        return self.materialize_series(today.strftime('%Y-%m-%d 00:00:00'),
+                                       (today + timedelta(days=days)).strftime('%Y-%m-%d 23:59:59'))
+    
+    def get_calendar_events_for_export(self, patient_email=None, range_start=None, range_end=None,
+                                       exclude_series=False):
+        """Események ICS exporthoz: páciens és / vagy [range_start, range_end) szerint, kezdési idő sorrendben
+        
+        exclude_series: sorozat előfordulások nélkül (a sorozat RRULE-lal exportálódik).
+        Visszatérés: (google_event_id, patient_email, event_title, event_description, start_time, end_time) sorok.
+        """
+        conditions = ['series_id IS NULL'] if exclude_series else []
+        params = []
+        if patient_email:
+            conditions.append('patient_email = ?')
+            params.append(patient_email)
+        if range_start:
+            conditions.append('start_time >= ?')
+            params.append(range_start)
+        if range_end:
+            conditions.append('start_time < ?')
+            params.append(range_end)
+        where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT google_event_id, patient_email, event_title, event_description, start_time, end_time 
+            FROM calendar_events {where_sql} 
+            ORDER BY start_time, id
+        ''', params)
+        events = cursor.fetchall()
+        conn.close()
+        return events
+    
+    def get_calendar_series_for_export(self, patient_email, range_start=None):
+        """Egy páciens ismétlődő sorozatai ICS exporthoz (range_start után is van előfordulásuk)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT series_key, patient_email, event_title, event_description, dtstart, tzid, 
+                   duration_seconds, rrule, rdates, exceptions 
+            FROM calendar_series 
+            WHERE patient_email = ? AND (last_start IS NULL OR last_start >= ?) 
+            ORDER BY first_start, id
+        ''', (patient_email, range_start or ''))
+        series = cursor.fetchall()
+        conn.close()
+        return series
+    
+    def _refresh_reminder_queue(self, cursor, where_sql, params):
+        """Emlékeztető sor és esemény emlékeztetők újraszámolása a feltételnek megfelelő eseményekre
+        
+        A sor csak jövőbeli, ismert pácienshez tartozó eseményeket tartalmaz,
+        előre formázott sablon paraméterekkel. Minden beállított offsethez
+        egy event_reminders sor tartozik; a már elküldöttek érintetlenek maradnak.
+        """
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
+        
+        cursor.execute(f'''
+            DELETE FROM reminder_queue 
+            WHERE event_id IN (SELECT e.id FROM calendar_events e WHERE {where_sql})
+        ''', params)
+        cursor.execute(f'''
+            DELETE FROM event_reminders 
+            WHERE sent_at IS NULL 
+            AND event_id IN (SELECT e.id FROM calendar_events e WHERE {where_sql})
+        ''', params)
+        
+        cursor.execute(f'''
+            INSERT INTO reminder_queue 
+            (event_id, patient_email, patient_name, language, appointment_date, appointment_time) 
+            SELECT e.id, e.patient_email, p.name, p.language, 
+                   date(e.start_time), strftime('%H:%M', e.start_time) 
+            FROM calendar_events e 
+            JOIN patients p ON p.id = (
+                SELECT id FROM patients WHERE email_key = email_key(e.patient_email) AND active = 1 ORDER BY id LIMIT 1
+            ) 
+            WHERE ({where_sql}) 
+            AND e.start_time >= ?
+        ''', tuple(params) + (today_start,))
+        
+        # Minden offsethez egy emlékeztető sor (egyetlen utasítás, offsetek VALUES táblából).
+        # Ha a küldési idő nem előzi meg az időpontot (pl. days_before = 0, send_time az időpont
+        # után), az emlékeztető az adott nap elejétől esedékes, különben sosem lenne lefoglalható
+        offset_values = ', '.join(['(?, ?, ?)'] * len(self.reminder_offsets))
+        offset_params = []
+        for offset in self.reminder_offsets:
+            offset_params.extend([offset['key'], int(offset['days_before']), offset['send_time']])
+        
+        cursor.execute(f'''
+            WITH offsets(offset_key, days_before, send_time) AS (VALUES {offset_values}) 
+            INSERT OR IGNORE INTO event_reminders 
+            (event_id, offset_key, days_before, due_at, due_until) 
+            SELECT q.event_id, o.offset_key, o.days_before, 
+                   CASE WHEN datetime(date(e.start_time, '-' || o.days_before || ' days') || ' ' || o.send_time || ':00') < e.start_time 
+                        THEN datetime(date(e.start_time, '-' || o.days_before || ' days') || ' ' || o.send_time || ':00') 
+                        ELSE datetime(date(e.start_time, '-' || o.days_before || ' days')) END, 
+                   min(datetime(date(e.start_time, '-' || o.days_before || ' days'), '+1 day'), e.start_time) 
+            FROM calendar_events e 
+            JOIN reminder_queue q ON q.event_id = e.id 
+            CROSS JOIN offsets o 
+            WHERE ({where_sql})
+        ''', tuple(offset_params) + tuple(params))
+        
+        # Régi (offset nélküli) verzióban már emlékeztetett események: reminder_sent = 1, de nincs
+        # elküldött event_reminders soruk. A régi verzió az előző napi emlékeztetőt küldte, ez
+        # elküldöttnek számít, így frissítés után nem megy ki újra
+        cursor.execute(f'''
+            UPDATE event_reminders SET sent_at = min(due_at, ?) 
+            WHERE sent_at IS NULL AND days_before = 1 
+            AND event_id IN (
+                SELECT e.id FROM calendar_events e 
+                WHERE ({where_sql}) 
+                AND e.reminder_sent = 1 
+                AND NOT EXISTS (SELECT 1 FROM event_reminders r WHERE r.event_id = e.id AND r.sent_at IS NOT NULL)
+            )
+        ''', (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),) + tuple(params))
+    
+    def set_reminder_offsets(self, offsets):
+        """Emlékeztető offsetek beállítása; változás esetén az emlékeztető sor újraépül"""
+        if not offsets:
+            offsets = list(self.DEFAULT_REMINDER_OFFSETS)
+        self.reminder_offsets = offsets
+        
+        signature = self._reminder_queue_signature()
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM app_meta WHERE key = 'reminder_offsets'")
+        row = cursor.fetchone()
+        conn.close()
+        
+        if not row or row[0] != signature:
+            self.rebuild_reminder_queue()
+    
+    def _reminder_queue_signature(self):
+        """A felépített emlékeztető sor azonosítója (offsetek és számítási verzió)"""
+        return json.dumps({'offsets': self.reminder_offsets, 'version': self.REMINDER_QUEUE_VERSION}, sort_keys=True)
+    
+    def rebuild_reminder_queue(self):
+        """Teljes emlékeztető sor újraépítése"""
+        try:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM reminder_queue')
+            self._refresh_reminder_queue(cursor, '1 = 1', ())
+            # A felépítéshez használt offsetek rögzítése (változás felismeréséhez)
+            cursor.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES ('reminder_offsets', ?)",
+                           (self._reminder_queue_signature(),))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Emlékeztető sor újraépítési hiba: {str(e)}")
+            return False
+    
+    def count_due_reminders(self, due_before=None):
+        """Esedékes, még el nem küldött emlékeztetők száma (minden offsetre)"""
+        now = datetime.now()
+        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+        due_before_str = (due_before or now).strftime('%Y-%m-%d %H:%M:%S')
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*) FROM event_reminders 
+            WHERE sent_at IS NULL 
+            AND due_at <= ? AND due_until > ?
+        ''', (due_before_str, now_str))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def prune_reminder_queue(self):
+        """Lejárt (már nem küldhető) emlékeztetők és elmúlt események törlése a sorból"""
+        now = datetime.now()
+        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+        
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM event_reminders WHERE sent_at IS NULL AND due_until <= ?', (now_str,))
+        cursor.execute('DELETE FROM reminder_queue WHERE appointment_date < ?', (now.strftime('%Y-%m-%d'),))
+        conn.commit()
+        conn.close()
+    
+    def get_reminder_queue(self, limit=500):
+        """Sorban álló (még el nem küldött, nem lejárt) emlékeztetők lekérése megjelenítéshez"""
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT er.event_id, er.due_at, q.patient_email, q.patient_name, q.language, 
+                   q.appointment_date, q.appointment_time, er.claimed_by, er.offset_key 
+            FROM event_reminders er 
+            JOIN reminder_queue q ON q.event_id = er.event_id 
+            WHERE er.sent_at IS NULL AND er.due_until > ? 
+            ORDER BY er.due_at, q.appointment_date, q.appointment_time 
+            LIMIT ?
+        ''', (now_str, limit))
+        queue = cursor.fetchall()
+        conn.close()
+        if self.pii is not None:
+            queue = self.pii.open_rows(queue, (3,))
+        return queue
+    
+    def get_calendar_events(self, days_ahead=30, range_start=None, range_end=None):
+        """Naptár események lekérése (alapértelmezés: mostantól days_ahead napig)
+        
+        range_start / range_end: 'YYYY-MM-DD HH:MM:SS' határok (mindkettő beleértve).
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        end_date = range_end or (datetime.now() + timedelta(days=days_ahead)).strftime('%Y-%m-%d %H:%M:%S')
+        current_date = range_start or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        cursor.execute('''
+            SELECT * FROM calendar_events 
+            WHERE start_time BETWEEN ? AND ? 
+            ORDER BY start_time, id
+        ''', (current_date, end_date))
+        
+        events = cursor.fetchall()
+        conn.close()
+        return events
+    
+    def get_todays_new_appointments(self):
+        """Mai új időpontok lekérése"""
+        conn = self._connect()
         cursor = conn.cursor()
         
         today = datetime.now()
@@ -305,39 +1759,553 @@ Mit freundlichen Grüßen,
         conn.close()
         return events
     
-    def mark_reminder_sent(self, event_id):
-        """Emlékeztető küldés megjelölése"""
-        conn = sqlite3.connect(self.db_name)
+    def claim_new_appointment(self, event_id, owner, claim_seconds=600):
+        """Egy új időpont értesítés atomi lefoglalása küldés előtt
+        
+        Csak még nem értesített, le nem foglalt (vagy lejárt foglalású)
+        eseményt foglal le, így ugyanazt az értesítést két példány nem küldheti
+        el. Visszatérési érték: True, ha a foglalás a miénk.
+        """
+        now = datetime.now()
+        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+        claimed_until = (now + timedelta(seconds=claim_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+        
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE calendar_events 
+            SET notify_claimed_by = ?, notify_claimed_until = ? 
+            WHERE id = ? 
+            AND new_appointment_notified = 0 
+            AND (notify_claimed_until IS NULL OR notify_claimed_until < ?)
+        ''', (owner, claimed_until, event_id, now_str))
+        claimed = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return claimed
+    
+    def release_new_appointment_claim(self, event_id, owner):
+        """Saját új időpont értesítés foglalás feloldása (sikertelen küldés után)"""
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE calendar_events SET notify_claimed_by = NULL, notify_claimed_until = NULL 
+            WHERE id = ? AND notify_claimed_by = ? AND new_appointment_notified = 0
+        ''', (event_id, owner))
+        conn.commit()
+        conn.close()
+    
+    def claim_due_reminders(self, owner, limit=20, claim_seconds=600, due_before=None):
+        """Esedékes emlékeztetők atomi lefoglalása (claim) egy worker számára
+        
+        Minden offset esedékes emlékeztetőit egyetlen indexelt lekérdezés adja
+        (részleges index a még el nem küldött sorokon). Csak a le nem foglalt
+        (vagy lejárt foglalású) tételeket foglalja le, így több példány / worker
+        párhuzamosan is feloszthatja ugyanazt a kört duplikált email nélkül.
+        due_before: esedékességi határ (alapértelmezés: most), kézi küldésnél a nap vége.
+        Visszatérési érték: (event_id, offset_key, days_before, patient_email,
+        patient_name, language, appointment_date, appointment_time) sorok.
+        """
+        now = datetime.now()
+        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+        due_before_str = (due_before or now).strftime('%Y-%m-%d %H:%M:%S')
+        claimed_until = (now + timedelta(seconds=claim_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+        
+        due_query = '''
+            SELECT rowid FROM event_reminders 
+            WHERE sent_at IS NULL 
+            AND due_at <= ? AND due_until > ? 
+            AND (claimed_until IS NULL OR claimed_until < ?) 
+            ORDER BY due_at 
+            LIMIT ?
+        '''
+        
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            # Egyetlen atomi UPDATE ... RETURNING utasítás
+            cursor.execute(f'''
+                UPDATE event_reminders 
+                SET claimed_by = ?, claimed_until = ? 
+                WHERE rowid IN ({due_query}) 
+                AND sent_at IS NULL 
+                AND (claimed_until IS NULL OR claimed_until < ?) 
+                RETURNING rowid
+            ''', (owner, claimed_until, due_before_str, now_str, now_str, limit, now_str))
+            row_ids = [row[0] for row in cursor.fetchall()]
+        else:
+            # Régebbi SQLite: írási tranzakció alatti SELECT + UPDATE
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute(due_query, (due_before_str, now_str, now_str, limit))
+            row_ids = [row[0] for row in cursor.fetchall()]
+            cursor.executemany('UPDATE event_reminders SET claimed_by = ?, claimed_until = ? WHERE rowid = ?',
+                               [(owner, claimed_until, row_id) for row_id in row_ids])
+        
+        reminders = []
+        if row_ids:
+            placeholders = ','.join('?' * len(row_ids))
+            cursor.execute(f'''
+                SELECT er.event_id, er.offset_key, er.days_before, q.patient_email, q.patient_name, 
+                       q.language, q.appointment_date, q.appointment_time 
+                FROM event_reminders er 
+                JOIN reminder_queue q ON q.event_id = er.event_id 
+                WHERE er.rowid IN ({placeholders}) 
+                ORDER BY q.appointment_date, q.appointment_time
+            ''', row_ids)
+            reminders = cursor.fetchall()
+        
+        conn.commit()
+        conn.close()
+        if self.pii is not None:
+            reminders = self.pii.open_rows(reminders, (4,))
+        return reminders
+    
+    def release_reminder_claims(self, reminders, owner):
+        """Saját emlékeztető foglalások feloldása (pl. sikertelen küldés után)
+        
+        reminders: (event_id, offset_key) párok listája
+        """
+        if not reminders:
+            return
+        
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE event_reminders 
+            SET claimed_by = NULL, claimed_until = NULL 
+            WHERE event_id = ? AND offset_key = ? AND claimed_by = ? AND sent_at IS NULL
+        ''', [(event_id, offset_key, owner) for event_id, offset_key in reminders])
+        conn.commit()
+        conn.close()
+    
+    def release_owner_claims(self, owner):
+        """Egy tulajdonos összes, még el nem küldött emlékeztető foglalásának feloldása"""
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE event_reminders 
+            SET claimed_by = NULL, claimed_until = NULL 
+            WHERE claimed_by = ? AND sent_at IS NULL
+        ''', (owner,))
+        released = cursor.rowcount
+        cursor.execute('''
+            UPDATE calendar_events 
+            SET notify_claimed_by = NULL, notify_claimed_until = NULL 
+            WHERE notify_claimed_by = ? AND new_appointment_notified = 0
+        ''', (owner,))
+        released += cursor.rowcount
+        conn.commit()
+        conn.close()
+        return released
+    
+    def release_owner_leases(self, owner):
+        """Egy tulajdonos összes feladat zárolásának feloldása"""
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM job_locks WHERE owner = ?', (owner,))
+        conn.commit()
+        conn.close()
+    
+    def acquire_job_lease(self, job_name, owner, ttl_seconds=600):
+        """Feladat zárolás (lease) megszerzése vagy megújítása
+        
+        Akkor sikeres, ha a zárolás szabad, lejárt, vagy már ugyanehhez a
+        tulajdonoshoz tartozik. Visszatérési érték: True, ha a lease a miénk.
+        """
+        now = datetime.now()
+        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+        expires_at = (now + timedelta(seconds=ttl_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+        
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO job_locks (job_name, owner, expires_at, acquired_at) 
+            VALUES (?, ?, ?, ?) 
+            ON CONFLICT(job_name) DO UPDATE SET 
+                owner = excluded.owner, 
+                expires_at = excluded.expires_at, 
+                acquired_at = CASE WHEN job_locks.owner = excluded.owner 
+                                   THEN job_locks.acquired_at ELSE excluded.acquired_at END 
+            WHERE job_locks.expires_at < ? OR job_locks.owner = excluded.owner
+        ''', (job_name, owner, expires_at, now_str, now_str))
+        acquired = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return acquired
+    
+    def release_job_lease(self, job_name, owner):
+        """Feladat zárolás feloldása (csak a saját lease)"""
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM job_locks WHERE job_name = ? AND owner = ?', (job_name, owner))
+        conn.commit()
+        conn.close()
+    
+    # Címzett szűrő kulcsok (kampány célzás); minden feltétel ÉS kapcsolatban
+    RECIPIENT_SELECTOR_KEYS = ('patient_ids', 'language', 'appointment_from', 'appointment_to',
+                               'last_contacted_before', 'search')
+    
+    def _recipient_filter(self, selector=None):
+        """Címzett szűrő lefordítása egyetlen indexelhető WHERE feltételre
+        
+        selector kulcsai (mind opcionális):
+            patient_ids            - páciens azonosítók listája (pl. GUI kijelölés)
+            language               - nyelv kód ('hu', 'de')
+            appointment_from / _to - van időpontja a megadott napok között (YYYY-MM-DD, zárt intervallum)
+            last_contacted_before  - nem kapott emailt ettől a naptól (vagy soha)
+            search                 - név / email részlet
+        Visszatérési érték: (conditions, params) a patients táblára, mint a _patient_filter.
+        """
+        selector = selector or {}
+        unknown = set(selector) - set(self.RECIPIENT_SELECTOR_KEYS)
+        if unknown:
+            raise ValueError(f"Ismeretlen címzett szűrő: {', '.join(sorted(unknown))}")
+        
+        conditions, params = self._patient_filter(True, selector.get('search'))
+        
+        if selector.get('patient_ids') is not None:
+            # Egyetlen JSON paraméter: nincs SQLite változószám korlát nagy kijelölésnél
+            conditions.append('id IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps([int(patient_id) for patient_id in selector['patient_ids']]))
+        
+        if selector.get('language'):
+            conditions.append('language = ?')
+            params.append(selector['language'])
+        
+        appointment_from = selector.get('appointment_from')
+        appointment_to = selector.get('appointment_to')
+        if appointment_from or appointment_to:
+            # Nem korrelált részlekérdezés: a start_time indexen egyszer fut le
+            range_conditions = ['patient_email IS NOT NULL']
+            if appointment_from:
+                range_conditions.append('start_time >= ?')
+                params.append(f"{appointment_from} 00:00:00")
+            if appointment_to:
+                range_conditions.append('start_time < ?')
+                params.append((datetime.strptime(appointment_to, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S'))
+            conditions.append(f"email_key IN (SELECT email_key(patient_email) FROM calendar_events "
+                              f"WHERE {' AND '.join(range_conditions)})")
+        
+        if selector.get('last_contacted_before'):
+            conditions.append('(last_contacted_at IS NULL OR last_contacted_at < ?)')
+            params.append(f"{selector['last_contacted_before']} 00:00:00")
+        
+        return conditions, params
+    
+    def count_recipients(self, selector=None):
+        """Szűrőnek megfelelő címzettek száma (email címenként egy)"""
+        conditions, params = self._recipient_filter(selector)
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(DISTINCT email_key) FROM patients WHERE {' AND '.join(conditions)}", params)
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def create_campaign(self, name, subject, body, selector=None):
+        """Kampány létrehozása a címzettek pillanatképével
+        
+        A címzetteket a selector (lásd _recipient_filter) választja ki;
+        None esetén minden aktív páciens. A pillanatkép egyetlen
+        INSERT ... SELECT utasítás, a páciensek nem töltődnek be Pythonba.
+        Egy email címre csak egy címzett kerül (a legkisebb azonosítójú
+        páciens). A pillanatkép rögzíti a nevet és az email címet, így a
+        kampány a páciens adatok későbbi változásától függetlenül folytatható.
+        Visszatérési érték: a kampány azonosítója.
+        """
+        conditions, params = self._recipient_filter(selector)
+        
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        
+        cursor.execute('INSERT INTO campaigns (name, subject, body, selector) VALUES (?, ?, ?, ?)',
+                       (name, subject, body, json.dumps(selector or {}, ensure_ascii=False)))
+        campaign_id = cursor.lastrowid
+        
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO campaign_recipients (campaign_id, patient_id, email, name, language) 
+            SELECT ?, id, email, name, language FROM patients 
+            WHERE id IN (SELECT MIN(id) FROM patients WHERE {' AND '.join(conditions)} GROUP BY email_key)
+        ''', [campaign_id] + params)
+        
+        cursor.execute('''
+            UPDATE campaigns SET total = (SELECT COUNT(*) FROM campaign_recipients WHERE campaign_id = ?) 
+            WHERE id = ?
+        ''', (campaign_id, campaign_id))
+        
+        conn.commit()
+        conn.close()
+        return campaign_id
+    
+    def get_campaign(self, campaign_id):
+        """Kampány lekérése: (id, name, subject, body, status, total, sent_count, failed_count, created_at, started_at, finished_at, selector)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM campaigns WHERE id = ?', (campaign_id,))
+        campaign = cursor.fetchone()
+        conn.close()
+        return campaign
+    
+    def get_campaigns(self, limit=50, status=None):
+        """Legutóbbi kampányok (opcionálisan állapot szerint szűrve)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        if status:
+            cursor.execute('SELECT * FROM campaigns WHERE status = ? ORDER BY id DESC LIMIT ?', (status, limit))
+        else:
+            cursor.execute('SELECT * FROM campaigns ORDER BY id DESC LIMIT ?', (limit,))
+        campaigns = cursor.fetchall()
+        conn.close()
+        return campaigns
+    
+    def set_campaign_status(self, campaign_id, status):
+        """Kampány állapotának beállítása (indításkor / lezáráskor időbélyeggel)"""
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE campaigns SET 
+                status = ?, 
+                started_at = CASE WHEN ? = 'running' THEN COALESCE(started_at, ?) ELSE started_at END, 
+                finished_at = CASE WHEN ? IN ('completed', 'cancelled') THEN ? ELSE NULL END 
+            WHERE id = ?
+        ''', (status, status, now_str, status, now_str, campaign_id))
+        conn.commit()
+        conn.close()
+    
+    def count_pending_campaign_recipients(self, campaign_id):
+        """Még nem küldött címzettek száma"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*) FROM campaign_recipients WHERE campaign_id = ? AND status = 'pending'
+        ''', (campaign_id,))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def claim_campaign_recipients(self, campaign_id, owner, limit=50, claim_seconds=300):
+        """Küldendő címzettek atomi lefoglalása (claim) egy worker számára
+        
+        Ugyanaz a protokoll, mint az emlékeztetőknél: csak a le nem foglalt
+        vagy lejárt foglalású címzetteket kapja meg, így több worker / példány
+        duplikáció nélkül oszthatja fel a kampányt.
+        Visszatérési érték: (patient_id, email, name, language, attempts) sorok.
+        """
+        now = datetime.now()
+        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+        claimed_until = (now + timedelta(seconds=claim_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+        
+        pending_query = '''
+            SELECT rowid FROM campaign_recipients 
+            WHERE campaign_id = ? AND status = 'pending' 
+            AND (claimed_until IS NULL OR claimed_until < ?) 
+            ORDER BY patient_id 
+            LIMIT ?
+        '''
+        
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            cursor.execute(f'''
+                UPDATE campaign_recipients 
+                SET claimed_by = ?, claimed_until = ? 
+                WHERE rowid IN ({pending_query}) 
+                AND status = 'pending' 
+                AND (claimed_until IS NULL OR claimed_until < ?) 
+                RETURNING rowid
+            ''', (owner, claimed_until, campaign_id, now_str, limit, now_str))
+            row_ids = [row[0] for row in cursor.fetchall()]
+        else:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute(pending_query, (campaign_id, now_str, limit))
+            row_ids = [row[0] for row in cursor.fetchall()]
+            cursor.executemany('UPDATE campaign_recipients SET claimed_by = ?, claimed_until = ? WHERE rowid = ?',
+                               [(owner, claimed_until, row_id) for row_id in row_ids])
+        
+        recipients = []
+        if row_ids:
+            placeholders = ','.join('?' * len(row_ids))
+            cursor.execute(f'''
+                SELECT patient_id, email, name, language, attempts 
+                FROM campaign_recipients 
+                WHERE rowid IN ({placeholders}) 
+                ORDER BY patient_id
+            ''', row_ids)
+            recipients = cursor.fetchall()
+        
+        conn.commit()
+        conn.close()
+        if self.pii is not None:
+            recipients = self.pii.open_rows(recipients, (1, 2))
+        return recipients
+    
+    def complete_campaign_recipient(self, campaign_id, patient_id, success, error=None, final=True):
+        """Címzett küldési eredményének rögzítése és a kampány számlálóinak frissítése (egy tranzakcióban)
+        
+        Sikertelen, de nem végleges próbálkozásnál a címzett újra küldendő lesz.
+        """
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        
+        if success:
+            cursor.execute('''
+                UPDATE campaign_recipients 
+                SET status = 'sent', sent_at = ?, attempts = attempts + 1, error = NULL, 
+                    claimed_by = NULL, claimed_until = NULL 
+                WHERE campaign_id = ? AND patient_id = ? AND status = 'pending'
+            ''', (now_str, campaign_id, patient_id))
+            if cursor.rowcount:
+                cursor.execute('UPDATE campaigns SET sent_count = sent_count + 1 WHERE id = ?', (campaign_id,))
+                cursor.execute('UPDATE patients SET last_contacted_at = ? WHERE id = ?', (now_str, patient_id))
+        elif final:
+            cursor.execute('''
+                UPDATE campaign_recipients 
+                SET status = 'failed', attempts = attempts + 1, error = ?, claimed_by = NULL, claimed_until = NULL 
+                WHERE campaign_id = ? AND patient_id = ? AND status = 'pending'
+            ''', (error, campaign_id, patient_id))
+            if cursor.rowcount:
+                cursor.execute('UPDATE campaigns SET failed_count = failed_count + 1 WHERE id = ?', (campaign_id,))
+        else:
+            cursor.execute('''
+                UPDATE campaign_recipients 
+                SET attempts = attempts + 1, error = ?, claimed_by = NULL, claimed_until = NULL 
+                WHERE campaign_id = ? AND patient_id = ? AND status = 'pending'
+            ''', (error, campaign_id, patient_id))
+        
+        conn.commit()
+        conn.close()
+    
+    def release_campaign_claims(self, owner, campaign_id=None, patient_ids=None):
+        """Saját kampány foglalások feloldása (kampányra / címzettekre szűkíthető)"""
+        conditions = ["claimed_by = ?", "status = 'pending'"]
+        params = [owner]
+        if campaign_id is not None:
+            conditions.append('campaign_id = ?')
+            params.append(campaign_id)
+        if patient_ids is not None:
+            conditions.append('patient_id IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps(list(patient_ids)))
+        
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute(f"UPDATE campaign_recipients SET claimed_by = NULL, claimed_until = NULL WHERE {' AND '.join(conditions)}",
+                       params)
+        released = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return released
+    
+    def finish_campaign_if_done(self, campaign_id):
+        """Futó kampány lezárása, ha nincs több küldendő címzett; True, ha lezárult"""
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._connect(timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE campaigns SET status = 'completed', finished_at = ? 
+            WHERE id = ? AND status = 'running' 
+            AND NOT EXISTS (SELECT 1 FROM campaign_recipients WHERE campaign_id = ? AND status = 'pending')
+        ''', (now_str, campaign_id, campaign_id))
+        finished = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return finished
+    
+    def mark_reminder_sent(self, event_id, offset_key=None):
+        """Emlékeztető küldés megjelölése (offset nélkül az esemény összes emlékeztetője)"""
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        conn = self._connect()
         cursor = conn.cursor()
+        if offset_key is None:
+            cursor.execute('''
+                UPDATE event_reminders 
+                SET sent_at = ?, claimed_by = NULL, claimed_until = NULL 
+                WHERE event_id = ? AND sent_at IS NULL
+            ''', (now_str, event_id))
+        else:
+            cursor.execute('''
+                UPDATE event_reminders 
+                SET sent_at = ?, claimed_by = NULL, claimed_until = NULL 
+                WHERE event_id = ? AND offset_key = ?
+            ''', (now_str, event_id, offset_key))
+        # Összesítő jelző a naptár nézethez
         cursor.execute('UPDATE calendar_events SET reminder_sent = 1 WHERE id = ?', (event_id,))
+        self._mark_event_patient_contacted(cursor, event_id, now_str)
         conn.commit()
         conn.close()
     
     def mark_new_appointment_notified(self, event_id):
         """Új időpont értesítés megjelölése"""
-        conn = sqlite3.connect(self.db_name)
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE calendar_events 
+            SET new_appointment_notified = 1, notify_claimed_by = NULL, notify_claimed_until = NULL 
+            WHERE id = ?
+        ''', (event_id,))
+        self._mark_event_patient_contacted(cursor, event_id, now_str)
+        conn.commit()
+        conn.close()
+    
+    def _mark_event_patient_contacted(self, cursor, event_id, now_str):
+        """Az eseményhez tartozó páciens utolsó kapcsolatfelvételi idejének frissítése"""
+        cursor.execute('''
+            UPDATE patients SET last_contacted_at = ? 
+            WHERE email_key = email_key((SELECT patient_email FROM calendar_events WHERE id = ?))
+        ''', (now_str, event_id))
+    
+    def mark_patient_contacted(self, email):
+        """Páciens utolsó kapcsolatfelvételi idejének frissítése (egyedi email küldés után)"""
+        conn = self._connect()
         cursor = conn.cursor()
-        cursor.execute('UPDATE calendar_events SET new_appointment_notified = 1 WHERE id = ?', (event_id,))
+        cursor.execute('UPDATE patients SET last_contacted_at = ? WHERE email_key = ?',
+                       (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), self.email_key(email)))
         conn.commit()
         conn.close()
     
     def delete_calendar_event(self, event_id):
-        """Naptár esemény törlése"""
+        """Naptár esemény törlése (sorozat előfordulásnál kivételként is rögzítve, hogy ne jöjjön vissza)"""
         try:
-            conn = sqlite3.connect(self.db_name)
+            conn = self._connect()
             cursor = conn.cursor()
+            cursor.execute('''
+                SELECT s.series_key, e.google_event_id FROM calendar_events e 
+                JOIN calendar_series s ON s.id = e.series_id WHERE e.id = ?
+            ''', (event_id,))
+            occurrence = cursor.fetchone()
+            if occurrence:
+                self.add_calendar_series_exceptions({occurrence[0]: [occurrence[1][len(occurrence[0]) + 1:]]})
+            
             cursor.execute('DELETE FROM calendar_events WHERE id = ?', (event_id,))
-            conn.commit()
             deleted_count = cursor.rowcount
+            cursor.execute('DELETE FROM reminder_queue WHERE event_id = ?', (event_id,))
+            cursor.execute('DELETE FROM event_reminders WHERE event_id = ?', (event_id,))
+            conn.commit()
             conn.close()
             return deleted_count > 0
         except Exception as e:
             print(f"Naptár esemény törlési hiba: {str(e)}")
             return False
     
-    def add_log(self, level, message, patient_email=None):
-        """Napló bejegyzés hozzáadása"""
-        conn = sqlite3.connect(self.db_name)
+    def add_log(self, level, message, patient_email=None, patient_name=None):
+        """Napló bejegyzés hozzáadása
+        
+        Titkosított páciens adatoknál a napló nem tárol nyílt személyes adatot:
+        a páciens email címe és neve kikerül az üzenetből, a patient_email
+        oszlopba az email vak indexe kerül (a páciens szerinti szűrés így is működik).
+        """
+        if self.pii is not None:
+            message = self._redact_log_message(message, patient_email, patient_name)
+            patient_email = self.email_key(patient_email) if patient_email else None
+        
+        conn = self._connect()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO logs (level, message, patient_email) 
@@ -346,26 +2314,183 @@ Mit freundlichen Grüßen,
         conn.commit()
         conn.close()
     
-    def get_logs(self, limit=100):
-        """Napló bejegyzések lekérése"""
-        conn = sqlite3.connect(self.db_name)
+    @staticmethod
+    def _redact_log_message(message, patient_email=None, patient_name=None):
+        """Páciens email cím és név cseréje helyettesítő szövegre a napló üzenetben"""
+        if patient_email:
+            message = message.replace(patient_email, '[email]')
+        if patient_name:
+            message = message.replace(patient_name, '[név]')
+        return message
+    
+    def _log_filter(self, level=None, patient_email=None):
+        """Napló lekérdezések szint / páciens email feltételei"""
+        conditions = []
+        params = []
+        if level:
+            conditions.append('level = ?')
+            params.append(level)
+        if patient_email:
+            conditions.append('patient_email = ?')
+            params.append(self.email_key(patient_email) if self.pii is not None else patient_email)
+        return conditions, params
+    
+    def _open_log_rows(self, rows, column=4):
+        """Titkosított módban a napló sorok vak indexének cseréje a páciens email címére
+        
+        Ismeretlen (pl. azóta törölt páciensre mutató) indexnél helyettesítő szöveg kerül a helyére.
+        """
+        if self.pii is None or not rows:
+            return rows
+        
+        _, patients, orderings = self._pii_patients()
+        # A vak index -> email térkép a pillanatkép mellett, annak érvényességéig
+        emails = orderings.get('log_emails')
+        if emails is None:
+            emails = {self.pii.blind_index(row[2]): row[2] for row in patients if row[2]}
+            orderings['log_emails'] = emails
+        
+        return [row[:column] + (emails.get(row[column], '[ismeretlen páciens]') if row[column] else row[column],)
+                + row[column + 1:] for row in rows]
+    
+    def get_logs_after(self, after_id=0, level=None, patient_email=None, limit=500):
+        """Az after_id-nál újabb napló bejegyzések, id szerint növekvő sorrendben (élő követéshez)
+        
+        Sorok: (id, timestamp, level, message, patient_email)
+        """
+        conditions, params = self._log_filter(level, patient_email)
+        conditions.append('id > ?')
+        params.append(after_id)
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT id, timestamp, level, message, patient_email 
+            FROM logs 
+            WHERE {' AND '.join(conditions)} 
+            ORDER BY id 
+            LIMIT ?
+        ''', params + [limit])
+        logs = cursor.fetchall()
+        conn.close()
+        return self._open_log_rows(logs)
+    
+    def get_logs_before(self, before_id=None, level=None, patient_email=None, limit=200):
+        """A before_id-nál régebbi napló bejegyzések, id szerint csökkenő sorrendben (keyset lapozás)
+        
+        before_id=None esetén a legfrissebb bejegyzésekkel kezd.
+        Sorok: (id, timestamp, level, message, patient_email)
+        """
+        conditions, params = self._log_filter(level, patient_email)
+        if before_id is not None:
+            conditions.append('id < ?')
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        conn = self._connect()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT timestamp, level, message, patient_email 
+        cursor.execute(f'''
+            SELECT id, timestamp, level, message, patient_email 
             FROM logs 
-            ORDER BY timestamp DESC 
+            {where} 
+            ORDER BY id DESC 
             LIMIT ?
-        ''', (limit,))
+        ''', params + [limit])
         logs = cursor.fetchall()
         conn.close()
-        return logs
+        return self._open_log_rows(logs)
+    
+    # Exportálható táblák: oszlopok (név, típus) és a dátum szűrő oszlopa
+    EXPORT_TABLES = {
+        'patients': {
+            'columns': [('id', 'int'), ('name', 'text'), ('email', 'text'), ('phone', 'text'),
+                        ('language', 'text'), ('created_at', 'text'), ('active', 'int'),
+                        ('last_contacted_at', 'text')],
+            'date_column': 'created_at',
+        },
+        'calendar_events': {
+            'columns': [('id', 'int'), ('google_event_id', 'text'), ('patient_email', 'text'),
+                        ('event_title', 'text'), ('event_description', 'text'), ('start_time', 'text'),
+                        ('end_time', 'text'), ('created_at', 'text'), ('reminder_sent', 'int'),
+                        ('is_new_appointment', 'int'), ('new_appointment_notified', 'int')],
+            'date_column': 'start_time',
+        },
+        'logs': {
+            'columns': [('id', 'int'), ('timestamp', 'text'), ('level', 'text'), ('message', 'text'),
+                        ('patient_email', 'text')],
+            'date_column': 'timestamp',
+        },
+    }
+    
+    def iter_export_rows(self, table, columns, date_from=None, date_to=None, chunk_size=10000):
+        """Tábla sorai exporthoz, adagonként (egyetlen kurzorból fetchmany-vel)
+        
+        A kurzor végig nyitva marad, így a memóriahasználat az adag
+        méretétől függ, nem a tábla méretétől. WAL módban az olvasás nem
+        blokkolja a közben futó írásokat. date_from / date_to: YYYY-MM-DD,
+        zárt intervallum a tábla dátum oszlopán.
+        """
+        date_column = self.EXPORT_TABLES[table]['date_column']
+        conditions = []
+        params = []
+        if date_from:
+            conditions.append(f'{date_column} >= ?')
+            params.append(f"{date_from} 00:00:00")
+        if date_to:
+            conditions.append(f'{date_column} < ?')
+            params.append((datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S'))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        # Titkosított páciens mezők adagonkénti (párhuzamos) visszafejtése
+        pii_columns = tuple(index for index, column in enumerate(columns) if column in ('name', 'email', 'phone'))
+        if table != 'patients' or self.pii is None:
+            pii_columns = ()
+        # Napló: a vak index helyett a páciens email címe
+        log_email_column = columns.index('patient_email') if table == 'logs' and 'patient_email' in columns else None
+        
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {table} {where} ORDER BY id", params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if log_email_column is not None:
+                    rows = self._open_log_rows(rows, log_email_column)
+                yield self.pii.open_rows(rows, pii_columns) if pii_columns else rows
+        finally:
+            conn.close()
 
 class SecurityManager:
-    """Biztonsági kezelő osztály"""
-    def __init__(self):
-        self.key_file = "encryption.key"
+    """Biztonsági kezelő osztály
+    
+    Folyamatonként kulcsfájlonként egy példány (shared()), így a kulcsot
+    egyszer olvassuk be és egy Fernet objektum szolgál ki mindenkit. A
+    visszafejtett jelszavak rövid ideig (SECRET_CACHE_SECONDS) memóriában
+    maradnak, így a kötegelt küldés nem fejt vissza üzenetenként; a
+    jelszó módosításakor forget_secrets() üríti a gyorsítótárat.
+    """
+    SECRET_CACHE_SECONDS = 300
+    
+    _instances = {}     # kulcsfájl -> példány
+    _instances_lock = threading.Lock()
+    
+    def __init__(self, key_file="encryption.key"):
+        self.key_file = key_file
         self.key = self.load_or_create_key()
         self.cipher_suite = Fernet(self.key)
+        self.secret_cache = {}  # titkosított jelszó -> (visszafejtett jelszó, lejárat)
+        self.secret_lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls, key_file="encryption.key"):
+        """A folyamat közös példánya az adott kulcsfájlhoz"""
+        with cls._instances_lock:
+            instance = cls._instances.get(key_file)
+            if instance is None:
+                instance = cls._instances[key_file] = cls(key_file)
+            return instance
     
     def load_or_create_key(self):
         """Titkosítási kulcs betöltése vagy létrehozása"""
@@ -383,8 +2508,148 @@ class SecurityManager:
         return self.cipher_suite.encrypt(password.encode()).decode()
     
     def decrypt_password(self, encrypted_password):
-        """Jelszó visszafejtése"""
-        return self.cipher_suite.decrypt(encrypted_password.encode()).decode()
+        """Jelszó visszafejtése (rövid ideig gyorsítótárazva)"""
+        now = time.monotonic()
+        with self.secret_lock:
+            cached = self.secret_cache.get(encrypted_password)
+            if cached is not None and cached[1] > now:
+                return cached[0]
+        
+        password = self.cipher_suite.decrypt(encrypted_password.encode()).decode()
+        with self.secret_lock:
+            self.secret_cache[encrypted_password] = (password, now + self.SECRET_CACHE_SECONDS)
+        return password
+    
+    def forget_secrets(self):
+        """Visszafejtett jelszavak törlése a memóriából (pl. jelszócsere után)"""
+        with self.secret_lock:
+            self.secret_cache.clear()
+
+class PiiCipher:
+    """Páciens személyes adatainak (név, email, telefon) mezőszintű titkosítása
+    
+    Az értékek Fernet tokenként, 'enc:' előtaggal tárolódnak, a SecurityManager
+    kulcsával; az előtag nélküli (régi, titkosítatlan) értékek változatlanul
+    olvashatók. Az email szerinti egyenlőségi kereséshez kulcsolt vak index
+    (a normalizált cím HMAC-SHA256 értéke) kerül a patients.email_key
+    oszlopba; a HMAC kulcs a Fernet kulcsból származik, így külön kulcsfájl
+    nem kell. Listákhoz és exporthoz open_rows() adagonként, szálkészleten
+    fejt vissza, a visszafejtett mezőket LRU gyorsítótárban tartja.
+    """
+    PREFIX = 'enc:'
+    CACHE_SIZE = 200000         # Gyorsítótárazott visszafejtett sorok (mezőcsoportok) száma
+    PARALLEL_THRESHOLD = 512    # Ennél kevesebb sort egy szálon fejtünk vissza
+    CHUNK_SIZE = 1000
+    
+    def __init__(self, security_manager):
+        self.cipher_suite = security_manager.cipher_suite
+        self.index_key = hmac.new(security_manager.key, b'patient-email-blind-index', hashlib.sha256).digest()
+        self.cache = OrderedDict()  # titkosított mezők -> visszafejtett mezők
+        self.cache_lock = threading.Lock()
+        self.executor = None
+        self.executor_lock = threading.Lock()
+    
+    def seal(self, value):
+        """Érték titkosítása (üres érték és már titkosított érték változatlan)
+        
+        A token a gyorsítótárba is bekerül, így a frissen írt sorok
+        (pl. import után) visszafejtés nélkül olvashatók.
+        """
+        if not value or value.startswith(self.PREFIX):
+            return value
+        sealed = self.PREFIX + self.cipher_suite.encrypt(value.encode()).decode()
+        self._cache_put((sealed,), (value,))
+        return sealed
+    
+    def open(self, value):
+        """Érték visszafejtése (titkosítatlan érték változatlan)"""
+        if not isinstance(value, str) or not value.startswith(self.PREFIX):
+            return value
+        return self.cipher_suite.decrypt(value[len(self.PREFIX):].encode()).decode()
+    
+    def open_cached(self, value):
+        """Egy érték visszafejtése a gyorsítótáron keresztül (SQL függvényekhez)"""
+        if not isinstance(value, str) or not value.startswith(self.PREFIX):
+            return value
+        with self.cache_lock:
+            cached = self.cache.get((value,))
+            if cached is not None:
+                self.cache.move_to_end((value,))
+                return cached[0]
+        opened = self.open(value)
+        self._cache_put((value,), (opened,))
+        return opened
+    
+    def _cache_put(self, key, values):
+        with self.cache_lock:
+            self.cache[key] = values
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.CACHE_SIZE:
+                self.cache.popitem(last=False)
+    
+    def blind_index(self, email):
+        """Kulcsolt vak index a normalizált email címre"""
+        normalized = (email or '').strip().lower()
+        return hmac.new(self.index_key, normalized.encode(), hashlib.sha256).hexdigest()
+    
+    def _open_value(self, value):
+        # Az ebben a folyamatban titkosított mezők (seal) visszafejtés nélkül
+        cached = self.cache.get((value,))
+        return cached[0] if cached is not None else self.open(value)
+    
+    def _open_values(self, chunk):
+        return [tuple(self._open_value(value) for value in values) for values in chunk]
+    
+    def _pool(self):
+        with self.executor_lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1),
+                                                   thread_name_prefix='pii')
+            return self.executor
+    
+    def open_rows(self, rows, columns):
+        """Sorok megadott oszlopainak visszafejtése (sorrendtartó, LRU gyorsítótárral)
+        
+        A gyorsítótár kulcsa a titkosított mezők együttese, így egy módosított
+        sor (új token) automatikusan újra visszafejtődik. A hiányzó sorokat
+        PARALLEL_THRESHOLD felett CHUNK_SIZE-os adagokban a szálkészlet fejti vissza.
+        """
+        keys = [tuple(row[column] for column in columns) for row in rows]
+        opened = {}
+        missing = []
+        with self.cache_lock:
+            for key in keys:
+                if key in opened:
+                    continue
+                values = self.cache.get(key)
+                if values is None:
+                    opened[key] = None
+                    missing.append(key)
+                else:
+                    self.cache.move_to_end(key)
+                    opened[key] = values
+        
+        if missing:
+            if len(missing) < self.PARALLEL_THRESHOLD:
+                results = self._open_values(missing)
+            else:
+                chunks = [missing[start:start + self.CHUNK_SIZE] for start in range(0, len(missing), self.CHUNK_SIZE)]
+                results = [values for chunk in self._pool().map(self._open_values, chunks) for values in chunk]
+            
+            with self.cache_lock:
+                for key, values in zip(missing, results):
+                    opened[key] = values
+                    self.cache[key] = values
+                while len(self.cache) > self.CACHE_SIZE:
+                    self.cache.popitem(last=False)
+        
+        result = []
+        for row, key in zip(rows, keys):
+            row = list(row)
+            for column, value in zip(columns, opened[key]):
+                row[column] = value
+            result.append(tuple(row))
+        return result
 
 class GoogleCalendarManager:
     """Google Calendar kezelő osztály"""
@@ -403,6 +2668,12 @@ class GoogleCalendarManager:
         if not GOOGLE_API_AVAILABLE:
             raise ImportError("Google API kliens nincs telepítve")
         
+        # Késleltetett import (lásd GOOGLE_API_AVAILABLE)
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
+        
         creds = None
         
         # Token fájl ellenőrzése
@@ -430,7 +2701,13 @@ class GoogleCalendarManager:
         return True
     
     def get_upcoming_events(self, days_ahead=30):
-        """Következő események lekérése"""
+        """Következő események lekérése
+        
+        Az ismétlődő események nem példányonként jönnek (singleEvents=False):
+        a sorozat egyszer, 'recurrence' szabállyal, a módosított / lemondott
+        példányok recurringEventId-vel. Így a letöltött adat a sorozatok
+        számával arányos, nem az előfordulásokéval.
+        """
         if not self.service:
             self.authenticate()
         
@@ -438,20 +2715,25 @@ class GoogleCalendarManager:
         now = datetime.utcnow().isoformat() + 'Z'
         end_time = (datetime.utcnow() + timedelta(days=days_ahead)).isoformat() + 'Z'
         
-        # Események lekérése
-        events_result = self.service.events().list(
-            calendarId='primary',
-            timeMin=now,
-            timeMax=end_time,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
-        return events
+        # Események lekérése (oldalanként)
+        events = []
+        page_token = None
+        while True:
+            events_result = self.service.events().list(
+                calendarId='primary',
+                timeMin=now,
+                timeMax=end_time,
+                singleEvents=False,
+                pageToken=page_token
+            ).execute()
+            events.extend(events_result.get('items', []))
+            page_token = events_result.get('nextPageToken')
+            if not page_token:
+                return events
     
-    def parse_event_for_patient(self, event):
-        """Esemény elemzése páciens adatok kinyerésére"""
+    @staticmethod
+    def parse_event_for_patient(event):
+        """Esemény elemzése páciens adatok kinyerésére (Google és ICS események)"""
         # Egyszerű email keresés a leírásban vagy címben
         description = event.get('description', '')
         summary = event.get('summary', '')
@@ -465,26 +2747,641 @@ class GoogleCalendarManager:
         if emails:
             return emails[0]  # Első email visszaadása
         
+        # Különben az első résztvevő, aki nem a naptár tulajdonosa
+        for attendee in event.get('attendees', []):
+            if attendee.get('email') and not attendee.get('self') and not attendee.get('organizer'):
+                return attendee['email']
+        
         return None
 
-class EmailManager:
-    """Email kezelő osztály"""
-    def __init__(self, config_manager):
-        self.config_manager = config_manager
-        self.security_manager = SecurityManager()
+class IcsCalendar:
+    """iCalendar (.ics) fájlok importja és exportja (offline naptár forrás)
     
-    def send_email(self, to_email, subject, body, patient_name=""):
-        """Email küldése"""
-        try:
-            config = self.config_manager.get_email_config()
+    Az import soronként olvassa a fájlt (nagy praxisszoftver exportok is
+    elférnek a memóriában), a pácienst ugyanúgy azonosítja, mint a Google
+    szinkron, és a Google szinkronnal közös tömeges upsert útvonalon ír.
+    Az ismétlődő eseményeket (RRULE) sorozatként tárolja; előfordulásaik
+    csak a lekérdezett ablakokra bontódnak ki (DatabaseManager.materialize_series).
+    A Google szinkron is ezt az importot használja (from_google).
+    """
+    
+    BATCH_SIZE = 2000   # Események száma tranzakciónként
+    UID_DOMAIN = 'patient-reminder'  # Saját export UID utótagja (visszaimportáláskor ugyanaz az esemény)
+    LINE_LIMIT = 75     # Sorhossz oktettben (RFC 5545 sorhajtogatás)
+    
+    def __init__(self, db_manager, id_prefix='ics:'):
+        self.db_manager = db_manager
+        self.id_prefix = id_prefix  # google_event_id előtag (Google szinkronnál üres)
+        self.timezones = {}
+    
+    # --- Beolvasás ---
+    
+    @staticmethod
+    def iter_lines(file_obj):
+        """Logikai sorok a hajtogatott (szóközzel / tabbal folytatott) sorok összefűzésével"""
+        current = None
+        for raw_line in file_obj:
+            line = raw_line.rstrip('\r\n')
+            if line[:1] in (' ', '\t'):
+                if current is not None:
+                    current += line[1:]
+                continue
+            if current is not None:
+                yield current
+            current = line
+        if current:
+            yield current
+    
+    @staticmethod
+    def split_property(line):
+        """'NÉV;PARAM=ÉRTÉK:érték' sor felbontása (név, paraméterek, érték) hármasra"""
+        colon = line.find(':')
+        if colon < 0:
+            return line.upper(), {}, ''
+        head = line[:colon]
+        if '"' in head:
+            # Idézőjeles paraméterérték kettőspontot is tartalmazhat
+            in_quotes = False
+            for index, char in enumerate(line):
+                if char == '"':
+                    in_quotes = not in_quotes
+                elif char == ':' and not in_quotes:
+                    colon = index
+                    break
+            head = line[:colon]
+        
+        name, _, param_text = head.partition(';')
+        params = {}
+        if param_text:
+            for param in param_text.split(';'):
+                key, _, value = param.partition('=')
+                params[key.upper()] = value.strip('"')
+        return name.upper(), params, line[colon + 1:]
+    
+    @staticmethod
+    def unescape(value):
+        """TEXT érték visszaalakítása (escape-elt sortörés, vessző, pontosvessző, backslash)"""
+        if '\\' not in value:
+            return value
+        result = []
+        index = 0
+        while index < len(value):
+            char = value[index]
+            if char == '\\' and index + 1 < len(value):
+                index += 1
+                char = value[index]
+                result.append('\n' if char in 'nN' else char)
+            else:
+                result.append(char)
+            index += 1
+        return ''.join(result)
+    
+    @staticmethod
+    def escape(value):
+        """Szöveg TEXT értékké alakítása"""
+        return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+                .replace('\r\n', '\\n').replace('\n', '\\n'))
+    
+    def iter_events(self, file_obj):
+        """VEVENT komponensek szótárként, egyenként (a beágyazott VALARM stb. kihagyva)"""
+        event = None
+        nested = 0
+        for line in self.iter_lines(file_obj):
+            if not line:
+                continue
+            name, params, value = self.split_property(line)
             
-            # SMTP szerver kapcsolat
-            server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-            server.starttls()
+            if name == 'BEGIN':
+                if event is not None:
+                    nested += 1
+                elif value.upper() == 'VEVENT':
+                    event = {'exdate': [], 'rdate': [], 'attendees': []}
+                continue
+            if name == 'END':
+                if nested:
+                    nested -= 1
+                elif event is not None and value.upper() == 'VEVENT':
+                    yield event
+                    event = None
+                continue
+            if event is None or nested:
+                continue
             
-            # Jelszó visszafejtése
-            password = self.security_manager.decrypt_password(config['password'])
-            server.login(config['email'], password)
+            if name in ('SUMMARY', 'DESCRIPTION'):
+                event[name.lower()] = self.unescape(value)
+            elif name in ('UID', 'RRULE', 'DURATION'):
+                event[name.lower()] = value.strip()
+            elif name == 'STATUS':
+                event['status'] = value.strip().upper()
+            elif name in ('DTSTART', 'DTEND', 'RECURRENCE-ID'):
+                try:
+                    event[name.lower()] = self.parse_datetime(value.strip(), params)
+                except ValueError:
+                    event[name.lower()] = None  # Hibás időpont: az esemény kimarad
+                if name == 'DTSTART':
+                    event['all_day'] = params.get('VALUE') == 'DATE' or len(value.strip()) == 8
+            elif name in ('EXDATE', 'RDATE'):
+                try:
+                    event[name.lower()].extend(self.parse_datetime(item.strip(), params)
+                                               for item in value.split(',') if item.strip())
+                except ValueError:
+                    pass
+            elif name == 'ATTENDEE':
+                if value[:7].lower() == 'mailto:':
+                    event['attendees'].append({'email': value[7:].strip()})
+    
+    def _timezone(self, tzid):
+        """TZID -> tzinfo (ismeretlen, pl. Windows zónanév esetén None: helyi időként kezelve)"""
+        if tzid not in self.timezones:
+            try:
+                from zoneinfo import ZoneInfo
+                self.timezones[tzid] = ZoneInfo(tzid)
+            except Exception:
+                self.timezones[tzid] = None
+        return self.timezones[tzid]
+    
+    def parse_datetime(self, value, params):
+        """DATE / DATE-TIME érték: UTC és TZID esetén időzóna-tudatos, egyébként helyi (floating) datetime"""
+        # Szeletelés strptime helyett (nagy fájlban ez a leggyakoribb művelet)
+        if params.get('VALUE') == 'DATE' or len(value) == 8:
+            return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+        if value[8:9] != 'T':
+            raise ValueError(f"Hibás dátum: {value}")
+        parsed = datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]),
+                          int(value[9:11]), int(value[11:13]), int(value[13:15]))
+        if value.endswith('Z'):
+            return parsed.replace(tzinfo=timezone.utc)
+        tzinfo = self._timezone(params['TZID']) if 'TZID' in params else None
+        return parsed.replace(tzinfo=tzinfo) if tzinfo else parsed
+    
+    @staticmethod
+    def to_local(value):
+        """Adatbázisban tárolt helyi idő (időzóna nélkül)"""
+        return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+    
+    @staticmethod
+    def _align(value, reference):
+        """Dátum igazítása a DTSTART-hoz (dateutil csak azonos időzóna-tudatosságú értékeket hasonlít)"""
+        if reference.tzinfo and not value.tzinfo:
+            return value.replace(tzinfo=reference.tzinfo)
+        if value.tzinfo and not reference.tzinfo:
+            return value.astimezone().replace(tzinfo=None)
+        return value
+    
+    @staticmethod
+    def occurrence_key(value):
+        """Előfordulás kulcs: a RECURRENCE-ID és a kibontott időpont ugyanarra a kulcsra képeződik"""
+        if value.tzinfo:
+            return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        return value.strftime('%Y%m%dT%H%M%S')
+    
+    def event_id(self, uid):
+        """calendar_events.google_event_id / sorozat kulcs az UID-ból (saját export visszaimportálva ugyanaz a sor)
+        
+        Egy sorozat előfordulásának azonosítója: '{sorozat kulcs}:{occurrence_key}'.
+        """
+        suffix = '@' + self.UID_DOMAIN
+        if uid.endswith(suffix):
+            return uid[:-len(suffix)]
+        return f"{self.id_prefix}{uid}"
+    
+    def duration(self, event):
+        """Esemény hossza (DTEND vagy DURATION alapján, alapértelmezés: egész napos / 0)"""
+        start = event['dtstart']
+        if event.get('dtend'):
+            return self._align(event['dtend'], start) - start
+        if event.get('duration'):
+            import re
+            match = re.match(r'([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$',
+                             event['duration'].upper())
+            if match:
+                sign, weeks, days, hours, minutes, seconds = match.groups()
+                delta = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                                  minutes=int(minutes or 0), seconds=int(seconds or 0))
+                return -delta if sign == '-' else delta
+        return timedelta(days=1) if event.get('all_day') else timedelta(0)
+    
+    def rule_set(self, event):
+        """dateutil rruleset az esemény RRULE / RDATE / EXDATE értékeiből"""
+        from dateutil.rrule import rrulestr, rruleset
+        import re
+        
+        start = event['dtstart']
+        # UNTIL a DTSTART időzóna-tudatosságához igazítva (a dateutil eltérés esetén hibát dob)
+        rule_text = event['rrule']
+        until = None
+        match = re.search(r'UNTIL=([0-9TZ]+);?', rule_text, re.IGNORECASE)
+        if match:
+            until = self._align(self.parse_datetime(match.group(1).upper(), {}), start)
+            rule_text = (rule_text[:match.start()] + rule_text[match.end():]).rstrip(';')
+        
+        rule = rrulestr(rule_text, dtstart=start)
+        if until is not None:
+            rule = rule.replace(until=until)
+        
+        occurrences = rruleset()
+        occurrences.rrule(rule)
+        for value in event['rdate']:
+            occurrences.rdate(self._align(value, start))
+        for value in event['exdate']:
+            occurrences.exdate(self._align(value, start))
+        return occurrences
+    
+    def expand(self, event, window_start, window_end):
+        """Ismétlődő esemény előfordulásai a [window_start, window_end] ablakban (helyi időben megadva)
+        
+        Napi / heti szabálynál (COUNT nélkül) a DTSTART az ablak elé, az
+        intervallum egész többszörösével előre tolódik, így a kibontás nem
+        a sorozat (akár évekkel korábbi) kezdetétől lépked.
+        """
+        import re
+        
+        start = event['dtstart']
+        if start.tzinfo:
+            window_start = window_start.astimezone(start.tzinfo)
+            window_end = window_end.astimezone(start.tzinfo)
+        
+        rule_text = event['rrule'].upper()
+        frequency = re.search(r'FREQ=(DAILY|WEEKLY)', rule_text)
+        if frequency and 'COUNT=' not in rule_text:
+            interval = re.search(r'INTERVAL=(\d+)', rule_text)
+            period = timedelta(days=int(interval.group(1) if interval else 1) * (7 if frequency.group(1) == 'WEEKLY' else 1))
+            steps = (window_start - start) // period - 1
+            if steps > 0:
+                event = dict(event, dtstart=start + steps * period)
+        
+        return self.rule_set(event).between(window_start, window_end, inc=True)
+    
+    # --- Ismétlődő sorozatok (egyszer tárolva, lekérdezéskor kibontva) ---
+    
+    def _series_value(self, value, reference, all_day):
+        """Dátum ICS alakban a sorozat (DTSTART) időzónájában"""
+        value = self._align(value, reference)
+        if value.tzinfo:
+            value = value.astimezone(reference.tzinfo)
+        return value.strftime('%Y%m%d' if all_day else '%Y%m%dT%H%M%S')
+    
+    def series_row(self, event, exception_keys=()):
+        """calendar_series sor (DatabaseManager.SERIES_COLUMNS) egy RRULE-os eseményből
+        
+        A DTSTART a saját időzónájában (TZID) tárolódik, így a kibontás a
+        nyári / téli időszámítás váltásakor is a helyes helyi időt adja.
+        Az EXDATE és a módosított előfordulások kulcsai a kivételek közé kerülnek.
+        """
+        start = event['dtstart']
+        all_day = event.get('all_day', False)
+        tzid = None
+        if start.tzinfo:
+            tzid = getattr(start.tzinfo, 'key', None)
+            if not tzid:  # Fix eltolás (pl. Google timeZone nélkül): UTC-ben tárolva
+                start = start.astimezone(timezone.utc)
+                tzid = 'UTC'
+        event = dict(event, dtstart=start)
+        
+        rule_set = self.rule_set(event)
+        last_start = None
+        if 'COUNT=' in event['rrule'].upper() or 'UNTIL=' in event['rrule'].upper():
+            for last_start in rule_set:
+                pass
+        
+        exceptions = {self.occurrence_key(self._align(value, start)) for value in event['exdate']}
+        exceptions.update(exception_keys)
+        
+        return {
+            'series_key': self.event_id(event['uid']),
+            'patient_email': GoogleCalendarManager.parse_event_for_patient(event),
+            'event_title': event.get('summary') or 'Ismeretlen esemény',
+            'event_description': event.get('description', ''),
+            'dtstart': self._series_value(start, start, all_day),
+            'tzid': tzid,
+            'duration_seconds': int(self.duration(event).total_seconds()),
+            'rrule': event['rrule'],
+            'rdates': json.dumps([self._series_value(value, start, all_day) for value in event['rdate']]),
+            'exceptions': json.dumps(sorted(exceptions)),
+            'first_start': self.to_local(start).strftime('%Y-%m-%d %H:%M:%S'),
+            'last_start': self.to_local(last_start).strftime('%Y-%m-%d %H:%M:%S') if last_start else None
+        }
+    
+    def series_occurrences(self, series, window_start, window_end):
+        """Tárolt sorozat előfordulásai az ablakban, upsert sorokként (series_id-vel, kivételek nélkül)"""
+        params = {'TZID': series['tzid']} if series['tzid'] else {}
+        event = {
+            'dtstart': self.parse_datetime(series['dtstart'], params),
+            'rrule': series['rrule'],
+            'rdate': [self.parse_datetime(value, params) for value in json.loads(series['rdates'] or '[]')],
+            'exdate': []
+        }
+        exceptions = set(json.loads(series['exceptions'] or '[]'))
+        length = timedelta(seconds=series['duration_seconds'] or 0)
+        
+        rows = []
+        for start in self.expand(event, window_start, window_end):
+            key = self.occurrence_key(start)
+            if key in exceptions:
+                continue
+            rows.append((
+                f"{series['series_key']}:{key}", series['patient_email'], series['event_title'],
+                series['event_description'], self.to_local(start).strftime('%Y-%m-%d %H:%M:%S'),
+                self.to_local(start + length).strftime('%Y-%m-%d %H:%M:%S'), False, series['id']
+            ))
+        return rows
+    
+    def from_google(self, event):
+        """Google Calendar esemény (singleEvents=False) átalakítása az ICS olvasó formátumára
+        
+        A sorozat fő eseménye a 'recurrence' sorokat (RRULE / EXDATE / RDATE)
+        hordozza, a módosított / lemondott példány recurringEventId és
+        originalStartTime mezőt (RECURRENCE-ID megfelelője).
+        """
+        def google_time(value):
+            if not value:
+                return None
+            if 'dateTime' in value:
+                parsed = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+                tzinfo = self._timezone(value['timeZone']) if value.get('timeZone') else None
+                return parsed.astimezone(tzinfo) if tzinfo else parsed
+            return datetime.strptime(value['date'], '%Y-%m-%d')
+        
+        converted = {
+            'uid': event.get('recurringEventId') or event.get('id'),
+            'summary': event.get('summary', ''),
+            'description': event.get('description', ''),
+            'dtstart': google_time(event.get('start')),
+            'dtend': google_time(event.get('end')),
+            'all_day': 'date' in event.get('start', {}),
+            'status': event.get('status', '').upper(),
+            'attendees': event.get('attendees', []),
+            'exdate': [],
+            'rdate': []
+        }
+        if event.get('recurringEventId'):
+            converted['recurrence-id'] = google_time(event.get('originalStartTime'))
+        for line in event.get('recurrence', []):
+            name, params, value = self.split_property(line)
+            if name == 'RRULE':
+                converted['rrule'] = value
+            elif name in ('EXDATE', 'RDATE'):
+                converted[name.lower()].extend(self.parse_datetime(item.strip(), params)
+                                               for item in value.split(',') if item.strip())
+        return converted
+    
+    @staticmethod
+    def format_summary(result):
+        """Import eredmény egy sorban (naplóhoz és üzenethez)"""
+        return (f"{result['events']} esemény és {result['series']} ismétlődő sorozat importálva "
+                f"({result['matched']} pácienshez rendelve), {result['deleted']} lemondott törölve, "
+                f"{result['skipped']} kihagyva")
+    
+    def import_file(self, file_path, cancel_event=None, progress=None):
+        """ICS fájl importja (lásd import_events)"""
+        with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as file_obj:
+            return self.import_events(self.iter_events(file_obj), cancel_event, progress)
+    
+    def import_events(self, events, cancel_event=None, progress=None):
+        """Események importja (ICS olvasó vagy from_google formátum)
+        
+        Visszatérés: {'events', 'series', 'matched', 'deleted', 'skipped'}.
+        Egyszeri esemény a mai naptól kezdve kerül be. Ismétlődő esemény
+        egy calendar_series sorként tárolódik; előfordulásai csak a
+        lekérdezett ablakokra jönnek létre (a végén az emlékeztetők ablaka).
+        A módosított előfordulások (RECURRENCE-ID) külön sorok, kulcsuk a
+        sorozat kivételei közé kerül; a lemondott események törlődnek.
+        """
+        window_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        result = {'events': 0, 'series': 0, 'matched': 0, 'deleted': 0, 'skipped': 0}
+        batch = []
+        series = {}
+        overrides = []
+        cancelled_ids = []
+        cancelled_series = []
+        
+        def add_row(event, event_id, start, length):
+            patient_email = GoogleCalendarManager.parse_event_for_patient(event)
+            batch.append((
+                event_id, patient_email, event.get('summary') or 'Ismeretlen esemény', event.get('description', ''),
+                self.to_local(start).strftime('%Y-%m-%d %H:%M:%S'),
+                self.to_local(start + length).strftime('%Y-%m-%d %H:%M:%S'), False
+            ))
+            if patient_email:
+                result['matched'] += 1
+        
+        def flush():
+            if batch:
+                result['events'] += self.db_manager.upsert_calendar_events_batch(batch)
+                batch.clear()
+                if progress:
+                    progress(result['events'], f"{result['events']} esemény importálva...")
+        
+        for event in events:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            if not event.get('uid'):
+                result['skipped'] += 1
+                continue
+            if event.get('recurrence-id'):
+                # A sorozat után dolgozzuk fel (a forrásban előtte is állhat)
+                overrides.append(event)
+                continue
+            if not event.get('dtstart'):
+                result['skipped'] += 1
+                continue
+            
+            if event.get('rrule'):
+                if event.get('status') == 'CANCELLED':
+                    cancelled_series.append(self.event_id(event['uid']))
+                    continue
+                try:
+                    self.rule_set(event)
+                except (ValueError, TypeError) as e:
+                    print(f"ICS ismétlődési szabály hiba ({event['uid']}): {str(e)}")
+                    result['skipped'] += 1
+                    continue
+                series[event['uid']] = event
+            elif event.get('status') == 'CANCELLED':
+                cancelled_ids.append(self.event_id(event['uid']))
+            elif self.to_local(event['dtstart']) >= window_start:
+                add_row(event, self.event_id(event['uid']), event['dtstart'], self.duration(event))
+            else:
+                result['skipped'] += 1
+            
+            if len(batch) >= self.BATCH_SIZE:
+                flush()
+        
+        # Módosított / lemondott előfordulások: külön sor, a sorozat nem bontja ki újra
+        exception_keys = {}
+        for event in overrides:
+            master = series.get(event['uid'])
+            recurrence_id = self._align(event['recurrence-id'], master['dtstart']) if master else event['recurrence-id']
+            key = self.occurrence_key(recurrence_id)
+            exception_keys.setdefault(event['uid'], set()).add(key)
+            event_id = f"{self.event_id(event['uid'])}:{key}"
+            
+            if event.get('status') == 'CANCELLED' or not event.get('dtstart'):
+                cancelled_ids.append(event_id)
+            elif self.to_local(event['dtstart']) >= window_start:
+                add_row(event, event_id, event['dtstart'], self.duration(event))
+            else:
+                result['skipped'] += 1
+            if len(batch) >= self.BATCH_SIZE:
+                flush()
+        flush()
+        
+        series_rows = []
+        for uid, event in series.items():
+            series_rows.append(self.series_row(event, exception_keys.pop(uid, ())))
+            if series_rows[-1]['patient_email']:
+                result['matched'] += 1
+        self.db_manager.upsert_calendar_series(series_rows)
+        result['series'] = len(series_rows)
+        # Korábban tárolt sorozat módosított példányai (a sorozat maga nem szerepelt a forrásban)
+        if exception_keys:
+            self.db_manager.add_calendar_series_exceptions(
+                {self.event_id(uid): keys for uid, keys in exception_keys.items()})
+        
+        if cancelled_ids:
+            result['deleted'] += self.db_manager.delete_calendar_events_by_google_ids(cancelled_ids)
+        if cancelled_series:
+            result['deleted'] += self.db_manager.delete_calendar_series(cancelled_series)
+        
+        # Az emlékeztetők ablakának előfordulásai azonnal (a küldési kör előtt is látszódjanak a sorban)
+        self.db_manager.materialize_reminder_window()
+        return result
+    
+    # --- Exportálás ---
+    
+    @classmethod
+    def fold(cls, line):
+        """Sor hajtogatása 75 oktettenként (UTF-8 karakter nem vágódik ketté)"""
+        encoded = line.encode('utf-8')
+        if len(encoded) <= cls.LINE_LIMIT:
+            return line + '\r\n'
+        parts = []
+        current = ''
+        current_size = 0
+        for char in line:
+            size = len(char.encode('utf-8'))
+            if current_size + size > cls.LINE_LIMIT:
+                parts.append(current)
+                current = ' '
+                current_size = 1
+            current += char
+            current_size += size
+        parts.append(current)
+        return '\r\n'.join(parts) + '\r\n'
+    
+    def _series_lines(self, series):
+        """Tárolt sorozat VEVENT sorai (RRULE, kivételek EXDATE-ként); series: get_calendar_series_for_export sor"""
+        series_key, patient_email, title, description, dtstart, tzid, duration_seconds, rrule, rdates, exceptions = series
+        
+        def date_property(name, value):
+            if len(value) == 8:
+                return f"{name};VALUE=DATE:{value}"
+            if value.endswith('Z') or tzid == 'UTC':
+                return f"{name}:{value.rstrip('Z')}Z"
+            return f"{name};TZID={tzid}:{value}" if tzid else f"{name}:{value}"
+        
+        lines = [
+            'BEGIN:VEVENT',
+            f"UID:{series_key}@{self.UID_DOMAIN}",
+            date_property('DTSTART', dtstart),
+            f"DURATION:PT{int(duration_seconds or 0)}S",
+            f"RRULE:{rrule}",
+            f"SUMMARY:{self.escape(title or '')}"
+        ]
+        lines.extend(date_property('RDATE', value) for value in json.loads(rdates or '[]'))
+        lines.extend(date_property('EXDATE', value) for value in json.loads(exceptions or '[]'))
+        if description:
+            lines.append(f"DESCRIPTION:{self.escape(description)}")
+        if patient_email:
+            lines.append(f"ATTENDEE;ROLE=REQ-PARTICIPANT:mailto:{patient_email}")
+        return lines
+    
+    def export_events(self, events, file_path, calendar_name, series=()):
+        """Események (és ismétlődő sorozatok) írása ICS fájlba soronként; visszatérés: az exportált VEVENT-ek száma"""
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        count = 0
+        
+        with open(file_path, 'w', encoding='utf-8', newline='') as file_obj:
+            for line in ('BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Patient Reminder//HU',
+                         'CALSCALE:GREGORIAN', f"X-WR-CALNAME:{self.escape(calendar_name)}"):
+                file_obj.write(self.fold(line))
+            
+            for google_event_id, patient_email, title, description, start_time, end_time in events:
+                start = datetime.strptime(start_time[:19], '%Y-%m-%d %H:%M:%S')
+                end = datetime.strptime(end_time[:19], '%Y-%m-%d %H:%M:%S') if end_time else start
+                lines = [
+                    'BEGIN:VEVENT',
+                    f"UID:{google_event_id}@{self.UID_DOMAIN}",
+                    f"DTSTAMP:{stamp}",
+                    f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}",
+                    f"DTEND:{end.strftime('%Y%m%dT%H%M%S')}",
+                    f"SUMMARY:{self.escape(title or '')}"
+                ]
+                if description:
+                    lines.append(f"DESCRIPTION:{self.escape(description)}")
+                if patient_email:
+                    lines.append(f"ATTENDEE;ROLE=REQ-PARTICIPANT:mailto:{patient_email}")
+                lines.append('END:VEVENT')
+                file_obj.write(''.join(self.fold(line) for line in lines))
+                count += 1
+            
+            for row in series:
+                lines = self._series_lines(row)
+                lines.insert(2, f"DTSTAMP:{stamp}")
+                lines.append('END:VEVENT')
+                file_obj.write(''.join(self.fold(line) for line in lines))
+                count += 1
+            
+            file_obj.write(self.fold('END:VCALENDAR'))
+        return count
+    
+    def export_patient(self, patient_email, file_path, include_past=False):
+        """Egy páciens időpontjai (alapértelmezés: a mai naptól); az ismétlődő időpontok RRULE-os sorozatként"""
+        range_start = None if include_past else datetime.now().strftime('%Y-%m-%d 00:00:00')
+        events = self.db_manager.get_calendar_events_for_export(patient_email=patient_email, range_start=range_start,
+                                                                exclude_series=True)
+        series = self.db_manager.get_calendar_series_for_export(patient_email, range_start)
+        return self.export_events(events, file_path, patient_email, series)
+    
+    def export_day(self, day, file_path):
+        """Egy nap összes időpontja (day: date vagy 'ÉÉÉÉ-HH-NN')"""
+        if isinstance(day, str):
+            day = datetime.strptime(day, '%Y-%m-%d').date()
+        range_start = day.strftime('%Y-%m-%d 00:00:00')
+        range_end = (day + timedelta(days=1)).strftime('%Y-%m-%d 00:00:00')
+        # Az ismétlődő sorozatok e napi előfordulásai egyedi eseményként
+        self.db_manager.materialize_series(range_start, day.strftime('%Y-%m-%d 23:59:59'))
+        events = self.db_manager.get_calendar_events_for_export(range_start=range_start, range_end=range_end)
+        return self.export_events(events, file_path, day.strftime('%Y-%m-%d'))
+
+
+class EmailManager:
+    """Email kezelő osztály"""
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+        self.security_manager = SecurityManager.shared()
+    
+    def open_connection(self):
+        """Bejelentkezett SMTP kapcsolat (több email küldéséhez újrahasználható)"""
+        config = self.config_manager.get_email_config()
+        
+        # SMTP szerver kapcsolat
+        server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
+        server.starttls()
+        
+        # Jelszó visszafejtése
+        password = self.security_manager.decrypt_password(config['password'])
+        server.login(config['email'], password)
+        return server
+    
+    def send_email(self, to_email, subject, body, patient_name="", server=None):
+        """Email küldése (server: megnyitott kapcsolat újrahasználása, különben saját kapcsolat)"""
+        try:
+            config = self.config_manager.get_email_config()
+            
+            own_connection = server is None
+            if own_connection:
+                server = self.open_connection()
             
             # Email összeállítása
             msg = MIMEMultipart()
@@ -500,21 +3397,30 @@ class EmailManager:
             
             # Email küldése
             server.send_message(msg)
-            server.quit()
+            if own_connection:
+                server.quit()
             
             return True, "Email sikeresen elküldve"
             
         except Exception as e:
             return False, f"Email küldési hiba: {str(e)}"
     
-    def send_appointment_reminder(self, patient_email, patient_name, appointment_date, appointment_time):
+    def send_appointment_reminder(self, patient_email, patient_name, appointment_date, appointment_time, days_before=1):
         """Időpont emlékeztető küldése"""
         try:
+            # Időpont relatív megnevezése az emlékeztető offset alapján
+            if days_before == 0:
+                when_text = "ma"
+            elif days_before == 1:
+                when_text = "holnap"
+            else:
+                when_text = f"{days_before} nap múlva"
+            
             # Sablon lekérése
-            subject = "Emlékeztető - Időpontja holnap"
+            subject = f"Emlékeztető - Időpontja {when_text}"
             body = f"""Kedves {patient_name}!
 
-Emlékeztetjük, hogy holnap ({appointment_date}) {appointment_time}-kor időpontja van nálunk.
+Emlékeztetjük, hogy {when_text} ({appointment_date}) {appointment_time}-kor időpontja van nálunk.
 
 Kérjük, érkezzen pontosan!
 
@@ -566,15 +3472,32 @@ Ha bármilyen kérdése van, keressen minket!
             return False, f"Teszt email küldési hiba: {str(e)}"
 
 class ConfigManager:
-    """Konfigurációs kezelő osztály"""
-    def __init__(self):
-        self.config_file = "config.json"
-        self.security_manager = SecurityManager()
+    """Konfigurációs kezelő osztály
+    
+    A beállítások memóriában tartott pillanatképe a self.config: újratöltéskor
+    egy új dict cserélődik be, így az olvasók zárolás és fájlolvasás nélkül
+    használhatják. A figyelő szál (start_watching) a fájl módosítási idejét
+    nézi, és külső szerkesztés után újraolvas. A mentés ideiglenes fájlba ír,
+    majd os.replace-szel cserél, így egy félbeszakadt írás nem rontja el a
+    meglévő fájlt. Változáskor a feliratkozók (add_listener) a módosult
+    szekciók nevét kapják (pl. {'automation'}).
+    """
+    WATCH_INTERVAL = 2.0    # Fájlfigyelés gyakorisága (mp)
+    
+    def __init__(self, config_file="config.json"):
+        self.config_file = config_file
+        self.security_manager = SecurityManager.shared()
+        self.lock = threading.Lock()    # Mentés és újratöltés egymás közt
+        self.listeners = []
+        self.file_stamp = None          # (mtime_ns, méret) a legutóbbi olvasáskor / mentéskor
+        self.saved_sections = {}        # szekció -> JSON a legutóbbi olvasáskor / mentéskor
+        self.watch_stop = None
         self.load_config()
     
-    def load_config(self):
-        """Konfiguráció betöltése"""
-        default_config = {
+    @staticmethod
+    def default_config():
+        """Alapértelmezett beállítások (minden hívás új dict)"""
+        return {
             'email': {
                 'smtp_server': 'smtp.gmail.com',
                 'smtp_port': 587,
@@ -585,183 +3508,2720 @@ class ConfigManager:
             'automation': {
                 'reminder_time': '12:00',  # Emlékeztetők küldése
                 'new_appointment_time': '15:30',  # Új időpontok értesítése
+                'reminder_workers': 1,  # Párhuzamos emlékeztető küldő workerek
+                'delivery_window_end': '',  # Küldési ablak vége (pl. '14:00'), üres = azonnali küldés
+                # Emlékeztető időpontok: hány nappal előtte, és (opcionálisan) hánykor
+                # pl. [{'key': '7d', 'days_before': 7}, {'key': '1d', 'days_before': 1},
+                #      {'key': 'reggel', 'days_before': 0, 'send_time': '07:00'}]
+                # Ha a küldési idő nem előzi meg az időpontot, az emlékeztető az időpont napján esedékes
+                'reminder_offsets': [{'key': '1d', 'days_before': 1}],
                 'enabled': False
             },
             'google_calendar': {
                 'enabled': False,
                 'calendar_id': 'primary'
+            },
+            'security': {
+                'encrypt_pii': False  # Páciens név / email / telefon titkosított tárolása, napló név / email nélkül (újraindításkor érvényes; a naptár események nyíltak maradnak)
+            },
+            'campaigns': {
+                'workers': 2,  # Párhuzamos küldő workerek kampányonként
+                'rate_per_minute': 60,  # Küldési sebesség korlát (0 = korlátlan)
+                'chunk_size': 50  # Egy claim-mel lefoglalt címzettek száma
             }
         }
+    
+    def _file_stamp(self):
+        """A konfigurációs fájl (mtime, méret) azonosítója, None ha nincs fájl"""
+        try:
+            stat = os.stat(self.config_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _read_file(self):
+        """Fájl beolvasása az alapértelmezésekkel egyesítve (hibás JSON esetén ValueError)"""
+        config = self.default_config()
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            self.merge_config(config, json.load(f))
+        return config
+    
+    @staticmethod
+    def _sections(config):
+        return {section: json.dumps(value, sort_keys=True) for section, value in config.items()}
+    
+    def _changed_sections(self, config):
+        """A legutóbb olvasott / mentett állapothoz képest módosult szekciók"""
+        sections = self._sections(config)
+        changed = {section for section, value in sections.items() if self.saved_sections.get(section) != value}
+        self.saved_sections = sections
+        return changed
+    
+    def load_config(self):
+        """Konfiguráció betöltése"""
+        self.file_stamp = self._file_stamp()
+        config = None
+        if self.file_stamp is not None:
+            try:
+                config = self._read_file()
+            except (OSError, ValueError) as e:
+                print(f"Konfigurációs fájl hiba ({self.config_file}): {str(e)} - alapértelmezett beállítások")
         
-        if os.path.exists(self.config_file):
+        self.config = config or self.default_config()
+        self.saved_sections = self._sections(self.config)
+    
+    def merge_config(self, default, loaded):
+        """Konfigurációk egyesítése"""
+        for key, value in loaded.items():
+            if key in default:
+                if isinstance(value, dict) and isinstance(default[key], dict):
+                    self.merge_config(default[key], value)
+                else:
+                    default[key] = value
+    
+    def save_config(self):
+        """Konfiguráció mentése atomi cserével (ideiglenes fájl + os.replace)"""
+        with self.lock:
+            directory = os.path.dirname(os.path.abspath(self.config_file))
+            temp_path = os.path.join(directory, f".{os.path.basename(self.config_file)}.{os.getpid()}.tmp")
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    loaded_config = json.load(f)
-                    # Meglévő konfigurációval frissítés
-                    self.merge_config(default_config, loaded_config)
-                    self.config = default_config
-            except:
-                self.config = default_config
-        else:
-            self.config = default_config
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.config, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.config_file)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            
+            self.file_stamp = self._file_stamp()
+            changed = self._changed_sections(self.config)
+        self._notify(changed)
+    
+    def reload_if_changed(self):
+        """Újraolvasás, ha a fájl a legutóbbi olvasás / mentés óta megváltozott
+        
+        Hibás (pl. félig mentett) fájlnál a korábbi beállítások maradnak.
+        Visszatérés: a módosult szekciók halmaza.
+        """
+        with self.lock:
+            stamp = self._file_stamp()
+            if stamp == self.file_stamp:
+                return set()
+            self.file_stamp = stamp
+            if stamp is None:
+                return set()  # Törölt fájl: a memóriában lévő beállítások maradnak
+            
+            try:
+                config = self._read_file()
+            except (OSError, ValueError) as e:
+                print(f"Konfigurációs fájl hiba ({self.config_file}): {str(e)} - a korábbi beállítások maradnak")
+                return set()
+            
+            changed = self._changed_sections(config)
+            if changed:
+                self.config = config
+        
+        if changed:
+            print(f"Konfiguráció újratöltve: {', '.join(sorted(changed))}")
+            self._notify(changed)
+        return changed
+    
+    def add_listener(self, callback):
+        """Feliratkozás a változásokra: callback(módosult szekciók halmaza)"""
+        self.listeners.append(callback)
+    
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+    
+    def _notify(self, changed):
+        if not changed:
+            return
+        for callback in list(self.listeners):
+            try:
+                callback(changed)
+            except Exception as e:
+                print(f"Konfiguráció változás kezelési hiba: {str(e)}")
+    
+    def start_watching(self, interval=None):
+        """Fájlfigyelő háttérszál indítása (külső szerkesztés újraindítás nélkül érvényes)"""
+        if self.watch_stop is not None:
+            return
+        self.watch_stop = threading.Event()
+        
+        def watch(stop_event):
+            while not stop_event.wait(interval or self.WATCH_INTERVAL):
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    print(f"Konfiguráció figyelési hiba: {str(e)}")
+        
+        threading.Thread(target=watch, args=(self.watch_stop,), daemon=True).start()
+    
+    def stop_watching(self):
+        if self.watch_stop is not None:
+            self.watch_stop.set()
+            self.watch_stop = None
+    
+    # Típusos lekérdezések (memóriából, hibás érték esetén az alapértelmezés)
+    def get_value(self, section, key, default=None):
+        return self.config.get(section, {}).get(key, default)
+    
+    def get_str(self, section, key, default=''):
+        value = self.get_value(section, key, default)
+        return default if value is None else str(value)
+    
+    def get_int(self, section, key, default=0, minimum=None):
+        try:
+            value = int(self.get_value(section, key, default))
+        except (TypeError, ValueError):
+            value = default
+        return value if minimum is None else max(minimum, value)
+    
+    def get_float(self, section, key, default=0.0):
+        try:
+            return float(self.get_value(section, key, default) or 0)
+        except (TypeError, ValueError):
+            return default
+    
+    def get_bool(self, section, key, default=False):
+        value = self.get_value(section, key, default)
+        if isinstance(value, str):
+            return value.strip().lower() in ('1', 'true', 'yes', 'on', 'igen')
+        return bool(value)
+    
+    def get_email_config(self):
+        """Email konfiguráció lekérése"""
+        return self.config['email']
+    
+    def get_reminder_offsets(self):
+        """Emlékeztető offsetek normalizált listája (send_time alapértelmezés: reminder_time)"""
+        automation = self.config['automation']
+        offsets = []
+        seen_keys = set()
+        
+        for offset in automation.get('reminder_offsets') or []:
+            days_before = int(offset.get('days_before', 1))
+            send_time = offset.get('send_time') or automation['reminder_time']
+            try:
+                datetime.strptime(send_time, '%H:%M')
+            except (TypeError, ValueError):
+                print(f"Hibás emlékeztető offset kihagyva (send_time: ÉÉ:PP): {offset}")
+                continue
+            if days_before < 0:
+                print(f"Hibás emlékeztető offset kihagyva (days_before < 0): {offset}")
+                continue
+            
+            key = str(offset.get('key') or f"{days_before}d")
+            if key in seen_keys:
+                continue
+            seen_keys.add(key)
+            offsets.append({
+                'key': key,
+                'days_before': days_before,
+                'send_time': send_time
+            })
+        
+        return offsets
+    
+    def set_delivery_window_end(self, window_end):
+        """Küldési ablak végének beállítása (HH:MM vagy üres)"""
+        window_end = window_end.strip()
+        if window_end:
+            # Formátum ellenőrzése
+            datetime.strptime(window_end, '%H:%M')
+        
+        self.config['automation']['delivery_window_end'] = window_end
+        self.save_config()
+    
+    def set_email_config(self, smtp_server, smtp_port, email, password, clinic_name):
+        """Email konfiguráció beállítása"""
+        # Jelszó titkosítása; a régi jelszó visszafejtett alakja ne maradjon a gyorsítótárban
+        encrypted_password = self.security_manager.encrypt_password(password)
+        self.security_manager.forget_secrets()
+        
+        self.config['email'] = {
+            'smtp_server': smtp_server,
+            'smtp_port': smtp_port,
+            'email': email,
+            'password': encrypted_password,
+            'clinic_name': clinic_name
+        }
+        self.save_config()
+
+class PatientImporter:
+    """Páciens import Excel (.xlsx / .xls) vagy CSV fájlból, adagonként
+    
+    A fájlt darabokban olvassa (openpyxl read-only mód, illetve darabolt
+    CSV olvasás), az ellenőrzés és normalizálás pandas oszlopműveletekkel
+    történik, az érvényes sorok adagonként egy tranzakcióban kerülnek az
+    adatbázisba. A hibás sorok (forrás sorszámmal és okkal) egy CSV
+    hibajelentésbe kerülnek az importált fájl mellé. A mentés normalizált
+    email kulcs szerinti upsert, így ugyanannak a fájlnak az ismételt
+    importja nem duplikál pácienst.
+    
+    Több fájl (vagy mappa) importjánál a beolvasás és ellenőrzés
+    folyamatkészletben (process pool) fut párhuzamosan, az adatbázisba
+    egyetlen író szál ír; a hibás sorok közös hibajelentésbe kerülnek.
+    """
+    FILE_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+    QUEUE_CHUNKS_PER_WORKER = 2  # Író felé várakozó adagok workerenként (memória korlát)
+    CHUNK_SIZE = 5000
+    LANGUAGES = ('hu', 'de')
+    EMAIL_PATTERN = r'[^@\s]+@[^@\s]+\.[^@\s]+'
+    # Elfogadott oszlopnevek (kisbetűsítve) -> belső mezőnév
+    COLUMN_ALIASES = {
+        'név': 'name', 'nev': 'name', 'name': 'name',
+        'email': 'email', 'e-mail': 'email',
+        'telefon': 'phone', 'phone': 'phone',
+        'nyelv': 'language', 'language': 'language',
+    }
+    REQUIRED_COLUMNS = {'name': 'név', 'email': 'email'}
+    
+    def __init__(self, db_manager, chunk_size=None, update_existing=True):
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.update_existing = update_existing
+    
+    @staticmethod
+    def format_summary(result):
+        """Import eredmény szöveges összefoglalója"""
+        summary = (f"Új: {result['inserted']}, frissített: {result['updated']}, "
+                   f"változatlan: {result['unchanged']}, hibás: {result['errors']}")
+        if result['duplicates']:
+            summary += f", ismétlődő sor: {result['duplicates']}"
+        return summary
+    
+    @classmethod
+    def expand_paths(cls, paths):
+        """Fájlok és mappák listája -> importálható fájlok (mappából a támogatott kiterjesztésűek)"""
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(sorted(
+                    os.path.join(path, name) for name in os.listdir(path)
+                    if name.lower().endswith(cls.FILE_EXTENSIONS) and not name.startswith(('~$', '.', 'import_hibak_'))
+                    and not name.endswith('_import_hibak.csv')
+                ))
+            else:
+                files.append(path)
+        return files
+    
+    @staticmethod
+    def report_path_for(file_path):
+        """Hibajelentés útvonala az importált fájl mellett"""
+        base, _ = os.path.splitext(file_path)
+        return f"{base}_import_hibak.csv"
+    
+    def read_chunks(self, file_path):
+        """A fájl sorai DataFrame darabokban; az index a forrás sorszáma (fejléc = 1. sor)"""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == '.csv':
+            return self._read_csv_chunks(file_path)
+        if extension == '.xls':
+            return self._read_xls_chunks(file_path)
+        return self._read_xlsx_chunks(file_path)
+    
+    def _read_csv_chunks(self, file_path):
+        import pandas as pd  # Késleltetett import: csak az importhoz kell
+        
+        # Kódolás és elválasztó felismerése a fájl elejéből (Excel CSV export: gyakran ';' és cp1250)
+        with open(file_path, 'rb') as sample_file:
+            sample = sample_file.read(65536)
+        try:
+            sample.decode('utf-8')
+            encoding = 'utf-8-sig'
+        except UnicodeDecodeError:
+            encoding = 'cp1250'
+        try:
+            delimiter = csv.Sniffer().sniff(sample.decode(encoding, errors='ignore'), delimiters=',;\t').delimiter
+        except csv.Error:
+            delimiter = ','
+        
+        reader = pd.read_csv(file_path, sep=delimiter, dtype=str, keep_default_na=False,
+                             encoding=encoding, chunksize=self.chunk_size)
+        for chunk in reader:
+            chunk.index = chunk.index + 2
+            yield chunk
+    
+    def _read_xls_chunks(self, file_path):
+        import pandas as pd
+        
+        # A régi .xls formátumot az openpyxl nem olvassa: egyben töltődik be, adagolva dolgozzuk fel
+        df = pd.read_excel(file_path, dtype=str, keep_default_na=False)
+        df.index = df.index + 2
+        for start in range(0, len(df), self.chunk_size):
+            yield df.iloc[start:start + self.chunk_size]
+    
+    def _read_xlsx_chunks(self, file_path):
+        import pandas as pd
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            # Méret előzetes kiszámítása nélkül (hiányzó dimension esetén az egész lapot bejárná)
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(cell).strip() if cell is not None else '' for cell in header]
+            width = len(columns)
+            
+            first_row = 2
+            batch = []
+            for row in rows:
+                batch.append(tuple(row[:width]) + (None,) * (width - len(row)))
+                if len(batch) >= self.chunk_size:
+                    yield pd.DataFrame(batch, columns=columns, index=range(first_row, first_row + len(batch)))
+                    first_row += len(batch)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=columns, index=range(first_row, first_row + len(batch)))
+        finally:
+            workbook.close()
+    
+    def normalize_columns(self, df):
+        """Oszlopnevek belső mezőnevekre; hiányzó kötelező oszlopnál ValueError"""
+        renamed = {}
+        for column in df.columns:
+            field = self.COLUMN_ALIASES.get(str(column).strip().lower())
+            if field and field not in renamed.values():
+                renamed[column] = field
+        
+        missing = [label for field, label in self.REQUIRED_COLUMNS.items() if field not in renamed.values()]
+        if missing:
+            raise ValueError(f"Hiányzó oszlopok: {', '.join(missing)}")
+        
+        return df[list(renamed)].rename(columns=renamed)
+    
+    @staticmethod
+    def _text_column(df, field):
+        """Oszlop szövegként (hiányzó oszlop / üres cella = '')"""
+        if field not in df.columns:
+            return df.index.to_series().map(lambda _: '')
+        column = df[field]
+        return column.where(column.notna(), '').astype(str).str.strip()
+    
+    def validate(self, df):
+        """Vektorizált normalizálás és ellenőrzés
+        
+        Visszatérési érték: (valid, errors) - valid oszlopai name, email,
+        phone, language; errors oszlopai name, email, error. A teljesen
+        üres sorok (pl. Excel záró sorai) kimaradnak.
+        """
+        df = self.normalize_columns(df)
+        
+        name = self._text_column(df, 'name')
+        email = self._text_column(df, 'email')
+        # Telefon: csak számjegyek és '+' (Excel szám cellák '.0' végződése nélkül)
+        phone = (self._text_column(df, 'phone')
+                 .str.replace(r'\.0$', '', regex=True)
+                 .str.replace(r'[^\d+]', '', regex=True))
+        language = self._text_column(df, 'language').str.lower()
+        language = language.mask(language == '', 'hu')
+        
+        blank = (name == '') & (email == '')
+        
+        error = name.map(lambda _: '')
+        error = error.mask(~language.isin(self.LANGUAGES), 'Ismeretlen nyelv')
+        error = error.mask(~email.str.fullmatch(self.EMAIL_PATTERN), 'Érvénytelen email')
+        error = error.mask(name == '', 'Hiányzó név')
+        
+        import pandas as pd
+        normalized = pd.DataFrame({'name': name, 'email': email, 'phone': phone, 'language': language})
+        normalized['error'] = error
+        normalized = normalized[~blank]
+        
+        valid = normalized[normalized['error'] == ''][['name', 'email', 'phone', 'language']]
+        errors = normalized[normalized['error'] != ''][['name', 'email', 'error']]
+        return valid, errors
+    
+    def write_batch(self, valid):
+        """Érvényes sorok mentése; visszatérési érték: upsert számlálók"""
+        return self.db_manager.upsert_patients_batch(list(valid.itertuples(index=False, name=None)),
+                                                     self.update_existing)
+    
+    def run(self, file_path, cancel_event=None, progress=None):
+        """Import végrehajtása
+        
+        progress(processed_rows, text) minden adag után hívódik.
+        Visszatérési érték: dict (inserted, updated, unchanged, duplicates,
+        errors, rows, report_path) - report_path None, ha nem volt hibás sor.
+        """
+        report_path = self.report_path_for(file_path)
+        result = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0,
+                  'errors': 0, 'rows': 0, 'report_path': None}
+        report_file = None
+        report_writer = None
+        
+        try:
+            for chunk in self.read_chunks(file_path):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                
+                valid, errors = self.validate(chunk)
+                for key, count in self.write_batch(valid).items():
+                    result[key] += count
+                result['rows'] += len(chunk)
+                
+                if len(errors):
+                    if report_writer is None:
+                        report_file = open(report_path, 'w', newline='', encoding='utf-8-sig')
+                        report_writer = csv.writer(report_file, delimiter=';')
+                        report_writer.writerow(['sor', 'név', 'email', 'hiba'])
+                        result['report_path'] = report_path
+                    report_writer.writerows(errors.itertuples(index=True, name=None))
+                    result['errors'] += len(errors)
+                
+                if progress:
+                    progress(result['rows'], f"{result['rows']} sor feldolgozva")
+        finally:
+            if report_file is not None:
+                report_file.close()
+        
+        return result
+    
+    @staticmethod
+    def parse_file_worker(file_path, chunk_size, output_queue):
+        """Folyamatkészlet worker: egy fájl beolvasása és ellenőrzése adagonként
+        
+        Az eredményt a (korlátos méretű) sorba teszi: ('chunk', fájl, sorok,
+        érvényes sorok, hibás sorok), a végén ('done', fájl) vagy hiba esetén
+        ('failed', fájl, üzenet). Adatbázist nem használ.
+        """
+        importer = PatientImporter(None, chunk_size)
+        try:
+            for chunk in importer.read_chunks(file_path):
+                valid, errors = importer.validate(chunk)
+                output_queue.put(('chunk', file_path, len(chunk),
+                                  list(valid.itertuples(index=False, name=None)),
+                                  list(errors.itertuples(index=True, name=None))))
+        except Exception as e:
+            output_queue.put(('failed', file_path, str(e)))
+            return
+        output_queue.put(('done', file_path))
+    
+    def run_many(self, paths, workers=None, cancel_event=None, progress=None):
+        """Több fájl / mappa importja párhuzamos beolvasással és egyetlen író szállal
+        
+        A hívó szál az író: a workerek adagjait sorban upserteli. progress(
+        files_done, files_total, text) minden adag és minden befejezett fájl
+        után hívódik.
+        Visszatérési érték: az összesített számlálók (mint a run()-nál),
+        valamint 'files': fájlonkénti számlálók ('failed': hibaüzenet, ha a
+        fájl nem olvasható).
+        """
+        files = self.expand_paths(paths)
+        if not files:
+            raise ValueError("Nincs importálható fájl (xlsx, xls, csv)")
+        
+        workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+        report_dir = paths[0] if os.path.isdir(paths[0]) else os.path.dirname(os.path.abspath(files[0]))
+        report_path = os.path.join(report_dir, f"import_hibak_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        
+        result = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0,
+                  'errors': 0, 'rows': 0, 'report_path': None, 'files': {}}
+        for file_path in files:
+            result['files'][file_path] = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0,
+                                          'errors': 0, 'rows': 0, 'failed': None}
+        report_file = None
+        report_writer = None
+        
+        # spawn: a GUI / háttérszálak miatt fork helyett tiszta worker folyamatok
+        context = multiprocessing.get_context('spawn')
+        with context.Manager() as manager:
+            output_queue = manager.Queue(maxsize=workers * self.QUEUE_CHUNKS_PER_WORKER)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = {pool.submit(self.parse_file_worker, file_path, self.chunk_size, output_queue): file_path
+                           for file_path in files}
+                pending = set(files)
+                cancelled = False
+                
+                try:
+                    while pending:
+                        if not cancelled and cancel_event is not None and cancel_event.is_set():
+                            # Még el nem indult fájlok kihagyása; a futók sorát tovább ürítjük
+                            cancelled = True
+                            for future, file_path in futures.items():
+                                if future.cancel():
+                                    pending.discard(file_path)
+                            continue
+                        
+                        try:
+                            message = output_queue.get(timeout=0.2)
+                        except queue.Empty:
+                            # Összeomlott worker (pl. memóriahiány) ne akassza meg az írót
+                            for future, file_path in futures.items():
+                                if file_path in pending and future.done() and future.exception() is not None:
+                                    result['files'][file_path]['failed'] = str(future.exception())
+                                    pending.discard(file_path)
+                            continue
+                        
+                        kind, file_path = message[0], message[1]
+                        file_result = result['files'][file_path]
+                        if kind == 'chunk':
+                            if cancelled:
+                                continue
+                            _, _, row_count, valid_rows, error_rows = message
+                            for key, count in self.db_manager.upsert_patients_batch(valid_rows, self.update_existing).items():
+                                file_result[key] += count
+                                result[key] += count
+                            file_result['rows'] += row_count
+                            result['rows'] += row_count
+                            
+                            if error_rows:
+                                if report_writer is None:
+                                    report_file = open(report_path, 'w', newline='', encoding='utf-8-sig')
+                                    report_writer = csv.writer(report_file, delimiter=';')
+                                    report_writer.writerow(['fájl', 'sor', 'név', 'email', 'hiba'])
+                                    result['report_path'] = report_path
+                                file_name = os.path.basename(file_path)
+                                report_writer.writerows((file_name,) + tuple(row) for row in error_rows)
+                                file_result['errors'] += len(error_rows)
+                                result['errors'] += len(error_rows)
+                            text = f"{os.path.basename(file_path)}: {file_result['rows']} sor"
+                        else:
+                            if kind == 'failed':
+                                file_result['failed'] = message[2]
+                            pending.discard(file_path)
+                            status = 'hiba' if kind == 'failed' else 'kész'
+                            text = f"{os.path.basename(file_path)}: {status}"
+                        
+                        if progress:
+                            progress(len(files) - len(pending), len(files), text)
+                finally:
+                    if report_file is not None:
+                        report_file.close()
+        
+        return result
+
+class DataExporter:
+    """Táblák (páciensek, naptár események, naplók) exportja CSV, XLSX vagy Parquet formátumba
+    
+    Az adatbázisból adagonként olvas és adagonként ír (openpyxl write-only
+    munkafüzet, Parquet esetén adagonként egy row group), így a teljes
+    adatbázis exportja is állandó memóriával fut. A Parquet exporthoz a
+    pyarrow csomag szükséges (opcionális függőség).
+    """
+    CHUNK_SIZE = 10000
+    FORMATS = ('csv', 'xlsx', 'parquet')
+    
+    def __init__(self, db_manager, chunk_size=None):
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+    
+    @classmethod
+    def format_for(cls, file_path):
+        """Export formátum a fájl kiterjesztéséből"""
+        fmt = os.path.splitext(file_path)[1].lower().lstrip('.')
+        if fmt not in cls.FORMATS:
+            raise ValueError(f"Nem támogatott export formátum: .{fmt} (csv, xlsx vagy parquet)")
+        return fmt
+    
+    def resolve_columns(self, table, columns=None):
+        """Kért oszlopok ellenőrzése; None = minden exportálható oszlop"""
+        if table not in DatabaseManager.EXPORT_TABLES:
+            raise ValueError(f"Ismeretlen tábla: {table} ({', '.join(DatabaseManager.EXPORT_TABLES)})")
+        
+        available = dict(DatabaseManager.EXPORT_TABLES[table]['columns'])
+        if not columns:
+            return list(available.items())
+        
+        unknown = [column for column in columns if column not in available]
+        if unknown:
+            raise ValueError(f"Ismeretlen oszlop ({table}): {', '.join(unknown)}")
+        return [(column, available[column]) for column in columns]
+    
+    def export(self, table, file_path, columns=None, date_from=None, date_to=None,
+               cancel_event=None, progress=None):
+        """Export végrehajtása; visszatérési érték: kiírt sorok száma
+        
+        progress(rows, text) minden adag után hívódik.
+        """
+        fmt = self.format_for(file_path)
+        columns = self.resolve_columns(table, columns)
+        for value in (date_from, date_to):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')  # ValueError hibás dátumnál
+        
+        chunks = self.db_manager.iter_export_rows(table, [name for name, _ in columns],
+                                                  date_from, date_to, self.chunk_size)
+        writer = getattr(self, f'_write_{fmt}')
+        
+        def tracked():
+            written = 0
+            for rows in chunks:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                yield rows
+                written += len(rows)
+                if progress:
+                    progress(written, f"{written} sor exportálva")
+        
+        return writer(file_path, columns, tracked())
+    
+    def _write_csv(self, file_path, columns, chunks):
+        written = 0
+        with open(file_path, 'w', newline='', encoding='utf-8-sig') as export_file:
+            writer = csv.writer(export_file, delimiter=';')
+            writer.writerow([name for name, _ in columns])
+            for rows in chunks:
+                writer.writerows(rows)
+                written += len(rows)
+        return written
+    
+    def _write_xlsx(self, file_path, columns, chunks):
+        from openpyxl import Workbook  # Késleltetett import: csak az exporthoz kell
+        
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append([name for name, _ in columns])
+        written = 0
+        for rows in chunks:
+            for row in rows:
+                sheet.append(row)
+            written += len(rows)
+        workbook.save(file_path)
+        return written
+    
+    def _write_parquet(self, file_path, columns, chunks):
+        if importlib.util.find_spec('pyarrow') is None:
+            raise ValueError("Parquet exporthoz szükséges csomag: pip install pyarrow")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        types = {'int': pa.int64(), 'text': pa.string()}
+        schema = pa.schema([(name, types[column_type]) for name, column_type in columns])
+        written = 0
+        with pq.ParquetWriter(file_path, schema) as writer:
+            for rows in chunks:
+                # Adagonként oszlopos tábla: egy row group
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array([row[index] for row in rows], type=field.type)
+                     for index, field in enumerate(schema)],
+                    schema=schema
+                ))
+                written += len(rows)
+        return written
+
+class DeliveryPacer:
+    """Küldési ütemező - az üzeneteket egyenletesen elosztja egy küldési ablakban
+    
+    Minden üzenet egy időrést (slot) kap. Ha a küldés lemarad a tervhez
+    képest (lassú SMTP, hiba), a hátralévő üzeneteket újraosztja a
+    hátralévő ablakra. Több worker szál is használhatja egyszerre.
+    """
+    def __init__(self, total, window_start, window_end):
+        self.total = total
+        self.window_start = window_start
+        self.window_end = max(window_start, window_end)
+        self.reserved = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        
+        window_seconds = (self.window_end - self.window_start).total_seconds()
+        self.interval = window_seconds / total if total else 0.0
+        self.next_slot = window_start
+    
+    def plan(self):
+        """Hátralévő üzenetek tervezett küldési időpontjai"""
+        with self.lock:
+            remaining = max(0, self.total - self.reserved)
+            return [self.next_slot + timedelta(seconds=self.interval * i) for i in range(remaining)]
+    
+    def expected_end(self):
+        """Utolsó üzenet várható küldési ideje"""
+        with self.lock:
+            remaining = max(0, self.total - self.reserved)
+            if remaining == 0:
+                return self.next_slot - timedelta(seconds=self.interval)
+            return self.next_slot + timedelta(seconds=self.interval * (remaining - 1))
+    
+    def reserve_slot(self, now=None):
+        """Következő időrés lefoglalása; None, ha minden tervezett üzenet kiosztva"""
+        with self.lock:
+            if self.reserved >= self.total:
+                self.closed = True
+                return None
+            
+            now = now or datetime.now()
+            remaining = self.total - self.reserved
+            
+            # Lemaradás esetén a maradékot a hátralévő ablakra osztjuk újra
+            if now > self.next_slot:
+                left_seconds = max(0.0, (self.window_end - now).total_seconds())
+                self.interval = left_seconds / remaining
+                self.next_slot = now
+            
+            slot = self.next_slot
+            self.reserved += 1
+            self.next_slot = slot + timedelta(seconds=self.interval)
+            return slot
+    
+    def close(self):
+        """Ütemezés lezárása: további bővítés nem lehetséges"""
+        with self.lock:
+            self.closed = True
+    
+    def extend(self, count, now=None):
+        """További üzenetek hozzáadása a futó ütemezéshez (a hátralévő ablakra újraosztva)
+        
+        False, ha az időrések már elfogytak (a küldés befejeződött), ilyenkor új kör kell.
+        """
+        with self.lock:
+            if self.closed:
+                return False
+            
+            now = now or datetime.now()
+            self.total += count
+            self.next_slot = max(self.next_slot, now)
+            left_seconds = max(0.0, (self.window_end - self.next_slot).total_seconds())
+            self.interval = left_seconds / (self.total - self.reserved)
+            return True
+    
+    def wait_for_slot(self, stop_event=None):
+        """Várakozás a következő időrésig
+        
+        False, ha nincs több kiosztható időrés, vagy a várakozást a
+        stop_event (pl. leállítás) megszakította.
+        """
+        slot = self.reserve_slot()
+        if slot is None:
+            return False
+        
+        wait_seconds = (slot - datetime.now()).total_seconds()
+        if wait_seconds > 0:
+            if stop_event is not None:
+                return not stop_event.wait(wait_seconds)
+            time.sleep(wait_seconds)
+        return True
+
+class ShutdownCoordinator:
+    """Közös leállítási protokoll (GUI bezárás és szolgáltatás mód)
+    
+    A regisztrált résztvevők sorban: 1) nem fogadnak új munkát,
+    2) a határidőig befejezik a folyamatban lévő küldéseket,
+    3) a el nem küldött tételeket visszaadják a következő indulásnak.
+    Résztvevő: stop_accepting(), drain(deadline) -> bool, persist_unsent(drained) metódusokkal.
+    """
+    DEFAULT_TIMEOUT = 30  # Folyamatban lévő küldések kivárásának határideje (mp)
+    
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.participants = []
+        self.lock = threading.Lock()
+        self.completed = False
+    
+    def register(self, participant):
+        """Résztvevő regisztrálása"""
+        self.participants.append(participant)
+    
+    def shutdown(self, timeout=None):
+        """Leállítás végrehajtása; True, ha minden folyamatban lévő munka befejeződött"""
+        if timeout is None:
+            timeout = self.DEFAULT_TIMEOUT
+        
+        with self.lock:
+            if self.completed:
+                return True
+            
+            deadline = time.monotonic() + timeout
+            
+            # 1. Új munka fogadásának leállítása
+            for participant in self.participants:
+                participant.stop_accepting()
+            
+            # 2. Folyamatban lévő küldések kivárása a határidőig
+            drained = True
+            for participant in self.participants:
+                if not participant.drain(deadline):
+                    drained = False
+            
+            # 3. El nem küldött tételek visszaadása a következő indulásnak
+            for participant in self.participants:
+                participant.persist_unsent(drained)
+            
+            if drained:
+                self.db_manager.add_log("INFO", "Leállítás: minden folyamatban lévő küldés befejeződött")
+            else:
+                self.db_manager.add_log("WARNING", f"Leállítás: a {timeout} mp-es határidő lejárt, "
+                                                   "a megszakadt tételek a foglalás lejárta után újra küldhetők")
+            
+            self.completed = True
+            return drained
+
+class AutomationManager:
+    """Automatizálási kezelő osztály"""
+    CLAIM_BATCH_SIZE = 20   # Egy claim-mel lefoglalt események száma
+    CLAIM_SECONDS = 600     # Claim lejárati ideje (elhalt worker esetén újra felszabadul)
+    LEASE_SECONDS = 900     # Feladat lease lejárati ideje
+    
+    def __init__(self, db_manager, config_manager, email_manager, calendar_manager):
+        self.db_manager = db_manager
+        self.config_manager = config_manager
+        self.email_manager = email_manager
+        self.calendar_manager = calendar_manager
+        self.running = False
+        self.thread = None
+        self.scheduler_stop = threading.Event()
+        self.reschedule_requested = threading.Event()
+        
+        # Beállítás változáskor (mentés vagy külső szerkesztés) ütemezés frissítése
+        self.config_manager.add_listener(self.on_config_changed)
+        
+        # Egyedi példány azonosító a lease-ekhez és claim-ekhez
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        
+        # Leállítási állapot: új munka tiltása és folyamatban lévő körök számlálása
+        self.shutdown_event = threading.Event()
+        self.active_runs = 0
+        self.runs_condition = threading.Condition()
+        
+        # Küldési ablakban futó emlékeztető kör (saját szálon, hogy ne tartsa fel az ütemezőt)
+        self.paced_lock = threading.Lock()
+        self.paced_thread = None
+        self.paced_pacer = None
+    
+    def start_automation(self):
+        """Automatizálás indítása"""
+        if not self.running and not self.shutdown_event.is_set():
+            self.running = True
+            self.setup_schedule()
+            # Indításonként új stop esemény, így egy még leálló régi szál nem fut tovább
+            self.scheduler_stop = threading.Event()
+            self.thread = threading.Thread(target=self.run_scheduler, args=(self.scheduler_stop,), daemon=True)
+            self.thread.start()
+            self.db_manager.add_log("INFO", "Automatizálás elindítva")
+    
+    def stop_automation(self):
+        """Automatizálás leállítása"""
+        self.running = False
+        self.scheduler_stop.set()
+        schedule.clear()
+        self.db_manager.add_log("INFO", "Automatizálás leállítva")
+    
+    def _begin_run(self):
+        """Küldési kör kezdete; False, ha leállítás alatt nem fogadunk új munkát"""
+        with self.runs_condition:
+            if self.shutdown_event.is_set():
+                return False
+            self.active_runs += 1
+            return True
+    
+    def _end_run(self):
+        """Küldési kör vége"""
+        with self.runs_condition:
+            self.active_runs -= 1
+            self.runs_condition.notify_all()
+    
+    def stop_accepting(self):
+        """Leállítás 1. lépés: ütemező leállítása, új körök és új tételek tiltása"""
+        self.shutdown_event.set()
+        if self.running:
+            self.stop_automation()
+    
+    def drain(self, deadline):
+        """Leállítás 2. lépés: folyamatban lévő körök kivárása a határidőig (time.monotonic)"""
+        with self.runs_condition:
+            while self.active_runs > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.runs_condition.wait(remaining)
+            drained = self.active_runs == 0
+        
+        if self.thread and self.thread.is_alive():
+            self.thread.join(max(0.0, deadline - time.monotonic()))
+        
+        return drained
+    
+    def persist_unsent(self, drained):
+        """Leállítás 3. lépés: saját foglalások és lease-ek feloldása a következő indulásnak
+        
+        Ha a kivárás nem fejeződött be, a még futó küldések foglalásait nem
+        oldjuk fel (duplikált email elkerülése), azok a claim lejártával szabadulnak fel.
+        """
+        if not drained:
+            return
+        
+        released = self.db_manager.release_owner_claims(self.worker_id)
+        self.db_manager.release_owner_leases(self.worker_id)
+        if released:
+            self.db_manager.add_log("INFO", f"Leállítás: {released} el nem küldött emlékeztető visszaadva a sorba")
+    
+    def shutdown(self, timeout=30):
+        """Önálló leállítás (koordinátor nélküli használathoz)"""
+        self.stop_accepting()
+        drained = self.drain(time.monotonic() + timeout)
+        self.persist_unsent(drained)
+        return drained
+    
+    def setup_schedule(self):
+        """Ütemezett feladatok beállítása (a korábbi automatizálási feladatok helyett)"""
+        schedule.clear('automation')
+        
+        # Emlékeztetők küldése naponta 12:00-kor, illetve minden egyedi offset küldési időpontban
+        reminder_times = {self.config_manager.get_str('automation', 'reminder_time', '12:00')}
+        reminder_times.update(offset['send_time'] for offset in self.config_manager.get_reminder_offsets())
+        for reminder_time in sorted(reminder_times):
+            schedule.every().day.at(reminder_time).do(self.send_daily_reminders).tag('automation')
+        
+        # Új időpontok értesítése naponta 15:30-kor
+        schedule.every().day.at(self.config_manager.get_str('automation', 'new_appointment_time', '15:30')).do(
+            self.send_new_appointment_notifications).tag('automation')
+    
+    def on_config_changed(self, sections):
+        """Beállítás változás: emlékeztető offsetek frissítése, futó ütemező újraütemezése"""
+        if 'automation' not in sections:
+            return
+        self.db_manager.set_reminder_offsets(self.config_manager.get_reminder_offsets())
+        # Az ütemezést az ütemező szál építi újra (a schedule nem szálbiztos)
+        self.reschedule_requested.set()
+        self.db_manager.add_log("INFO", "Automatizálási beállítások módosultak, ütemezés frissítve")
+    
+    def run_scheduler(self, stop_event):
+        """Ütemező futtatása"""
+        while not stop_event.is_set():
+            if self.reschedule_requested.is_set():
+                self.reschedule_requested.clear()
+                self.setup_schedule()
+            try:
+                schedule.run_pending()
+            except Exception as e:
+                # Egy hibás feladat nem állíthatja le az ütemezőt (a többi feladat tovább fut)
+                self.db_manager.add_log("ERROR", f"Ütemezett feladat hiba: {str(e)}")
+            stop_event.wait(60)  # 1 perc várakozás (leállításkor azonnal kilép)
+    
+    def send_daily_reminders(self):
+        """Napi emlékeztetők küldése (holnapi időpontokra)"""
+        try:
+            if not self.config_manager.get_bool('automation', 'enabled'):
+                return
+            
+            with self.paced_lock:
+                # Még futó ütemezett kör: az újonnan esedékes tételek az ő hátralévő ablakába kerülnek
+                if self.paced_thread and self.paced_thread.is_alive():
+                    pacer = self.paced_pacer
+                    extra = self.db_manager.count_due_reminders() - (pacer.total - pacer.reserved)
+                    if extra <= 0 or pacer.extend(extra):
+                        return
+                
+                # Küldési ablakban a kör külön szálon fut, az ütemező addig a többi feladatot futtatja
+                pacer = self.create_delivery_pacer()
+                if pacer is not None:
+                    self.paced_pacer = pacer
+                    self.paced_thread = threading.Thread(target=self._run_daily_reminders, args=(pacer,), daemon=True)
+                    self.paced_thread.start()
+                    return
+            
+            self._run_daily_reminders()
+        
+        except Exception as e:
+            self.db_manager.add_log("ERROR", f"Napi emlékeztető hiba: {str(e)}")
+    
+    def _run_daily_reminders(self, pacer=None):
+        """Napi emlékeztető kör végrehajtása (ütemezett körnél háttérszálon)"""
+        try:
+            sent_count = self.process_reminders("Napi emlékeztető", pacer=pacer)
+            if pacer is not None:
+                with self.paced_lock:
+                    pacer.close()
+                    leftover = pacer.total > pacer.reserved
+                # A kör vége előtt hozzáadott, de ki nem osztott tételek azonnal mennek
+                if leftover:
+                    sent_count += self.process_reminders("Napi emlékeztető")
+            
+            if sent_count > 0:
+                self.db_manager.add_log("INFO", f"Napi emlékeztető kör befejezve: {sent_count} email elküldve")
+        
+        except Exception as e:
+            self.db_manager.add_log("ERROR", f"Napi emlékeztető hiba: {str(e)}")
+    
+    def create_delivery_pacer(self):
+        """Küldési ütemező létrehozása a beállított küldési ablakhoz (None = azonnali küldés)"""
+        window_end_str = self.config_manager.get_str('automation', 'delivery_window_end')
+        if not window_end_str:
+            return None
+        
+        now = datetime.now()
+        start_time = datetime.strptime(self.config_manager.get_str('automation', 'reminder_time', '12:00'), '%H:%M')
+        end_time = datetime.strptime(window_end_str, '%H:%M')
+        window_start = now.replace(hour=start_time.hour, minute=start_time.minute, second=0, microsecond=0)
+        window_end = now.replace(hour=end_time.hour, minute=end_time.minute, second=0, microsecond=0)
+        # Csak a fő (reminder_time) körre vonatkozik, pl. a reggeli offset kör azonnal küld
+        if now < window_start or window_end <= now:
+            return None
+        
+        total = self.db_manager.count_due_reminders()
+        if total == 0:
+            return None
+        
+        pacer = DeliveryPacer(total, now, window_end)
+        self.db_manager.add_log("INFO", f"Küldési ablak: {total} emlékeztető {now.strftime('%H:%M')}-{window_end_str} között, "
+                                        f"várható befejezés: {pacer.expected_end().strftime('%H:%M')}")
+        return pacer
+    
+    def process_reminders(self, log_label="Napi emlékeztető", workers=None, pacer=None, due_before=None,
+                          cancel_event=None, progress=None):
+        """Esedékes emlékeztetők küldése claim alapon, opcionálisan több workerrel
+        
+        Az eseményeket atomi claim-mel foglaljuk le, így több alkalmazás
+        példány vagy worker szál is feloszthatja a kört duplikáció nélkül.
+        Ha pacer meg van adva, az üzenetek a küldési ablakban egyenletesen
+        elosztva mennek ki. due_before: esedékességi határ (kézi küldésnél a nap vége).
+        cancel_event: kézi megszakítás, progress: minden elküldött email után hívva.
+        Visszatérési érték: elküldött emailek száma.
+        """
+        if not self._begin_run():
+            return 0
+        
+        try:
+            return self._process_reminders(log_label, workers, pacer, due_before, cancel_event, progress)
+        finally:
+            self._end_run()
+    
+    def _should_stop(self, cancel_event=None):
+        """Leállítás vagy kézi megszakítás kérve"""
+        return self.shutdown_event.is_set() or (cancel_event is not None and cancel_event.is_set())
+    
+    def _process_reminders(self, log_label, workers, pacer, due_before, cancel_event=None, progress=None):
+        """Emlékeztető kör végrehajtása (futó kör nyilvántartása mellett)"""
+        if workers is None:
+            workers = self.config_manager.get_int('automation', 'reminder_workers', 1)
+        workers = max(1, int(workers))
+        
+        # Ismétlődő sorozatok esedékes előfordulásai, majd a lejárt tételek eltávolítása a sorból
+        self.db_manager.materialize_reminder_window()
+        self.db_manager.prune_reminder_queue()
+        
+        if workers == 1:
+            return self._reminder_worker(log_label, pacer, due_before, cancel_event, progress)
+        
+        results = []
+        results_lock = threading.Lock()
+        
+        def run_worker():
+            count = self._reminder_worker(log_label, pacer, due_before, cancel_event, progress)
+            with results_lock:
+                results.append(count)
+        
+        threads = [threading.Thread(target=run_worker, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        return sum(results)
+    
+    def _reminder_worker(self, log_label, pacer=None, due_before=None, cancel_event=None, progress=None):
+        """Egy worker: esedékes tételek lefoglalása és elküldése, amíg van mit"""
+        sent_count = 0
+        unsent = []
+        
+        # Ütemezett küldésnél közvetlenül küldés előtt egyesével foglalunk,
+        # hogy a claim ne járjon le a hosszú várakozás alatt
+        batch_size = 1 if pacer else self.CLAIM_BATCH_SIZE
+        
+        try:
+            while not self._should_stop(cancel_event):
+                if pacer and not pacer.wait_for_slot(self.shutdown_event):
+                    break
+                
+                reminders = self.db_manager.claim_due_reminders(
+                    self.worker_id, batch_size, self.CLAIM_SECONDS, due_before
+                )
+                if not reminders:
+                    break
+                
+                for index, reminder in enumerate(reminders):
+                    # Leállításkor / megszakításkor a köteg hátralévő tételei visszakerülnek a sorba
+                    if self._should_stop(cancel_event):
+                        unsent.extend((item[0], item[1]) for item in reminders[index:])
+                        break
+                    
+                    # reminder: (event_id, offset_key, days_before, patient_email, patient_name, language, appointment_date, appointment_time)
+                    event_id, offset_key = reminder[0], reminder[1]
+                    patient_email, patient_name = reminder[3], reminder[4]
+                    try:
+                        success, message = self.email_manager.send_appointment_reminder(
+                            patient_email, patient_name, reminder[6], reminder[7], reminder[2]
+                        )
+                        
+                        if success:
+                            self.db_manager.mark_reminder_sent(event_id, offset_key)
+                            self.db_manager.add_log("INFO", f"{log_label} elküldve ({offset_key}): {patient_name}", patient_email,
+                                                    patient_name=patient_name)
+                            sent_count += 1
+                            if progress:
+                                progress()
+                        else:
+                            unsent.append((event_id, offset_key))
+                            self.db_manager.add_log("ERROR", f"Emlékeztető hiba: {message}", patient_email)
+                    
+                    except Exception as e:
+                        unsent.append((event_id, offset_key))
+                        self.db_manager.add_log("ERROR", f"Emlékeztető feldolgozási hiba: {str(e)}")
+        finally:
+            # A kör végén feloldjuk a sikertelen foglalásokat, hogy a következő kör újrapróbálhassa
+            self.db_manager.release_reminder_claims(unsent, self.worker_id)
+        
+        return sent_count
+    
+    def send_new_appointment_notifications(self):
+        """Mai új időpontok értesítése"""
+        try:
+            if not self.config_manager.get_bool('automation', 'enabled'):
+                return
+            
+            sent_count = self.process_new_appointment_notifications()
+            
+            if sent_count is None:
+                self.db_manager.add_log("INFO", "Új időpont értesítés kihagyva: másik példány futtatja")
+            elif sent_count > 0:
+                self.db_manager.add_log("INFO", f"Új időpont értesítési kör befejezve: {sent_count} email elküldve")
+        
+        except Exception as e:
+            self.db_manager.add_log("ERROR", f"Új időpont értesítési hiba: {str(e)}")
+    
+    def process_new_appointment_notifications(self, cancel_event=None, progress=None):
+        """Új időpont értesítések küldése job lease alatt
+        
+        Egyszerre csak egy példány futtathatja (lejáró lease). progress(done, total)
+        minden feldolgozott esemény után hívódik. Visszatérési érték: elküldött
+        emailek száma, vagy None ha a lease foglalt.
+        """
+        if not self._begin_run():
+            return 0
+        
+        try:
+            if not self.db_manager.acquire_job_lease("new_appointment_notifications", self.worker_id, self.LEASE_SECONDS):
+                return None
+            
+            try:
+                return self._send_new_appointment_notifications(cancel_event, progress)
+            finally:
+                self.db_manager.release_job_lease("new_appointment_notifications", self.worker_id)
+        finally:
+            self._end_run()
+    
+    def _send_new_appointment_notifications(self, cancel_event=None, progress=None):
+        """Mai új időpontok értesítése (lease birtokában)"""
+        new_appointments = self.db_manager.get_todays_new_appointments()
+        sent_count = 0
+        
+        for index, event in enumerate(new_appointments):
+            # Leállításkor / megszakításkor a hátralévő értesítések a következő körre maradnak
+            if self._should_stop(cancel_event):
+                break
+            
+            if progress:
+                progress(index, len(new_appointments))
+            
+            # A lease megújítása minden esemény előtt; ha közben lejárt és más
+            # példány vette át, a hátralévő eseményeket az folytatja
+            if not self.db_manager.acquire_job_lease("new_appointment_notifications", self.worker_id, self.LEASE_SECONDS):
+                self.db_manager.add_log("WARNING", "Új időpont értesítés: a lease elveszett, a kör megszakítva")
+                break
+            
+            # Eseményenkénti atomi foglalás: más példány által már lefoglalt
+            # vagy közben elküldött értesítést kihagyunk
+            if not self.db_manager.claim_new_appointment(event[0], self.worker_id, self.CLAIM_SECONDS):
+                continue
+            
+            sent = False
+            try:
+                patient_email = event[2]
+                if patient_email:
+                    patient = self.db_manager.get_patient_by_email(patient_email)
+                    
+                    if patient:
+                        start_time = datetime.strptime(event[5], '%Y-%m-%d %H:%M:%S')
+                        appointment_date = start_time.strftime("%Y-%m-%d")
+                        appointment_time = start_time.strftime("%H:%M")
+                        
+                        success, message = self.email_manager.send_new_appointment_notification(
+                            patient_email, patient[1], appointment_date, appointment_time
+                        )
+                        
+                        if success:
+                            self.db_manager.mark_new_appointment_notified(event[0])
+                            sent = True
+                            self.db_manager.add_log("INFO", f"Új időpont értesítés elküldve: {patient[1]}", patient_email,
+                                                    patient_name=patient[1])
+                            sent_count += 1
+                        else:
+                            self.db_manager.add_log("ERROR", f"Új időpont értesítési hiba: {message}", patient_email)
+            
+            except Exception as e:
+                self.db_manager.add_log("ERROR", f"Új időpont értesítési feldolgozási hiba: {str(e)}")
+            
+            finally:
+                # Sikertelen küldés után a foglalás feloldása, a következő kör újrapróbálja
+                if not sent:
+                    self.db_manager.release_new_appointment_claim(event[0], self.worker_id)
+        
+        return sent_count
+
+class CampaignManager:
+    """Körlevél kampányok küldése: darabolt, párhuzamos, ütemezett, szüneteltethető
+    
+    A kampány állapota és a címzettenkénti eredmény az adatbázisban van,
+    így szüneteltetés, megszakítás és újraindítás után is pontosan onnan
+    folytatható, ahol abbamaradt. A workerek atomi claim-mel foglalnak
+    le egy-egy adag címzettet, és workerenként egy SMTP kapcsolatot
+    használnak. A küldési sebességet DeliveryPacer egyenletesíti.
+    A ShutdownCoordinator résztvevője: kilépéskor a futó kampány 'running'
+    marad, és a következő induláskor automatikusan folytatódik.
+    """
+    CLAIM_SECONDS = 300     # Címzett foglalás lejárata (elhalt worker esetén újra küldhető)
+    MAX_ATTEMPTS = 2        # Címzettenkénti küldési kísérletek száma
+    RETRY_SECONDS = 30      # Másik példány által foglalt címzettek újrapróbálási gyakorisága
+    
+    STATUS_LABELS = {
+        'draft': 'Piszkozat',
+        'running': 'Fut',
+        'paused': 'Szüneteltetve',
+        'cancelled': 'Megszakítva',
+        'completed': 'Befejezve',
+    }
+    
+    def __init__(self, db_manager, config_manager, email_manager):
+        self.db_manager = db_manager
+        self.config_manager = config_manager
+        self.email_manager = email_manager
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}-campaign"
+        
+        self.runs = {}          # kampány id -> (stop esemény, koordináló szál)
+        self.lock = threading.Lock()
+        self.accepting = True
+    
+    def start(self, campaign_id):
+        """Kampány indítása / folytatása; False, ha már fut vagy leállítás alatt vagyunk
+        
+        Ha a kampány előző futása még éppen leáll (gyors szüneteltetés és
+        folytatás), az új futás a régi szál végét megvárva indul.
+        """
+        with self.lock:
+            previous = self.runs.get(campaign_id)
+            if not self.accepting or (previous is not None and not previous[0].is_set()):
+                return False
+            
+            stop_event = threading.Event()
+            previous_thread = previous[1] if previous is not None else None
+            thread = threading.Thread(target=self._run, args=(campaign_id, stop_event, previous_thread), daemon=True)
+            self.runs[campaign_id] = (stop_event, thread)
+        
+        self.db_manager.set_campaign_status(campaign_id, 'running')
+        thread.start()
+        return True
+    
+    def pause(self, campaign_id):
+        """Szüneteltetés: a folyamatban lévő emailek után megáll, később folytatható"""
+        self.db_manager.set_campaign_status(campaign_id, 'paused')
+        self._stop(campaign_id)
+        self.db_manager.add_log("INFO", f"Kampány szüneteltetve (#{campaign_id})")
+    
+    def resume(self, campaign_id):
+        """Szüneteltetett kampány folytatása"""
+        if self.start(campaign_id):
+            self.db_manager.add_log("INFO", f"Kampány folytatva (#{campaign_id})")
+            return True
+        return False
+    
+    def cancel(self, campaign_id):
+        """Megszakítás: a még el nem küldött címzettek nem kapják meg az üzenetet"""
+        self.db_manager.set_campaign_status(campaign_id, 'cancelled')
+        self._stop(campaign_id)
+        self.db_manager.add_log("INFO", f"Kampány megszakítva (#{campaign_id})")
+    
+    def is_running(self, campaign_id):
+        with self.lock:
+            run = self.runs.get(campaign_id)
+            return run is not None and not run[0].is_set()
+    
+    def resume_interrupted(self):
+        """Induláskor: a leállításkor futó kampányok folytatása"""
+        resumed = 0
+        for campaign in self.db_manager.get_campaigns(limit=1000, status='running'):
+            if self.start(campaign[0]):
+                resumed += 1
+        if resumed:
+            self.db_manager.add_log("INFO", f"{resumed} megszakadt kampány folytatva")
+        return resumed
+    
+    def _stop(self, campaign_id):
+        with self.lock:
+            run = self.runs.get(campaign_id)
+        if run:
+            run[0].set()
+    
+    def _create_pacer(self, campaign_id):
+        """Küldési sebesség korlát a hátralévő címzettekre (None = korlátlan)"""
+        rate = self.config_manager.get_float('campaigns', 'rate_per_minute')
+        remaining = self.db_manager.count_pending_campaign_recipients(campaign_id)
+        if rate <= 0 or remaining == 0:
+            return None
+        
+        now = datetime.now()
+        return DeliveryPacer(remaining, now, now + timedelta(seconds=remaining * 60.0 / rate))
+    
+    def _run(self, campaign_id, stop_event, previous_thread=None):
+        """Kampány koordináló szál: workerek indítása és a kampány lezárása
+        
+        Ha a workerek úgy állnak meg, hogy maradt küldendő címzett (másik
+        példány foglalja őket), RETRY_SECONDS múlva újrapróbál, így a lejárt
+        foglalásokat átveszi. A kampány addig fut, amíg be nem fejeződik,
+        meg nem állítják, vagy az állapota már nem 'running'.
+        """
+        try:
+            if previous_thread is not None:
+                previous_thread.join()
+            
+            workers = self.config_manager.get_int('campaigns', 'workers', 1, minimum=1)
+            pacer = self._create_pacer(campaign_id)
+            
+            while not stop_event.is_set():
+                threads = [
+                    threading.Thread(target=self._worker, args=(campaign_id, stop_event, pacer), daemon=True)
+                    for _ in range(workers)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                
+                if stop_event.is_set():
+                    break
+                if self.db_manager.finish_campaign_if_done(campaign_id):
+                    campaign = self.db_manager.get_campaign(campaign_id)
+                    self.db_manager.add_log("INFO", f"Kampány befejezve: {campaign[1]} "
+                                                    f"(elküldve: {campaign[6]}, hibás: {campaign[7]})")
+                    break
+                
+                campaign = self.db_manager.get_campaign(campaign_id)
+                if campaign is None or campaign[4] != 'running':
+                    break
+                stop_event.wait(self.RETRY_SECONDS)
+        except Exception as e:
+            self.db_manager.add_log("ERROR", f"Kampány hiba (#{campaign_id}): {str(e)}")
+        finally:
+            with self.lock:
+                # Közben indított új futás bejegyzése megmarad
+                if self.runs.get(campaign_id, (None,))[0] is stop_event:
+                    del self.runs[campaign_id]
+    
+    def _worker(self, campaign_id, stop_event, pacer):
+        """Egy worker: címzett adagok lefoglalása és küldése saját SMTP kapcsolaton"""
+        campaign = self.db_manager.get_campaign(campaign_id)
+        subject, body = campaign[2], campaign[3]
+        chunk_size = self.config_manager.get_int('campaigns', 'chunk_size', 50, minimum=1)
+        server = None
+        unsent = []
+        
+        try:
+            while not stop_event.is_set():
+                recipients = self.db_manager.claim_campaign_recipients(
+                    campaign_id, self.worker_id, chunk_size, self.CLAIM_SECONDS
+                )
+                if not recipients:
+                    break
+                
+                for index, recipient in enumerate(recipients):
+                    # Újrapróbálásoknál a pacer időrései elfogyhatnak: ilyenkor várakozás nélkül küldünk
+                    if pacer:
+                        pacer.wait_for_slot(stop_event)
+                    # Szüneteltetéskor / leállításkor az adag hátralévő része visszakerül
+                    if stop_event.is_set():
+                        unsent.extend(item[0] for item in recipients[index:])
+                        break
+                    
+                    # recipient: (patient_id, email, name, language, attempts)
+                    patient_id, email, name = recipient[0], recipient[1], recipient[2]
+                    try:
+                        if server is None:
+                            server = self.email_manager.open_connection()
+                        success, message = self.email_manager.send_email(email, subject, body, name, server=server)
+                    except Exception as e:
+                        success, message = False, f"SMTP kapcsolat hiba: {str(e)}"
+                    
+                    if success:
+                        self.db_manager.complete_campaign_recipient(campaign_id, patient_id, True)
+                    else:
+                        final = recipient[4] + 1 >= self.MAX_ATTEMPTS
+                        self.db_manager.complete_campaign_recipient(campaign_id, patient_id, False, message, final)
+                        self.db_manager.add_log("ERROR", f"Kampány üzenet hiba: {message}", email)
+                        # Hiba után új kapcsolat (a régi megszakadhatott)
+                        server = self._close_connection(server)
+        finally:
+            self._close_connection(server)
+            if unsent:
+                self.db_manager.release_campaign_claims(self.worker_id, campaign_id, unsent)
+    
+    @staticmethod
+    def _close_connection(server):
+        """SMTP kapcsolat lezárása (hiba esetén is); mindig None-t ad vissza"""
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+        return None
+    
+    # Leállítási protokoll (ShutdownCoordinator résztvevő)
+    def stop_accepting(self):
+        """Új kampányok tiltása, futók megállítása (az állapot 'running' marad a folytatáshoz)"""
+        with self.lock:
+            self.accepting = False
+            runs = list(self.runs.values())
+        for stop_event, _ in runs:
+            stop_event.set()
+    
+    def drain(self, deadline):
+        """Folyamatban lévő küldések kivárása a határidőig"""
+        with self.lock:
+            threads = [thread for _, thread in self.runs.values()]
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in threads)
+    
+    def persist_unsent(self, drained):
+        """Saját címzett foglalások feloldása, hogy a következő indulás azonnal folytathassa"""
+        if drained:
+            self.db_manager.release_campaign_claims(self.worker_id)
+
+class AccentFoldTable(dict):
+    """str.translate tábla: karakterenként egyszer számolja ki a kisbetűs, ékezetmentes alakot"""
+    
+    def __missing__(self, codepoint):
+        decomposed = unicodedata.normalize('NFKD', chr(codepoint))
+        folded = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+        self[codepoint] = folded
+        return folded
+
+class PatientSearchIndex:
+    """Normalizált keresési index a páciensekhez (név, email, telefon)
+    
+    Az index egyszer épül fel (kisbetűs, ékezetmentes szöveg mezőnként),
+    a további gépelés pedig az előző találati halmazt szűkíti, így nem kell
+    minden billentyűleütésnél a teljes listát végignézni. Páciens adatok
+    változásakor invalidate() után a következő keresés újraépíti.
+    """
+    
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.entries = None     # [(normalizált szöveg, páciens sor)] (név, id) sorrendben
+        self.last_term = None
+        self.last_matches = None
+    
+    FOLD_TABLE = AccentFoldTable()
+    PHONE_DIGITS_TABLE = str.maketrans('', '', ' +-/()')
+    
+    @staticmethod
+    def normalize(text):
+        """Kisbetűs, ékezetmentes alak (pl. 'Kovács Ödön' -> 'kovacs odon')"""
+        if not text:
+            return ''
+        return str(text).translate(PatientSearchIndex.FOLD_TABLE)
+    
+    def invalidate(self):
+        """Index elavulttá jelölése (páciens hozzáadás / módosítás / törlés után)"""
+        self.entries = None
+        self.last_term = None
+        self.last_matches = None
+    
+    def build(self):
+        """Index felépítése az aktív páciensekből"""
+        entries = []
+        for patient in self.db_manager.get_patients():
+            # patient: (id, name, email, phone, language, created_at, active)
+            phone = patient[3] or ''
+            phone_digits = phone.translate(PatientSearchIndex.PHONE_DIGITS_TABLE)
+            # A mezőket elválasztó karakter miatt egy keresőszó nem nyúlhat át két mezőn
+            text = '\x00'.join((self.normalize(patient[1]), self.normalize(patient[2]),
+                                 self.normalize(phone), phone_digits))
+            entries.append((text, patient))
+        
+        entries.sort(key=lambda entry: (entry[1][1], entry[1][0]))
+        self.entries = entries
+        self.last_term = None
+        self.last_matches = None
+    
+    def search(self, term):
+        """Páciens sorok, amelyek a kifejezés minden szavát tartalmazzák
+        
+        Ha az új kifejezés az előző folytatása, csak az előző találatok
+        között keres (a szavak részszövegként illeszkednek, így a szűkítés
+        helyes).
+        """
+        if self.entries is None:
+            self.build()
+        
+        normalized = self.normalize(term).strip()
+        tokens = normalized.split()
+        if not tokens:
+            return [patient for _, patient in self.entries]
+        
+        if self.last_term is not None and normalized.startswith(self.last_term):
+            candidates = self.last_matches
+        else:
+            candidates = self.entries
+        
+        if len(tokens) == 1:
+            token = tokens[0]
+            matches = [entry for entry in candidates if token in entry[0]]
+        else:
+            matches = [entry for entry in candidates if all(token in entry[0] for token in tokens)]
+        
+        self.last_term = normalized
+        self.last_matches = matches
+        return [patient for _, patient in matches]
+
+class VirtualPatientList:
+    """Virtualizált páciens lista - csak a látható sorokat rendereli a Treeview-ban
+    
+    A sorokat oldalanként, (rendezési oszlop, id) szerinti keyset lapozással
+    tölti be az adatbázisból, kis LRU oldal gyorsítótárral. Keresés közben
+    a sorok az FTS indexből jönnek (search_patients_fulltext); titkosított
+    páciens adatoknál, ahol nincs FTS index, a memóriabeli PatientSearchIndex
+    találataiból. A görgetősávot a lista
+    maga kezeli a teljes találatszám alapján. A kijelölés páciens azonosítók
+    szerint tárolódik, így görgetés és rendezés után is megmarad.
+    """
+    PAGE_SIZE = 100          # Egy adatbázis lekérdezéssel betöltött sorok
+    MAX_CACHED_PAGES = 20    # Memóriában tartott oldalak száma
+    BUFFER_ROWS = 20         # Látható ablakon túl előre betöltött sorok
+    ROW_HEIGHT = 24          # Becsült sormagasság (px) az ablakméret számításához
+    HEADER_HEIGHT = 28       # Becsült fejléc magasság (px)
+    SEARCH_DEBOUNCE_MS = 200 # Keresés késleltetése gépelés közben
+    SEARCH_RESULT_LIMIT = 5000  # Megjelenített találatok maximális száma
+    
+    # Treeview oszlop -> rendezési oszlop
+    SORTABLE_HEADINGS = {'#0': 'name', 'ID': 'id', 'Email': 'email', 'Regisztráció': 'created_at'}
+    
+    def __init__(self, tree, scrollbar, db_manager, status_var=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.db_manager = db_manager
+        self.status_var = status_var
+        
+        self.sort_column = 'name'
+        self.descending = False
+        self.search = None
+        self.search_index = PatientSearchIndex(db_manager)
+        self.search_rows = None      # Keresési találatok (rendezve, limitálva)
+        self.search_after_id = None
+        
+        self.total = 0
+        self.offset = 0
+        self.visible_rows = int(tree.cget('height'))
+        self.pages = OrderedDict()   # oldal index -> sorok
+        self.page_anchors = {}       # oldal index -> előző oldal utolsó kulcsa
+        self.selected_ids = set()
+        self.heading_texts = {heading: tree.heading(heading, 'text') for heading in self.SORTABLE_HEADINGS}
+        
+        self.scrollbar.configure(command=self.on_scrollbar)
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll(3))
+        self.tree.bind('<Button-1>', self.on_click, add='+')
+        self.tree.bind('<<TreeviewSelect>>', self.on_select, add='+')
+        self.tree.bind('<Configure>', self.on_resize, add='+')
+        self.tree.bind('<Down>', lambda event: self.on_arrow_key(1))
+        self.tree.bind('<Up>', lambda event: self.on_arrow_key(-1))
+        self.tree.bind('<Next>', lambda event: self.scroll(self.visible_rows) or 'break')
+        self.tree.bind('<Prior>', lambda event: self.scroll(-self.visible_rows) or 'break')
+        
+        for heading, column in self.SORTABLE_HEADINGS.items():
+            self.tree.heading(heading, command=lambda column=column: self.sort_by(column))
+    
+    # Adatok
+    def refresh(self):
+        """Adatok újratöltése (index, találatszám, gyorsítótár) a görgetési pozíció megtartásával"""
+        self.search_index.invalidate()
+        self.pages.clear()
+        self.page_anchors.clear()
+        
+        if self.search:
+            self._apply_search()
+        else:
+            self.search_rows = None
+            self.total = self.db_manager.count_patients()
+            self._set_status(None)
+        self.render()
+    
+    def schedule_search(self, search):
+        """Keresés késleltetett indítása - gyors gépelésnél csak az utolsó fut le"""
+        if self.search_after_id is not None:
+            self.tree.after_cancel(self.search_after_id)
+        self.search_after_id = self.tree.after(self.SEARCH_DEBOUNCE_MS, lambda: self.set_search(search))
+    
+    def set_search(self, search):
+        """Szűrés keresési kifejezésre (üres = minden páciens)"""
+        self.search_after_id = None
+        search = search.strip() if search else None
+        if search == self.search:
+            return
+        
+        self.search = search
+        self.offset = 0
+        if search:
+            self._apply_search()
+            self.render()
+        else:
+            self.refresh()
+    
+    def _apply_search(self):
+        """Keresés az indexben, találatok rendezése és limitálása
+        
+        Titkosítás nélkül az FTS index a legrelevánsabb SEARCH_RESULT_LIMIT
+        találatot adja (prefix illeszkedés szavanként); a memóriabeli index
+        csak titkosított módban épül fel.
+        """
+        if self.db_manager.pii is None:
+            matches = self.db_manager.search_patients_fulltext(self.search, self.SEARCH_RESULT_LIMIT + 1)
+            more = len(matches) > self.SEARCH_RESULT_LIMIT
+            matches = matches[:self.SEARCH_RESULT_LIMIT]
+            if self.sort_column == 'name' and not self.descending:
+                matches.sort(key=lambda patient: (patient[1] or '', patient[0]))
+        else:
+            matches = self.search_index.search(self.search)
+            more = len(matches) > self.SEARCH_RESULT_LIMIT
+        
+        if self.sort_column != 'name' or self.descending:
+            column_index = self.db_manager.PATIENT_SORT_COLUMNS[self.sort_column]
+            matches = sorted(matches, key=lambda patient: (patient[column_index] or '', patient[0]),
+                             reverse=self.descending)
+        
+        self.search_rows = matches[:self.SEARCH_RESULT_LIMIT]
+        self.total = len(self.search_rows)
+        self._set_status(len(matches), more)
+    
+    def _set_status(self, match_count, more=False):
+        """Találatszám kiírása (more: a limitnél több találat van)"""
+        if self.status_var is None:
+            return
+        if match_count is None:
+            self.status_var.set('')
+        elif more and match_count <= self.SEARCH_RESULT_LIMIT:
+            self.status_var.set(f"Több mint {self.SEARCH_RESULT_LIMIT} találat (első {self.SEARCH_RESULT_LIMIT} megjelenítve)")
+        elif match_count > self.SEARCH_RESULT_LIMIT:
+            self.status_var.set(f"{match_count} találat (első {self.SEARCH_RESULT_LIMIT} megjelenítve)")
+        else:
+            self.status_var.set(f"{match_count} találat")
+    
+    def sort_by(self, column):
+        """Rendezés oszlop szerint (ismételt kattintásra irányváltás)"""
+        if column == self.sort_column:
+            self.descending = not self.descending
+        else:
+            self.sort_column = column
+            self.descending = False
+        
+        # Rendezési irány jelzése a fejlécben
+        for heading, heading_column in self.SORTABLE_HEADINGS.items():
+            text = self.heading_texts[heading]
+            if heading_column == self.sort_column:
+                text += ' ▼' if self.descending else ' ▲'
+            self.tree.heading(heading, text=text)
+        
+        self.offset = 0
+        if self.search:
+            self._apply_search()
+            self.render()
+        else:
+            self.refresh()
+    
+    def _row_key(self, row):
+        """Sor keyset kulcsa: (rendezési érték, id)"""
+        return (row[self.db_manager.PATIENT_SORT_COLUMNS[self.sort_column]], row[0])
+    
+    def _load_page(self, page_index):
+        """Oldal betöltése (gyorsítótárból vagy keyset lekérdezéssel)"""
+        if page_index in self.pages:
+            self.pages.move_to_end(page_index)
+            return self.pages[page_index]
+        
+        if page_index == 0:
+            after_key = None
+        elif self.pages.get(page_index - 1):
+            after_key = self._row_key(self.pages[page_index - 1][-1])
+        elif page_index in self.page_anchors:
+            after_key = self.page_anchors[page_index]
+        else:
+            # Távoli ugrás (görgetősáv húzása): a kezdő kulcs egyszeri pozíció alapú lekérése
+            after_key = self.db_manager.get_patient_sort_key_at(
+                page_index * self.PAGE_SIZE - 1, self.sort_column, self.descending, search=self.search
+            )
+        
+        rows = self.db_manager.get_patients_page(
+            after_key, self.PAGE_SIZE, self.sort_column, self.descending, search=self.search
+        )
+        
+        self.pages[page_index] = rows
+        if rows:
+            self.page_anchors[page_index + 1] = self._row_key(rows[-1])
+        
+        while len(self.pages) > self.MAX_CACHED_PAGES:
+            self.pages.popitem(last=False)
+        
+        return rows
+    
+    def get_rows(self, offset, count):
+        """Sorok az [offset, offset + count) tartományban (a puffer sorokat is betölti)"""
+        if self.total == 0 or count <= 0:
+            return []
+        
+        if self.search_rows is not None:
+            return self.search_rows[offset:offset + count]
+        
+        end = min(self.total, offset + count + self.BUFFER_ROWS)
+        first_page = offset // self.PAGE_SIZE
+        last_page = (end - 1) // self.PAGE_SIZE
+        
+        rows = []
+        for page_index in range(first_page, last_page + 1):
+            page_rows = self._load_page(page_index)
+            page_start = page_index * self.PAGE_SIZE
+            for index, row in enumerate(page_rows):
+                if offset <= page_start + index < offset + count:
+                    rows.append(row)
+        return rows
+    
+    # Megjelenítés
+    def format_row(self, patient):
+        """Páciens sor megjelenítési értékei"""
+        # patient: (id, name, email, phone, language, created_at, active)
+        created_date = patient[5][:10] if patient[5] and len(patient[5]) > 10 else patient[5]
+        return patient[1], (
+            patient[0],                      # ID
+            patient[2],                      # Email
+            patient[3] or '',                # Telefon
+            (patient[4] or 'hu').upper(),    # Nyelv
+            created_date                     # Regisztráció dátuma
+        )
+    
+    def render(self):
+        """Látható ablak kirajzolása - csak a változott sorokat módosítja"""
+        max_offset = max(0, self.total - self.visible_rows)
+        self.offset = max(0, min(self.offset, max_offset))
+        rows = self.get_rows(self.offset, self.visible_rows)
+        
+        new_ids = [str(row[0]) for row in rows]
+        new_id_set = set(new_ids)
+        stale = [iid for iid in self.tree.get_children() if iid not in new_id_set]
+        if stale:
+            self.tree.delete(*stale)
+        
+        for index, row in enumerate(rows):
+            iid = str(row[0])
+            text, values = self.format_row(row)
+            if self.tree.exists(iid):
+                self.tree.item(iid, text=text, values=values)
+                self.tree.move(iid, '', index)
+            else:
+                self.tree.insert('', index, iid=iid, text=text, values=values)
+        
+        # Kijelölés visszaállítása a látható sorokra
+        selected_visible = [iid for iid in new_ids if int(iid) in self.selected_ids]
+        if selected_visible:
+            self.tree.selection_set(selected_visible)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+        
+        # Görgetősáv a teljes találatszámhoz
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, min(1.0, (self.offset + len(rows)) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    # Görgetés
+    def scroll(self, delta_rows):
+        """Görgetés adott számú sorral"""
+        self.offset += delta_rows
+        self.render()
+    
+    def on_scrollbar(self, action, value, unit=None):
+        """Görgetősáv parancs (moveto / scroll)"""
+        if action == 'moveto':
+            self.offset = int(float(value) * self.total)
+            self.render()
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self.scroll(int(value) * step)
+    
+    def on_mousewheel(self, event):
+        """Egérgörgő (Windows / macOS)"""
+        self.scroll(-3 if event.delta > 0 else 3)
+        return 'break'
+    
+    def on_arrow_key(self, direction):
+        """Nyíl billentyűk: a látható ablak szélén a lista görget"""
+        children = self.tree.get_children()
+        if not children:
+            return 'break'
+        
+        focus = self.tree.focus()
+        edge = children[-1] if direction > 0 else children[0]
+        if focus != edge:
+            return None  # Alapértelmezett Treeview kezelés
+        
+        self.scroll(direction)
+        children = self.tree.get_children()
+        new_focus = children[-1] if direction > 0 else children[0]
+        self.selected_ids = {int(new_focus)}
+        self.tree.focus(new_focus)
+        self.tree.selection_set(new_focus)
+        return 'break'
+    
+    def on_resize(self, event):
+        """Ablakméret változás: látható sorok számának újraszámolása"""
+        rows = max(1, (event.height - self.HEADER_HEIGHT) // self.ROW_HEIGHT)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.tree.configure(height=rows)
+            self.render()
+    
+    # Kijelölés
+    def on_click(self, event):
+        """Módosító billentyű nélküli kattintás: a nem látható kijelölések törlése"""
+        if not event.state & 0x0005:  # Shift (0x1) / Control (0x4)
+            self.selected_ids.clear()
+    
+    def on_select(self, event=None):
+        """Treeview kijelölés szinkronizálása az azonosító halmazzal (csak a látható sorokra)"""
+        selected = set(self.tree.selection())
+        for iid in self.tree.get_children():
+            if iid in selected:
+                self.selected_ids.add(int(iid))
+            else:
+                self.selected_ids.discard(int(iid))
+    
+    def deselect(self, patient_ids):
+        """Páciensek eltávolítása a kijelölésből (pl. törlés után)"""
+        self.selected_ids.difference_update(patient_ids)
+    
+    def get_selected_ids(self):
+        """Kijelölt páciens azonosítók (minden oldalról)"""
+        return set(self.selected_ids)
+    
+    def get_selected_patients(self):
+        """Kijelölt páciensek teljes sorai (minden oldalról)"""
+        return self.db_manager.get_patients_by_ids(self.selected_ids)
+    
+    def get_focused_patient(self):
+        """Egy páciensre vonatkozó műveletek célja: az egyetlen kijelölt páciens,
+        több kijelölésnél a fókuszban lévő kijelölt sor; egyébként None"""
+        if len(self.selected_ids) == 1:
+            patient_ids = set(self.selected_ids)
+        else:
+            focus = self.tree.focus()
+            if not focus or int(focus) not in self.selected_ids:
+                return None
+            patient_ids = {int(focus)}
+        
+        rows = self.db_manager.get_patients_by_ids(patient_ids)
+        return rows[0] if rows else None
+
+class CalendarEventList:
+    """Lapozható naptár nézet (nap / hét) kulcsolt modellel (calendar_events.id -> megjelenített sor)
+    
+    Egy oldal egy nap vagy egy hét eseményeit mutatja, indexelt
+    kezdési idő tartomány lekérdezéssel. A betöltött oldalak kis LRU
+    gyorsítótárba kerülnek (a lekérdezéskori változásszámlálóval), az
+    előző és következő oldalt háttérszál előre betölti, így a lapozás
+    azonnali. Megjelenítés után a frissítés csak a változásszámláló óta
+    módosult sorokat kéri le, és a Treeview-ban csak a beszúrásokat,
+    módosításokat és törléseket végzi el. A sorrend (kezdési idő, id) szerinti.
+    A gyorsítótárban nem lévő oldal (sorozat kibontással együtt) task_runner
+    megadása esetén háttérszálon töltődik be, és a callbackben rajzolódik ki.
+    """
+    PAGE_DAYS = {'day': 1, 'week': 7}
+    CACHE_PAGES = 12        # Gyorsítótárban tartott oldalak száma
+    
+    def __init__(self, tree, db_manager, range_var=None, task_runner=None):
+        self.tree = tree
+        self.db_manager = db_manager
+        self.range_var = range_var
+        self.task_runner = task_runner
+        self.loading_key = None     # Éppen betöltés alatt álló oldal (mode, oldal kezdete)
+        self.rows = {}          # event id -> (start_time, megjelenített értékek)
+        self.order = []         # [(start_time, id)] rendezve
+        self.change_seq = None
+        self.range_start = None
+        self.range_end = None
+        
+        self.mode = 'week'
+        self.page_start = self.align(datetime.now().date())
+        
+        self.cache = OrderedDict()  # (mode, oldal kezdete) -> (változásszámláló, események)
+        self.cache_lock = threading.Lock()
+    
+    # Oldalak
+    def align(self, day):
+        """Oldal kezdőnapja a dátumhoz (hét nézetben az adott hét hétfője)"""
+        if self.mode == 'week':
+            return day - timedelta(days=day.weekday())
+        return day
+    
+    def page_range(self, page_start):
+        """Oldal időhatárai ('YYYY-MM-DD HH:MM:SS', mindkettő beleértve)"""
+        page_end = page_start + timedelta(days=self.PAGE_DAYS[self.mode] - 1)
+        return f"{page_start.isoformat()} 00:00:00", f"{page_end.isoformat()} 23:59:59"
+    
+    def _fetch_page(self, mode, page_start):
+        """Oldal lekérdezése; a számlálót a lekérdezés előtt olvassuk, így a közbeni változások a diffben újra jönnek"""
+        page_end = page_start + timedelta(days=self.PAGE_DAYS[mode] - 1)
+        range_start, range_end = f"{page_start.isoformat()} 00:00:00", f"{page_end.isoformat()} 23:59:59"
+        # Ismétlődő sorozatok előfordulásai csak a megnézett oldalra
+        self.db_manager.materialize_series(range_start, range_end)
+        change_seq = self.db_manager.get_calendar_change_seq()
+        events = self.db_manager.get_calendar_events(range_start=range_start, range_end=range_end)
+        return change_seq, events
+    
+    def _cache_get(self, key):
+        with self.cache_lock:
+            entry = self.cache.get(key)
+            if entry is not None:
+                self.cache.move_to_end(key)
+            return entry
+    
+    def _cache_put(self, key, entry):
+        with self.cache_lock:
+            self.cache[key] = entry
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.CACHE_PAGES:
+                self.cache.popitem(last=False)
+    
+    def _prefetch_neighbours(self):
+        """Előző és következő oldal betöltése háttérszálon"""
+        days = self.PAGE_DAYS[self.mode]
+        keys = [(self.mode, self.page_start + timedelta(days=days)),
+                (self.mode, self.page_start - timedelta(days=days))]
+        missing = [key for key in keys if self._cache_get(key) is None]
+        if not missing:
+            return
+        
+        def prefetch():
+            for key in missing:
+                try:
+                    self._cache_put(key, self._fetch_page(*key))
+                except Exception as e:
+                    print(f"Naptár előtöltési hiba: {str(e)}")
+        
+        threading.Thread(target=prefetch, daemon=True).start()
+    
+    def show_page(self, page_start=None):
+        """Oldal megjelenítése (gyorsítótárból, ha van), majd a szomszédok előtöltése
+        
+        Gyorsítótár hiány esetén az oldal háttérszálon töltődik be; közben a
+        korábbi oldal látszik, és csak a legutoljára kért oldal rajzolódik ki.
+        """
+        if page_start is not None:
+            self.page_start = self.align(page_start)
+        
+        key = (self.mode, self.page_start)
+        entry = self._cache_get(key)
+        if entry is None and self.task_runner is not None:
+            self.loading_key = key
+            self._set_range_label(*self.page_range(self.page_start), " (betöltés...)")
+            
+            def on_done(entry, task):
+                self._cache_put(key, entry)
+                if self.loading_key == key:
+                    self._show_entry(key, entry)
+            
+            def on_error(error, task):
+                if self.loading_key == key:
+                    # Vissza a még látható oldalra
+                    self.loading_key = None
+                    if self.range_start is not None:
+                        self.page_start = datetime.strptime(self.range_start[:10], '%Y-%m-%d').date()
+                        self._set_range_label(self.range_start, self.range_end)
+                messagebox.showerror("Hiba", f"Naptár betöltési hiba: {str(error)}")
+            
+            self.task_runner.submit("Naptár oldal betöltése", lambda task: self._fetch_page(*key), on_done, on_error,
+                                    show_row=False)
+            return
+        
+        if entry is None:
+            entry = self._fetch_page(*key)
+            self._cache_put(key, entry)
+        self._show_entry(key, entry)
+    
+    def _show_entry(self, key, entry):
+        """Betöltött oldal kirajzolása, a közbeni változások alkalmazása és a szomszédok előtöltése"""
+        self.loading_key = None
+        self.range_start, self.range_end = self.page_range(key[1])
+        self.change_seq, events = entry
+        self._render(events)
+        # A gyorsítótárazás óta történt változások alkalmazása
+        self.refresh()
+        self._set_range_label(self.range_start, self.range_end)
+        self._prefetch_neighbours()
+    
+    def _set_range_label(self, range_start, range_end, suffix=""):
+        """Megjelenített időszak kiírása"""
+        if self.range_var is None:
+            return
+        first_day = range_start[:10]
+        last_day = range_end[:10]
+        self.range_var.set((first_day if first_day == last_day else f"{first_day} – {last_day}") + suffix)
+    
+    def next_page(self):
+        self.show_page(self.page_start + timedelta(days=self.PAGE_DAYS[self.mode]))
+    
+    def previous_page(self):
+        self.show_page(self.page_start - timedelta(days=self.PAGE_DAYS[self.mode]))
+    
+    def go_today(self):
+        self.show_page(datetime.now().date())
+    
+    def set_mode(self, mode):
+        """Nézet váltása ('day' / 'week'), az aktuális oldal első napjánál maradva"""
+        if mode not in self.PAGE_DAYS or mode == self.mode:
+            return
+        first_day = self.page_start
+        if mode == 'day' and self.page_start <= datetime.now().date() < self.page_start + timedelta(days=7):
+            first_day = datetime.now().date()  # Az aktuális héten a mai nap
+        self.mode = mode
+        self.show_page(first_day)
+    
+    def reload(self):
+        """Aktuális oldal újratöltése az adatbázisból (gyorsítótár ürítése)"""
+        with self.cache_lock:
+            self.cache.clear()
+        self.show_page()
+    
+    @staticmethod
+    def format_row(event):
+        """Megjelenített értékek - a tárolt 'YYYY-MM-DD HH:MM:SS' formátumot szeletelve, parse nélkül"""
+        # event: (id, google_event_id, patient_email, event_title, event_description, start_time, end_time, created_at, reminder_sent, is_new_appointment, new_appointment_notified, change_seq)
+        start_time = event[5] or ''
+        return (
+            event[0],                           # ID (elrejtett)
+            start_time[:10],                    # Dátum
+            start_time[11:16],                  # Idő
+            event[2] or 'Ismeretlen',           # Páciens Email
+            event[3],                           # Esemény
+            event[4] or '',                     # Leírás
+            "Elküldve" if event[8] else "Nincs" # Emlékeztető
+        )
+    
+    def _render(self, events):
+        """Teljes kirajzolás egy oldal eseményeiből"""
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self.rows = {}
+        self.order = []
+        
+        for event in events:
+            values = self.format_row(event)
+            self.rows[event[0]] = (event[5], values)
+            self.order.append((event[5], event[0]))
+            self.tree.insert('', 'end', iid=str(event[0]), values=values)
+    
+    def refresh(self):
+        """Változások alkalmazása a legutóbbi frissítés óta"""
+        if self.loading_key is not None:
+            return  # A betöltés alatt álló oldal megjelenítéskor frissül
+        if self.change_seq is None:
+            self.show_page()
+            return
+        
+        changes = self.db_manager.get_calendar_event_changes(self.change_seq)
+        if changes is None:
+            self.reload()
+            return
+        
+        self.change_seq, changed, deleted = changes
+        
+        for event_id in deleted:
+            self._remove(event_id)
+        
+        for event in changed:
+            if event[5] and self.range_start <= event[5] <= self.range_end:
+                self._upsert(event)
+            else:
+                self._remove(event[0])  # Kikerült a megjelenített időszakból
+    
+    def _remove(self, event_id):
+        """Sor törlése a modellből és a Treeview-ból"""
+        row = self.rows.pop(event_id, None)
+        if row is None:
+            return
+        
+        index = bisect.bisect_left(self.order, (row[0], event_id))
+        del self.order[index]
+        if self.tree.exists(str(event_id)):
+            self.tree.delete(str(event_id))
+    
+    def _upsert(self, event):
+        """Sor beszúrása / módosítása a rendezett helyén"""
+        event_id = event[0]
+        values = self.format_row(event)
+        key = (event[5], event_id)
+        
+        if event_id in self.rows:
+            old_start, old_values = self.rows[event_id]
+            if old_start == event[5] and old_values == values:
+                return
+            
+            if old_start != event[5]:
+                # Időpont változott: áthelyezés a rendezett helyre
+                del self.order[bisect.bisect_left(self.order, (old_start, event_id))]
+                index = bisect.bisect_left(self.order, key)
+                self.order.insert(index, key)
+                self.tree.move(str(event_id), '', index)
+            
+            self.rows[event_id] = (event[5], values)
+            self.tree.item(str(event_id), values=values)
+            return
+        
+        index = bisect.bisect_left(self.order, key)
+        self.order.insert(index, key)
+        self.rows[event_id] = (event[5], values)
+        self.tree.insert('', index, iid=str(event_id), values=values)
+
+class AppointmentIntervalIndex:
+    """Időpont-ütközések indexe a naptár eseményeire
+    
+    Az események [kezdés, vége) intervallumai kezdési idő szerint rendezett
+    listában vannak, a rövid események leghosszabb hosszával együtt. Az
+    átfedés-lekérdezés bisect-tel a [kezdés - leghosszabb hossz, vége)
+    kezdési tartományra ugrik, így O(log n + k). A LONG_EVENT-nél hosszabb
+    (egész napos, több napos) események külön, kis listában vannak, hogy a
+    keresési ablakot ne tágítsák. Az egymás után következő időpontok
+    (10:00-10:30, 10:30-11:00) nem ütköznek, a nulla hosszú bejegyzések
+    nem foglalnak időt.
+    
+    A naptár egyetlen rendelői erőforrás: a Google, a manuális és az ICS
+    események egymással is ütközhetnek. A frissítés a CalendarEventList-hez
+    hasonlóan csak a változásszámláló óta módosult sorokat alkalmazza, így
+    szinkronizálás és manuális felvétel után is olcsó.
+    """
+    LONG_EVENT = timedelta(hours=12)
+    CHECK_DEBOUNCE_MS = 300     # Ütközés ellenőrzés késleltetése gépelés közben
+    
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.entries = {}       # event id -> (start_time, end_time, patient_email, event_title)
+        self.order = []         # [(start_time, end_time, id)] rendezve, rövid események
+        self.long_events = {}   # event id -> (start_time, end_time)
+        self.durations = Counter()  # rövid események hossza -> darabszám (max_duration újraszámolásához)
+        self.max_duration = timedelta(0)
+        self.change_seq = None
+        self.lock = threading.Lock()
+    
+    def _add(self, event_id, patient_email, event_title, start_time, end_time, keep_sorted=True):
+        """Esemény felvétele; a hibás és nulla hosszú időpontok kimaradnak"""
+        if not start_time or not end_time:
+            return
+        try:
+            duration = datetime.fromisoformat(end_time) - datetime.fromisoformat(start_time)
+        except ValueError:
+            return
+        if duration <= timedelta(0):
+            return
+        
+        self.entries[event_id] = (start_time, end_time, patient_email, event_title)
+        if duration > self.LONG_EVENT:
+            self.long_events[event_id] = (start_time, end_time)
+            return
+        
+        if keep_sorted:
+            bisect.insort(self.order, (start_time, end_time, event_id))
+        else:
+            self.order.append((start_time, end_time, event_id))
+        self.durations[duration] += 1
+        if duration > self.max_duration:
+            self.max_duration = duration
+    
+    def _remove(self, event_id):
+        entry = self.entries.pop(event_id, None)
+        if entry is None:
+            return
+        if self.long_events.pop(event_id, None) is not None:
+            return
+        
+        del self.order[bisect.bisect_left(self.order, (entry[0], entry[1], event_id))]
+        duration = datetime.fromisoformat(entry[1]) - datetime.fromisoformat(entry[0])
+        self.durations[duration] -= 1
+        if self.durations[duration] <= 0:
+            del self.durations[duration]
+            # A leghosszabb esemény törlése után a keresési ablak visszaszűkül
+            if duration == self.max_duration:
+                self.max_duration = max(self.durations, default=timedelta(0))
+    
+    def load(self):
+        """Teljes felépítés az adatbázisból (egyszeri rendezéssel)"""
+        change_seq, intervals = self.db_manager.get_calendar_intervals()
+        self.entries = {}
+        self.order = []
+        self.long_events = {}
+        self.durations = Counter()
+        self.max_duration = timedelta(0)
+        for event_id, patient_email, event_title, start_time, end_time in intervals:
+            self._add(event_id, patient_email, event_title, start_time, end_time, keep_sorted=False)
+        self.order.sort()
+        self.change_seq = change_seq
+    
+    def refresh(self):
+        """Változások alkalmazása a legutóbbi frissítés óta (első híváskor teljes betöltés)"""
+        if self.change_seq is None:
+            self.load()
+            return
+        
+        changes = self.db_manager.get_calendar_event_changes(self.change_seq)
+        if changes is None:
+            self.load()
+            return
+        
+        self.change_seq, changed, deleted = changes
+        for event_id in deleted:
+            self._remove(event_id)
+        for event in changed:
+            # event: (id, google_event_id, patient_email, event_title, event_description, start_time, end_time, ...)
+            self._remove(event[0])
+            self._add(event[0], event[2], event[3], event[5], event[6])
+    
+    def _candidates(self, range_start, range_end):
+        """A [range_start, range_end) tartományt átfedő intervallumok [(kezdés, vége, id)]"""
+        lower = (datetime.fromisoformat(range_start) - self.max_duration).strftime('%Y-%m-%d %H:%M:%S')
+        low = bisect.bisect_left(self.order, (lower,))
+        high = bisect.bisect_left(self.order, (range_end,))
+        candidates = [interval for interval in self.order[low:high] if interval[1] > range_start]
+        candidates.extend((start_time, end_time, event_id)
+                          for event_id, (start_time, end_time) in self.long_events.items()
+                          if start_time < range_end and end_time > range_start)
+        return candidates
+    
+    def _materialize(self, range_start, range_end):
+        """Ismétlődő sorozatok előfordulásai a lekérdezett napokra (a hosszú események visszatekintésével)"""
+        first_day = (datetime.fromisoformat(range_start) - self.LONG_EVENT).strftime('%Y-%m-%d 00:00:00')
+        self.db_manager.materialize_series(first_day, f"{range_end[:10]} 23:59:59")
+    
+    def overlaps(self, start_time, end_time, exclude_id=None):
+        """A [start_time, end_time) időponttal ütköző események kezdés szerint
+        
+        Visszatérés: [(id, start_time, end_time, patient_email, event_title)].
+        """
+        if end_time <= start_time:
+            return []
+        self._materialize(start_time, end_time)
+        with self.lock:
+            self.refresh()
+            candidates = sorted(self._candidates(start_time, end_time))
+            return [(event_id,) + self.entries[event_id] for _, _, event_id in candidates
+                    if event_id != exclude_id]
+    
+    def conflicts(self, range_start, range_end):
+        """Egymással ütköző eseménypárok a [range_start, range_end) tartományban
+        
+        Söprés kezdési idő szerint, a még tartó események kupacával
+        (vége szerint): O(m log m + k) a tartomány m eseményére.
+        Visszatérés: [(korábbi esemény, későbbi esemény)], mindkettő
+        (id, start_time, end_time, patient_email, event_title) alakú.
+        """
+        self._materialize(range_start, range_end)
+        with self.lock:
+            self.refresh()
+            candidates = sorted(self._candidates(range_start, range_end))
+            
+            pairs = []
+            active = []     # [(vége, kezdés, id)] kupac
+            for start_time, end_time, event_id in candidates:
+                while active and active[0][0] <= start_time:
+                    heapq.heappop(active)
+                for _, _, other_id in sorted(active, key=lambda item: (item[1], item[2])):
+                    pairs.append(((other_id,) + self.entries[other_id], (event_id,) + self.entries[event_id]))
+                heapq.heappush(active, (end_time, start_time, event_id))
+            return pairs
+
+class LiveLogView:
+    """Napló lista élő követéssel (tail) és régebbi bejegyzések lapozásával
+    
+    A legfrissebb bejegyzések felül vannak. Időzítve csak az utolsó látott
+    id-nál újabb sorokat kérdezi le és szúrja be, a sorok számát
+    MAX_ROWS-ra korlátozza. Az alsó szélig görgetve a régebbi bejegyzéseket
+    id szerinti keyset lapozással tölti be. A szint / email szűrés az
+    adatbázisban történik.
+    """
+    POLL_MS = 1000        # Új bejegyzések lekérdezésének gyakorisága
+    PAGE_SIZE = 200       # Egy lapozással betöltött régebbi bejegyzések
+    MAX_ROWS = 1000       # Élő követés közben megtartott sorok száma
+    
+    LEVEL_TAGS = {'ERROR': 'error', 'WARNING': 'warning', 'INFO': 'info'}
+    
+    def __init__(self, tree, scrollbar, db_manager):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.db_manager = db_manager
+        
+        self.level = None
+        self.patient_email = None
+        self.search = None
+        
+        self.newest_id = 0
+        self.oldest_id = None
+        self.history_exhausted = False
+        self.loading_older = False
+        
+        # Tag színek egyszer beállítva
+        self.tree.tag_configure('error', foreground='red')
+        self.tree.tag_configure('warning', foreground='orange')
+        self.tree.tag_configure('info', foreground='blue')
+        
+        self.tree.configure(yscrollcommand=self.on_yscroll)
+        self.tree.after(self.POLL_MS, self.poll)
+    
+    def set_filters(self, level=None, patient_email=None, search=None):
+        """Szűrők beállítása és újratöltés"""
+        self.level = level or None
+        self.patient_email = patient_email or None
+        self.search = search or None
+        self.reload()
+    
+    def reload(self):
+        """Lista újratöltése a legfrissebb bejegyzésekkel (vagy keresési találatokkal)"""
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        
+        self.newest_id = 0
+        self.oldest_id = None
+        self.history_exhausted = False
+        
+        if self.search:
+            # Keresési találatok relevancia szerint - ilyenkor nincs élő követés és lapozás
+            self.history_exhausted = True
+            for log in self.db_manager.search_logs(self.search, self.PAGE_SIZE, self.level, self.patient_email):
+                self._insert(log, 'end')
+            return
+        
+        logs = self.db_manager.get_logs_before(None, self.level, self.patient_email, self.PAGE_SIZE)
+        for log in logs:
+            self._insert(log, 'end')
+        
+        if logs:
+            self.newest_id = logs[0][0]
+            self.oldest_id = logs[-1][0]
+        else:
+            # Üres (szűrt) lista: az élő követés a jelenlegi utolsó bejegyzéstől indul
+            latest = self.db_manager.get_logs_before(None, limit=1)
+            self.newest_id = latest[0][0] if latest else 0
+        self.history_exhausted = len(logs) < self.PAGE_SIZE
+    
+    def _insert(self, log, index):
+        """Napló sor beszúrása (iid = napló id)"""
+        # log: (id, timestamp, level, message, patient_email)
+        self.tree.insert('', index, iid=str(log[0]), values=log[1:],
+                         tags=(self.LEVEL_TAGS.get(log[2], ''),))
+    
+    def poll(self):
+        """Új bejegyzések hozzáfűzése (csak ha a fül látható és nincs keresés)"""
+        try:
+            if not self.search and self.tree.winfo_ismapped():
+                self.append_new()
+        except Exception as e:
+            print(f"Napló frissítési hiba: {str(e)}")
+        
+        self.tree.after(self.POLL_MS, self.poll)
+    
+    def append_new(self):
+        """Az utolsó látott id-nál újabb bejegyzések beszúrása felülre"""
+        logs = self.db_manager.get_logs_after(self.newest_id, self.level, self.patient_email, self.MAX_ROWS)
+        if not logs:
+            return
+        
+        for log in logs:
+            self._insert(log, 0)
+        self.newest_id = logs[-1][0]
+        if self.oldest_id is None:
+            self.oldest_id = logs[0][0]
+        
+        # Sorok számának korlátozása - csak ha a felhasználó a lista tetején van (nem a múltat olvassa)
+        children = self.tree.get_children()
+        if len(children) > self.MAX_ROWS and self.tree.yview()[0] == 0.0:
+            self.tree.delete(*children[self.MAX_ROWS:])
+            self.oldest_id = int(children[self.MAX_ROWS - 1])
+            self.history_exhausted = False
+    
+    def load_older(self):
+        """Régebbi bejegyzések betöltése a lista aljára (keyset lapozás id szerint)"""
+        self.loading_older = False
+        if self.history_exhausted or self.search or self.oldest_id is None:
+            return
+        
+        logs = self.db_manager.get_logs_before(self.oldest_id, self.level, self.patient_email, self.PAGE_SIZE)
+        for log in logs:
+            self._insert(log, 'end')
+        if logs:
+            self.oldest_id = logs[-1][0]
+        self.history_exhausted = len(logs) < self.PAGE_SIZE
     
-    def merge_config(self, default, loaded):
-        """Konfigurációk egyesítése"""
-        for key, value in loaded.items():
-            if key in default:
-                if isinstance(value, dict) and isinstance(default[key], dict):
-                    self.merge_config(default[key], value)
-                else:
-                    default[key] = value
+    def on_yscroll(self, first, last):
+        """Görgetősáv frissítése; az aljára érve régebbi bejegyzések betöltése"""
+        self.scrollbar.set(first, last)
+        if float(last) >= 1.0 and not self.history_exhausted and not self.loading_older:
+            self.loading_older = True
+            self.tree.after_idle(self.load_older)
+
+class StartupTimer:
+    """Indítási időmérés szakaszonként (importok, komponensek, GUI, első megjelenítés)"""
     
-    def save_config(self):
-        """Konfiguráció mentése"""
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=2, ensure_ascii=False)
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.marks = []
     
-    def get_email_config(self):
-        """Email konfiguráció lekérése"""
-        return self.config['email']
+    def mark(self, label):
+        """Szakasz vége"""
+        self.marks.append((label, time.perf_counter()))
     
-    def set_email_config(self, smtp_server, smtp_port, email, password, clinic_name):
-        """Email konfiguráció beállítása"""
-        # Jelszó titkosítása
-        encrypted_password = self.security_manager.encrypt_password(password)
-        
-        self.config['email'] = {
-            'smtp_server': smtp_server,
-            'smtp_port': smtp_port,
-            'email': email,
-            'password': encrypted_password,
-            'clinic_name': clinic_name
-        }
-        self.save_config()
+    def elapsed_ms(self):
+        """Indítás óta eltelt idő (ms)"""
+        return (time.perf_counter() - self.started) * 1000
+    
+    def report(self):
+        """Összesítés szövegesen, pl. 'importok 120 ms, GUI 80 ms, ... (összesen 310 ms)'"""
+        parts = []
+        previous = self.started
+        for label, timestamp in self.marks:
+            parts.append(f"{label} {(timestamp - previous) * 1000:.0f} ms")
+            previous = timestamp
+        total = ((self.marks[-1][1] if self.marks else previous) - self.started) * 1000
+        return f"{', '.join(parts)} (összesen {total:.0f} ms)"
 
-class AutomationManager:
-    """Automatizálási kezelő osztály"""
-    def __init__(self, db_manager, config_manager, email_manager, calendar_manager):
-        self.db_manager = db_manager
-        self.config_manager = config_manager
-        self.email_manager = email_manager
-        self.calendar_manager = calendar_manager
-        self.running = False
+class BackgroundTask:
+    """Háttérben futó feladat állapota (a worker szálból csak üzenetküldés a GUI felé)"""
+    
+    def __init__(self, runner, task_id, title, key=None):
+        self.runner = runner
+        self.task_id = task_id
+        self.title = title
+        self.key = key
+        self.cancel_event = threading.Event()
         self.thread = None
+        self.done = 0
+        self.total = None
     
-    def start_automation(self):
-        """Automatizálás indítása"""
-        if not self.running:
-            self.running = True
-            self.setup_schedule()
-            self.thread = threading.Thread(target=self.run_scheduler, daemon=True)
-            self.thread.start()
-            self.db_manager.add_log("INFO", "Automatizálás elindítva")
+    def is_cancelled(self):
+        """Megszakítást kért-e a felhasználó (vagy a leállítás)"""
+        return self.cancel_event.is_set()
     
-    def stop_automation(self):
-        """Automatizálás leállítása"""
-        self.running = False
-        schedule.clear()
-        self.db_manager.add_log("INFO", "Automatizálás leállítva")
+    def report(self, done=None, total=None, text=None):
+        """Előrehaladás jelzése a GUI felé (bármely szálból hívható)"""
+        if total is not None:
+            self.total = total
+        if done is not None:
+            self.done = done
+        self.runner.messages.put(('progress', self, self.done, self.total, text))
     
-    def setup_schedule(self):
-        """Ütemezett feladatok beállítása"""
-        config = self.config_manager.config['automation']
-        
-        # Emlékeztetők küldése naponta 12:00-kor
-        schedule.every().day.at(config['reminder_time']).do(self.send_daily_reminders)
+    def advance(self, step=1, text=None):
+        """Előrehaladás növelése (pl. egy elküldött email után)"""
+        with self.runner.lock:
+            self.done += step
+        self.report(text=text)
+
+class BackgroundTaskRunner:
+    """Hálózati műveletek futtatása háttérszálakon, a GUI blokkolása nélkül
+    
+    A feladat függvény egy háttérszálon fut és a BackgroundTask objektumon
+    keresztül jelez előrehaladást, illetve figyeli a megszakítást. Az
+    eredmények és az előrehaladás egy sorba kerülnek, amelyet a Tk főszál
+    root.after segítségével olvas ki - a widgetekhez és a callbackekhez
+    csak a főszál nyúl. Minden feladat kap egy sort folyamatjelzővel és
+    megszakítás gombbal. A ShutdownCoordinator résztvevője.
+    """
+    POLL_MS = 100               # Üzenetsor olvasási gyakorisága
+    FINISHED_ROW_MS = 4000      # Befejezett feladat sorának megjelenítési ideje
+    
+    def __init__(self, root, parent, db_manager=None):
+        self.root = root
+        self.db_manager = db_manager    # Leállításkor a megszakadt feladatok naplózásához
+        self.messages = queue.Queue()
+        self.lock = threading.Lock()
+        self.tasks = {}
+        self.rows = {}
+        self.callbacks = {}
+        self.next_id = 1
+        self.accepting = True
+        
+        self.panel = ttk.LabelFrame(parent, text="Futó feladatok", style='Modern.TLabelframe')
+        self.panel_visible = False
+        
+        self.root.after(self.POLL_MS, self.poll)
+    
+    def submit(self, title, func, on_done=None, on_error=None, key=None, show_row=True):
+        """Feladat indítása háttérszálon
+        
+        func(task) a háttérszálon fut, on_done(result, task) / on_error(exc, task)
+        a főszálon. Azonos key-jel egyszerre csak egy feladat futhat.
+        show_row=False: rövid, belső feladat (pl. oldal betöltés) sor nélkül.
+        Visszatérési érték: a feladat, vagy None ha nem indult el.
+        """
+        if not self.accepting:
+            return None
+        if key is not None and any(task.key == key for task in self.tasks.values()):
+            messagebox.showwarning("Figyelmeztetés", f"{title}: a feladat már fut!")
+            return None
+        
+        task = BackgroundTask(self, self.next_id, title, key)
+        self.next_id += 1
+        self.tasks[task.task_id] = task
+        self.callbacks[task.task_id] = (on_done, on_error)
+        if show_row:
+            self._add_row(task)
+        
+        def run():
+            try:
+                result = func(task)
+                self.messages.put(('done', task, result))
+            except Exception as e:
+                self.messages.put(('error', task, e))
         
-        # Új időpontok értesítése naponta 15:30-kor
-        schedule.every().day.at(config['new_appointment_time']).do(self.send_new_appointment_notifications)
+        task.thread = threading.Thread(target=run, daemon=True)
+        task.thread.start()
+        return task
     
-    def run_scheduler(self):
-        """Ütemező futtatása"""
-        while self.running:
-            schedule.run_pending()
-            time.sleep(60)  # 1 perc várakozás
+    def cancel(self, task):
+        """Megszakítás kérése - a feladat a következő ellenőrzési pontnál áll meg"""
+        task.cancel_event.set()
+        row = self.rows.get(task.task_id)
+        if row:
+            row['status'].configure(text="Megszakítás...")
+            row['cancel'].configure(state='disabled')
     
-    def send_daily_reminders(self):
-        """Napi emlékeztetők küldése (holnapi időpontokra)"""
-        try:
-            if not self.config_manager.config['automation']['enabled']:
-                return
-            
-            reminders = self.db_manager.get_tomorrows_reminders()
-            sent_count = 0
-            
-            for event in reminders:
-                try:
-                    patient_email = event[2]
-                    if patient_email:
-                        patient = self.db_manager.get_patient_by_email(patient_email)
-                        
-                        if patient:
-                            start_time = datetime.strptime(event[5], '%Y-%m-%d %H:%M:%S')
-                            appointment_date = start_time.strftime("%Y-%m-%d")
-                            appointment_time = start_time.strftime("%H:%M")
-                            
-                            success, message = self.email_manager.send_appointment_reminder(
-                                patient_email, patient[1], appointment_date, appointment_time
-                            )
-                            
-                            if success:
-                                self.db_manager.mark_reminder_sent(event[0])
-                                self.db_manager.add_log("INFO", f"Napi emlékeztető elküldve: {patient[1]}", patient_email)
-                                sent_count += 1
-                            else:
-                                self.db_manager.add_log("ERROR", f"Emlékeztető hiba: {message}", patient_email)
-                
-                except Exception as e:
-                    self.db_manager.add_log("ERROR", f"Emlékeztető feldolgozási hiba: {str(e)}")
-            
-            if sent_count > 0:
-                self.db_manager.add_log("INFO", f"Napi emlékeztető kör befejezve: {sent_count} email elküldve")
+    # Megjelenítés (főszál)
+    def _add_row(self, task):
+        """Feladat sor létrehozása a panelen"""
+        if not self.panel_visible:
+            self.panel.pack(fill='x', pady=(10, 0))
+            self.panel_visible = True
+        
+        frame = ttk.Frame(self.panel, style='Main.TFrame')
+        frame.pack(fill='x', padx=10, pady=3)
+        
+        ttk.Label(frame, text=task.title, style='Modern.TLabel', width=30).pack(side='left')
+        progress = ttk.Progressbar(frame, mode='indeterminate', length=300)
+        progress.pack(side='left', padx=10)
+        progress.start(15)
+        status = ttk.Label(frame, text="Fut...", style='Modern.TLabel', width=30)
+        status.pack(side='left', padx=10)
+        cancel = ttk.Button(frame, text="Megszakítás", command=lambda: self.cancel(task),
+                            style='Danger.TButton')
+        cancel.pack(side='right')
+        
+        self.rows[task.task_id] = {'frame': frame, 'progress': progress, 'status': status, 'cancel': cancel}
+    
+    def _update_row(self, task, done, total, text):
+        """Folyamatjelző frissítése"""
+        row = self.rows.get(task.task_id)
+        if not row:
+            return
         
-        except Exception as e:
-            self.db_manager.add_log("ERROR", f"Napi emlékeztető hiba: {str(e)}")
+        if total:
+            if str(row['progress'].cget('mode')) != 'determinate':
+                row['progress'].stop()
+                row['progress'].configure(mode='determinate', maximum=total)
+            row['progress'].configure(value=min(done, total), maximum=total)
+            if not task.is_cancelled():
+                row['status'].configure(text=text or f"{done} / {total}")
+        elif text and not task.is_cancelled():
+            row['status'].configure(text=text)
     
-    def send_new_appointment_notifications(self):
-        """Mai új időpontok értesítése"""
+    def _finish_row(self, task, text):
+        """Befejezett feladat sora: állapot kiírása, majd eltávolítás"""
+        row = self.rows.get(task.task_id)
+        if not row:
+            return
+        
+        row['progress'].stop()
+        row['progress'].configure(mode='determinate', maximum=1, value=1)
+        row['status'].configure(text=text)
+        row['cancel'].configure(state='disabled')
+        self.root.after(self.FINISHED_ROW_MS, lambda: self._remove_row(task.task_id))
+    
+    def _remove_row(self, task_id):
+        """Feladat sor eltávolítása; üres panel elrejtése"""
+        row = self.rows.pop(task_id, None)
+        if row:
+            row['frame'].destroy()
+        if not self.rows and self.panel_visible:
+            self.panel.pack_forget()
+            self.panel_visible = False
+    
+    def poll(self):
+        """Háttérszálak üzeneteinek feldolgozása a főszálon"""
         try:
-            if not self.config_manager.config['automation']['enabled']:
-                return
-            
-            new_appointments = self.db_manager.get_todays_new_appointments()
-            sent_count = 0
-            
-            for event in new_appointments:
-                try:
-                    patient_email = event[2]
-                    if patient_email:
-                        patient = self.db_manager.get_patient_by_email(patient_email)
-                        
-                        if patient:
-                            start_time = datetime.strptime(event[5], '%Y-%m-%d %H:%M:%S')
-                            appointment_date = start_time.strftime("%Y-%m-%d")
-                            appointment_time = start_time.strftime("%H:%M")
-                            
-                            success, message = self.email_manager.send_new_appointment_notification(
-                                patient_email, patient[1], appointment_date, appointment_time
-                            )
-                            
-                            if success:
-                                self.db_manager.mark_new_appointment_notified(event[0])
-                                self.db_manager.add_log("INFO", f"Új időpont értesítés elküldve: {patient[1]}", patient_email)
-                                sent_count += 1
-                            else:
-                                self.db_manager.add_log("ERROR", f"Új időpont értesítési hiba: {message}", patient_email)
+            while True:
+                message = self.messages.get_nowait()
+                kind, task = message[0], message[1]
                 
-                except Exception as e:
-                    self.db_manager.add_log("ERROR", f"Új időpont értesítési feldolgozási hiba: {str(e)}")
-            
-            if sent_count > 0:
-                self.db_manager.add_log("INFO", f"Új időpont értesítési kör befejezve: {sent_count} email elküldve")
-        
+                if kind == 'progress':
+                    self._update_row(task, message[2], message[3], message[4])
+                    continue
+                
+                self.tasks.pop(task.task_id, None)
+                on_done, on_error = self.callbacks.pop(task.task_id, (None, None))
+                
+                if kind == 'done':
+                    self._finish_row(task, "Megszakítva" if task.is_cancelled() else "Kész")
+                    if on_done:
+                        on_done(message[2], task)
+                else:
+                    self._finish_row(task, "Hiba")
+                    if on_error:
+                        on_error(message[2], task)
+                    else:
+                        messagebox.showerror("Hiba", f"{task.title}: {str(message[2])}")
+        except queue.Empty:
+            pass
         except Exception as e:
-            self.db_manager.add_log("ERROR", f"Új időpont értesítési hiba: {str(e)}")
+            print(f"Háttérfeladat feldolgozási hiba: {str(e)}")
+        
+        if self.accepting or self.tasks:
+            self.root.after(self.POLL_MS, self.poll)
+    
+    # Leállítási protokoll (ShutdownCoordinator résztvevő)
+    def stop_accepting(self):
+        """Új feladatok tiltása, futó feladatok megszakítása"""
+        self.accepting = False
+        for task in list(self.tasks.values()):
+            task.cancel_event.set()
+    
+    def drain(self, deadline):
+        """Futó feladatok szálainak kivárása a határidőig (a főszál közben is feldolgozhatja a sort)"""
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            if task.thread and task.thread.is_alive():
+                task.thread.join(max(0.0, deadline - time.monotonic()))
+        return not any(task.thread and task.thread.is_alive() for task in tasks)
+    
+    def persist_unsent(self, drained):
+        """A határidőig be nem fejeződött feladatok naplózása
+        
+        A küldések foglalásait az AutomationManager / CampaignManager adja
+        vissza; itt csak az rögzül, mely felhasználói műveletek szakadtak meg
+        (pl. naptár szinkron, import), hogy a következő indításkor megismételhetők legyenek.
+        """
+        if drained:
+            return
+        titles = [task.title for task in list(self.tasks.values()) if task.thread and task.thread.is_alive()]
+        if titles and self.db_manager is not None:
+            self.db_manager.add_log("WARNING", f"Leállítás: befejezetlen háttérfeladatok: {', '.join(titles)}")
 
 class ModernPatientReminderApp:
     """Modern Patient Reminder alkalmazás"""
-    def __init__(self, root):
+    CALENDAR_SEARCH_LIMIT = 200     # Naptár keresés megjelenített találatainak maximális száma
+    
+    def __init__(self, root, startup_timer=None):
         self.root = root
+        self.startup_timer = startup_timer or StartupTimer()
         self.root.title("Páciens email emlékeztető rendszer v2.0")
         self.root.geometry("1600x1000")
         
@@ -785,7 +6245,9 @@ class ModernPatientReminderApp:
         # Komponensek inicializálása
         self.db_manager = DatabaseManager()
         self.config_manager = ConfigManager()
-        self.security_manager = SecurityManager()
+        self.db_manager.set_pii_encryption(self.config_manager.get_bool('security', 'encrypt_pii'))
+        self.db_manager.set_reminder_offsets(self.config_manager.get_reminder_offsets())
+        self.security_manager = SecurityManager.shared()
         self.email_manager = EmailManager(self.config_manager)
         
         try:
@@ -798,6 +6260,24 @@ class ModernPatientReminderApp:
             self.email_manager, self.calendar_manager
         )
         
+        self.campaign_manager = CampaignManager(self.db_manager, self.config_manager, self.email_manager)
+        
+        # config.json külső módosításainak követése
+        self.config_manager.start_watching()
+        
+        # Időpont-ütközés index (első használatkor töltődik be)
+        self.appointment_index = AppointmentIntervalIndex(self.db_manager)
+        
+        # Közös leállítási protokoll
+        self.shutdown_coordinator = ShutdownCoordinator(self.db_manager)
+        self.shutdown_coordinator.register(self.automation_manager)
+        self.shutdown_coordinator.register(self.campaign_manager)
+        self.closing = False    # Bezárás folyamatban (a leállítás háttérszálon fut)
+        
+        # Előző futáskor megszakadt kampányok folytatása
+        self.campaign_manager.resume_interrupted()
+        self.startup_timer.mark("komponensek")
+        
         # GUI változók inicializálása
         self.init_variables()
         
@@ -806,9 +6286,20 @@ class ModernPatientReminderApp:
         
         # GUI létrehozása
         self.create_gui()
+        self.startup_timer.mark("GUI")
         
         # Bezárás kezelése
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        # Első megjelenítés mérése: az első idle kör (kirajzolás) után
+        self.root.after_idle(lambda: self.root.after(0, self.report_startup_time))
+    
+    def report_startup_time(self):
+        """Indítási idő naplózása (első megjelenítésig)"""
+        self.startup_timer.mark("első megjelenítés")
+        report = self.startup_timer.report()
+        print(f"Indítási idő: {report}")
+        self.db_manager.add_log("INFO", f"Indítási idő: {report}")
     
     def init_variables(self):
         """GUI változók inicializálása"""
@@ -827,7 +6318,10 @@ class ModernPatientReminderApp:
         
         # Keresés 
         self.search_term = tk.StringVar()
-        self.all_patients = []  # Összes páciens tárolása a szűréshez
+        
+        # Küldési ablak
+        self.delivery_window_end = tk.StringVar(
+            value=self.config_manager.config['automation'].get('delivery_window_end', ''))
         
         # Státusz
         self.automation_status = tk.StringVar(value="Leállítva")
@@ -835,7 +6329,14 @@ class ModernPatientReminderApp:
         
         # Azonnali üzenet
         self.message_subject = tk.StringVar()
+        self.campaign_name = tk.StringVar()
         self.message_recipients = tk.StringVar(value='all')
+        
+        # Címzett szűrő ('filter' mód)
+        self.recipient_language = tk.StringVar()
+        self.recipient_appointment_from = tk.StringVar()
+        self.recipient_appointment_to = tk.StringVar()
+        self.recipient_last_contacted_before = tk.StringVar()
     
     def setup_styles(self):
         """Modern stílusok beállítása"""
@@ -979,19 +6480,37 @@ class ModernPatientReminderApp:
         self.notebook = ttk.Notebook(main_frame, style='Modern.TNotebook')
         self.notebook.pack(fill='both', expand=True)
         
-        # Fülek létrehozása
-        self.create_settings_tab()
-        self.create_patients_tab()
-        self.create_calendar_tab()
-        self.create_messages_tab()
-        self.create_automation_tab()
-        self.create_templates_tab()
-        self.create_logs_tab()
+        # Háttérfeladatok (hálózati műveletek) panelje a fülek alatt
+        self.task_runner = BackgroundTaskRunner(self.root, main_frame, self.db_manager)
+        self.shutdown_coordinator.register(self.task_runner)
+        
+        # Fülek: üres keret most, a tartalom az első kiválasztáskor épül fel
+        self.tab_builders = {}
+        for tab_title, builder in (
+            ("Beállítások", self.create_settings_tab),
+            ("Páciensek", self.create_patients_tab),
+            ("Naptár", self.create_calendar_tab),
+            ("Azonnali üzenetek", self.create_messages_tab),
+            ("Automatizálás", self.create_automation_tab),
+            ("Email sablonok", self.create_templates_tab),
+            ("Naplók", self.create_logs_tab),
+        ):
+            tab_frame = ttk.Frame(self.notebook, style='Main.TFrame')
+            self.notebook.add(tab_frame, text=tab_title)
+            self.tab_builders[str(tab_frame)] = builder
+        
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.on_tab_changed()
     
-    def create_settings_tab(self):
+    def on_tab_changed(self, event=None):
+        """Kiválasztott fül felépítése az első megjelenítéskor"""
+        tab_name = self.notebook.select()
+        builder = self.tab_builders.pop(tab_name, None)
+        if builder:
+            builder(self.notebook.nametowidget(tab_name))
+    
+    def create_settings_tab(self, settings_frame):
         """Beállítások fül"""
-        settings_frame = ttk.Frame(self.notebook, style='Main.TFrame')
-        self.notebook.add(settings_frame, text="Beállítások")
         
         # Email beállítások
         email_section = ttk.LabelFrame(settings_frame, text="Email beállítások", 
@@ -1044,10 +6563,8 @@ class ModernPatientReminderApp:
         ttk.Entry(row_frame, textvariable=variable, width=35, show=show, 
                  style='Modern.TEntry').pack(side='right')
     
-    def create_patients_tab(self):
+    def create_patients_tab(self, patients_frame):
         """Páciensek fül"""
-        patients_frame = ttk.Frame(self.notebook, style='Main.TFrame')
-        self.notebook.add(patients_frame, text="Páciensek")
         
         # Új páciens hozzáadása section
         add_section = ttk.LabelFrame(patients_frame, text="Új páciens hozzáadása", 
@@ -1083,7 +6600,11 @@ class ModernPatientReminderApp:
         ttk.Button(left_buttons, text="Kijelölt páciens törlése", command=self.delete_selected_patient,
                 style='Danger.TButton').pack(side='left')
 
-        # Jobb oldali gomb
+        # Jobb oldali gombok
+        ttk.Button(add_button_frame, text="Exportálás", command=self.open_export_dialog,
+                style='Secondary.TButton').pack(side='right', padx=(10, 0))
+        ttk.Button(add_button_frame, text="Mappa importálása", command=self.import_folder,
+                style='Secondary.TButton').pack(side='right', padx=(10, 0))
         ttk.Button(add_button_frame, text="Excel importálás", command=self.import_excel,
                 style='Secondary.TButton').pack(side='right')
         
@@ -1098,8 +6619,9 @@ class ModernPatientReminderApp:
         # Keresés változó és mező
         self.search_term = tk.StringVar()
         self.search_term.trace('w', self.filter_patients)  # Automatikus szűrés
+        self.search_status = tk.StringVar()
         
-        ttk.Label(search_frame, text="Keresés (név vagy email):", style='Modern.TLabel').pack(side='left', padx=(0, 10))
+        ttk.Label(search_frame, text="Keresés (név, email vagy telefon):", style='Modern.TLabel').pack(side='left', padx=(0, 10))
         search_entry = ttk.Entry(search_frame, textvariable=self.search_term, width=30, 
                                 style='Modern.TEntry')
         search_entry.pack(side='left', padx=(0, 10))
@@ -1107,6 +6629,8 @@ class ModernPatientReminderApp:
         ttk.Button(search_frame, text="Keresés törlése", command=self.clear_search,
                 style='Primary.TButton').pack(side='left', padx=5)
         
+        ttk.Label(search_frame, textvariable=self.search_status, style='Modern.TLabel').pack(side='left', padx=10)
+        
         # Páciensek lista section
         list_section = ttk.LabelFrame(patients_frame, text="Páciensek listája (CTRL + Space több páciens kijelölése)", 
                                     style='Modern.TLabelframe')
@@ -1137,13 +6661,16 @@ class ModernPatientReminderApp:
         self.patients_tree.column('Nyelv', width=80, anchor='center')
         self.patients_tree.column('Regisztráció', width=120)
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(tree_container, orient='vertical', command=self.patients_tree.yview)
-        self.patients_tree.configure(yscrollcommand=scrollbar.set)
+        # Scrollbar - a virtualizált lista kezeli (teljes találatszám alapján)
+        scrollbar = ttk.Scrollbar(tree_container, orient='vertical')
         
         self.patients_tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
         
+        # Virtualizált lista: csak a látható sorok kerülnek a Treeview-ba
+        self.patients_view = VirtualPatientList(self.patients_tree, scrollbar, self.db_manager,
+                                                status_var=self.search_status)
+        
         # Műveletek 
         actions_frame = ttk.Frame(list_section, style='Main.TFrame')
         actions_frame.pack(fill='x', padx=15, pady=15)
@@ -1160,10 +6687,8 @@ class ModernPatientReminderApp:
         # Páciensek betöltése
         self.refresh_patients_list()
     
-    def create_calendar_tab(self):
-        """Naptár fül - 30 napos előretekintés"""
-        calendar_frame = ttk.Frame(self.notebook, style='Main.TFrame')
-        self.notebook.add(calendar_frame, text="Naptár")
+    def create_calendar_tab(self, calendar_frame):
+        """Naptár fül - napi / heti lapozás"""
         
         # Vezérlő gombok
         control_section = ttk.LabelFrame(calendar_frame, text="Naptár műveletek", 
@@ -1181,14 +6706,64 @@ class ModernPatientReminderApp:
                 style='Primary.TButton').pack(side='left', padx=5)
         ttk.Button(control_buttons, text="Kijelölt esemény törlése", command=self.delete_selected_event,
                 style='Danger.TButton').pack(side='left', padx=5)
+        ttk.Button(control_buttons, text="ICS import", command=self.import_ics,
+                style='Secondary.TButton').pack(side='left', padx=5)
+        ttk.Button(control_buttons, text="ICS export", command=self.open_ics_export_dialog,
+                style='Secondary.TButton').pack(side='left', padx=5)
+        ttk.Button(control_buttons, text="Ütközések", command=self.show_calendar_conflicts,
+                style='Secondary.TButton').pack(side='left', padx=5)
         ttk.Button(control_buttons, text="Emlékeztetők küldése", command=self.send_calendar_reminders,
                 style='Success.TButton').pack(side='right')
         
         # Események lista
-        events_section = ttk.LabelFrame(calendar_frame, text="Következő 30 nap eseményei", 
+        events_section = ttk.LabelFrame(calendar_frame, text="Események", 
                                     style='Modern.TLabelframe')
         events_section.pack(fill='both', expand=True, padx=15, pady=15)
         
+        # Lapozás: nap / hét nézet, előző / következő oldal, ugrás dátumra
+        navigation_frame = ttk.Frame(events_section, style='Main.TFrame')
+        navigation_frame.pack(fill='x', padx=15, pady=(15, 0))
+        
+        ttk.Button(navigation_frame, text="◀ Előző", command=lambda: self.events_view.previous_page(),
+                style='Secondary.TButton').pack(side='left', padx=5)
+        ttk.Button(navigation_frame, text="Ma", command=lambda: self.events_view.go_today(),
+                style='Secondary.TButton').pack(side='left', padx=5)
+        ttk.Button(navigation_frame, text="Következő ▶", command=lambda: self.events_view.next_page(),
+                style='Secondary.TButton').pack(side='left', padx=5)
+        
+        self.calendar_range = tk.StringVar()
+        ttk.Label(navigation_frame, textvariable=self.calendar_range, style='Modern.TLabel').pack(side='left', padx=15)
+        
+        self.calendar_mode = tk.StringVar(value='Hét')
+        mode_combo = ttk.Combobox(navigation_frame, textvariable=self.calendar_mode, values=['Nap', 'Hét'],
+                                width=6, state='readonly', style='Modern.TCombobox')
+        mode_combo.pack(side='right', padx=5)
+        mode_combo.bind('<<ComboboxSelected>>', lambda event: self.events_view.set_mode(
+            'day' if self.calendar_mode.get() == 'Nap' else 'week'))
+        ttk.Label(navigation_frame, text="Nézet:", style='Modern.TLabel').pack(side='right', padx=5)
+        
+        self.calendar_jump_date = tk.StringVar()
+        ttk.Button(navigation_frame, text="Ugrás", command=self.jump_to_calendar_date,
+                style='Secondary.TButton').pack(side='right', padx=(5, 20))
+        jump_entry = ttk.Entry(navigation_frame, textvariable=self.calendar_jump_date, width=12,
+                               style='Modern.TEntry')
+        jump_entry.pack(side='right', padx=5)
+        jump_entry.bind('<Return>', lambda event: self.jump_to_calendar_date())
+        ttk.Label(navigation_frame, text="Dátum (ÉÉÉÉ-HH-NN):", style='Modern.TLabel').pack(side='right', padx=5)
+        
+        # Keresés az események címében és leírásában (FTS index)
+        search_frame = ttk.Frame(events_section, style='Main.TFrame')
+        search_frame.pack(fill='x', padx=15, pady=(10, 0))
+        
+        ttk.Label(search_frame, text="Keresés (cím, leírás):", style='Modern.TLabel').pack(side='left', padx=5)
+        self.calendar_search_term = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.calendar_search_term, width=30,
+                                 style='Modern.TEntry')
+        search_entry.pack(side='left', padx=5)
+        search_entry.bind('<Return>', lambda event: self.search_calendar())
+        ttk.Button(search_frame, text="Keresés", command=self.search_calendar,
+                style='Secondary.TButton').pack(side='left', padx=5)
+        
         # Treeview container
         events_container = ttk.Frame(events_section, style='Main.TFrame')
         events_container.pack(fill='both', expand=True, padx=15, pady=15)
@@ -1226,13 +6801,14 @@ class ModernPatientReminderApp:
         self.events_tree.pack(side='left', fill='both', expand=True)
         events_scrollbar.pack(side='right', fill='y')
         
+        # Kulcsolt esemény modell (diff alapú frissítés)
+        self.events_view = CalendarEventList(self.events_tree, self.db_manager, self.calendar_range, self.task_runner)
+        
         # Események betöltése
         self.refresh_calendar_events()
     
-    def create_messages_tab(self):
+    def create_messages_tab(self, messages_frame):
         """Azonnali üzenetek fül"""
-        messages_frame = ttk.Frame(self.notebook, style='Main.TFrame')
-        self.notebook.add(messages_frame, text="Azonnali üzenetek")
         
         # Üzenet összeállítás section
         compose_section = ttk.LabelFrame(messages_frame, text="Üzenet összeállítása", 
@@ -1245,12 +6821,13 @@ class ModernPatientReminderApp:
         
         ttk.Label(recipients_frame, text="Címzettek:", style='Modern.TLabel').pack(side='left')
         recipients_combo = ttk.Combobox(recipients_frame, textvariable=self.message_recipients, 
-                                    values=['all', 'selected'], width=20, 
+                                    values=['all', 'selected', 'filter'], width=20, 
                                     style='Modern.TCombobox', state="readonly")
         recipients_combo.pack(side='left', padx=10)
         recipients_combo.set('all')
         
-        info_label = ttk.Label(recipients_frame, text="('all' = minden páciens, 'selected' = kijelölt páciensek)", 
+        info_label = ttk.Label(recipients_frame, 
+                            text="('all' = minden páciens, 'selected' = kijelölt páciensek, 'filter' = szűrő szerint)", 
                             style='Modern.TLabel')
         info_label.pack(side='left', padx=10)
         
@@ -1259,7 +6836,30 @@ class ModernPatientReminderApp:
                 command=self.refresh_selected_patients,
                 style='Secondary.TButton').pack(side='right')
         
-        # Tárgy mező
+        # Címzett szűrő ('filter' mód)
+        filter_frame = ttk.Frame(compose_section, style='Main.TFrame')
+        filter_frame.pack(fill='x', padx=15, pady=(0, 10))
+        
+        ttk.Label(filter_frame, text="Nyelv:", style='Modern.TLabel').pack(side='left')
+        ttk.Combobox(filter_frame, textvariable=self.recipient_language, values=['', 'hu', 'de'], 
+                    width=5, style='Modern.TCombobox', state="readonly").pack(side='left', padx=(5, 15))
+        
+        ttk.Label(filter_frame, text="Időpont (ÉÉÉÉ-HH-NN):", style='Modern.TLabel').pack(side='left')
+        ttk.Entry(filter_frame, textvariable=self.recipient_appointment_from, width=12, 
+                 style='Modern.TEntry').pack(side='left', padx=5)
+        ttk.Label(filter_frame, text="-", style='Modern.TLabel').pack(side='left')
+        ttk.Entry(filter_frame, textvariable=self.recipient_appointment_to, width=12, 
+                 style='Modern.TEntry').pack(side='left', padx=(5, 15))
+        
+        ttk.Label(filter_frame, text="Nem kapott emailt ettől:", style='Modern.TLabel').pack(side='left')
+        ttk.Entry(filter_frame, textvariable=self.recipient_last_contacted_before, width=12, 
+                 style='Modern.TEntry').pack(side='left', padx=5)
+        
+        ttk.Button(filter_frame, text="Címzettek száma", command=self.show_recipient_count,
+                  style='Secondary.TButton').pack(side='right')
+        
+        # Kampány neve (üresen hagyva tárgy + időbélyeg) és tárgy mező
+        self.create_input_row(compose_section, "Kampány neve (opcionális):", self.campaign_name)
         self.create_input_row(compose_section, "Email tárgy:", self.message_subject)
         
         # Üzenet törzs
@@ -1327,13 +6927,54 @@ class ModernPatientReminderApp:
         self.selected_patients_listbox.configure(yscrollcommand=selected_scrollbar.set)
         selected_scrollbar.pack(side='right', fill='y')
         
+        # Kampányok section
+        campaigns_section = ttk.LabelFrame(messages_frame, text="Kampányok", 
+                                          style='Modern.TLabelframe')
+        campaigns_section.pack(fill='both', expand=True, padx=15, pady=15)
+        
+        campaigns_container = ttk.Frame(campaigns_section, style='Main.TFrame')
+        campaigns_container.pack(fill='both', expand=True, padx=15, pady=10)
+        
+        campaign_columns = ('Létrehozva', 'Tárgy', 'Állapot', 'Elküldve', 'Hibás', 'Összes')
+        self.campaigns_tree = ttk.Treeview(campaigns_container, columns=campaign_columns, show='headings', 
+                                          style='Modern.Treeview', height=5, selectmode='browse')
+        
+        for col in campaign_columns:
+            self.campaigns_tree.heading(col, text=col)
+        
+        self.campaigns_tree.column('Létrehozva', width=130, anchor='center')
+        self.campaigns_tree.column('Tárgy', width=300)
+        self.campaigns_tree.column('Állapot', width=120, anchor='center')
+        self.campaigns_tree.column('Elküldve', width=80, anchor='center')
+        self.campaigns_tree.column('Hibás', width=80, anchor='center')
+        self.campaigns_tree.column('Összes', width=80, anchor='center')
+        
+        campaigns_scrollbar = ttk.Scrollbar(campaigns_container, orient='vertical', 
+                                           command=self.campaigns_tree.yview)
+        self.campaigns_tree.configure(yscrollcommand=campaigns_scrollbar.set)
+        
+        self.campaigns_tree.pack(side='left', fill='both', expand=True)
+        campaigns_scrollbar.pack(side='right', fill='y')
+        
+        campaign_buttons = ttk.Frame(campaigns_section, style='Main.TFrame')
+        campaign_buttons.pack(fill='x', padx=15, pady=(0, 10))
+        
+        ttk.Button(campaign_buttons, text="Szüneteltetés", command=self.pause_campaign,
+                  style='Secondary.TButton').pack(side='left', padx=5)
+        ttk.Button(campaign_buttons, text="Folytatás", command=self.resume_campaign,
+                  style='Primary.TButton').pack(side='left', padx=5)
+        ttk.Button(campaign_buttons, text="Megszakítás", command=self.cancel_campaign,
+                  style='Danger.TButton').pack(side='left', padx=5)
+        ttk.Button(campaign_buttons, text="Frissítés", command=self.refresh_campaigns,
+                  style='Secondary.TButton').pack(side='right', padx=5)
+        
         # Kezdeti tartalom betöltése
         self.refresh_selected_patients()
+        self.refresh_campaigns()
+        self.poll_campaigns()
     
-    def create_automation_tab(self):
+    def create_automation_tab(self, automation_frame):
         """Automatizálás fül"""
-        automation_frame = ttk.Frame(self.notebook, style='Main.TFrame')
-        self.notebook.add(automation_frame, text="Automatizálás")
         
         # Státusz section
         status_section = ttk.LabelFrame(automation_frame, text="Rendszer állapota", 
@@ -1367,6 +7008,7 @@ class ModernPatientReminderApp:
 
 • EMLÉKEZTETŐK: Naponta egyszer 12:00-kor
   → Holnapi időpontokra emlékeztető emailek küldése
+  → Küldési ablak esetén egyenletesen elosztva (pl. 12:00-14:00)
 
 • ÚJ IDŐPONTOK: Naponta egyszer 15:30-kor  
   → Mai napon létrehozott új időpontok visszaigazolása
@@ -1377,6 +7019,13 @@ class ModernPatientReminderApp:
         ttk.Label(schedule_frame, text=schedule_text, style='Modern.TLabel', 
                  justify='left').pack(anchor='w')
         
+        # Küldési ablak beállítása
+        self.create_input_row(schedule_section, "Küldési ablak vége (HH:MM, üres = azonnal):", 
+                              self.delivery_window_end)
+        
+        ttk.Button(schedule_section, text="Küldési ablak mentése", command=self.save_delivery_window,
+                  style='Secondary.TButton').pack(anchor='e', padx=15, pady=(0, 15))
+        
         # Manuális műveletek section
         manual_section = ttk.LabelFrame(automation_frame, text="Manuális műveletek", 
                                        style='Modern.TLabelframe')
@@ -1393,11 +7042,44 @@ class ModernPatientReminderApp:
                   style='Primary.TButton').pack(side='left', padx=5)
         ttk.Button(manual_frame, text="Calendar szinkronizálás", command=self.sync_calendar,
                   style='Secondary.TButton').pack(side='right', padx=5)
+        
+        # Sorban álló emlékeztetők section
+        queue_section = ttk.LabelFrame(automation_frame, text="Sorban álló emlékeztetők", 
+                                      style='Modern.TLabelframe')
+        queue_section.pack(fill='both', expand=True, padx=15, pady=15)
+        
+        queue_container = ttk.Frame(queue_section, style='Main.TFrame')
+        queue_container.pack(fill='both', expand=True, padx=15, pady=10)
+        
+        queue_columns = ('Esedékes', 'Típus', 'Páciens', 'Email', 'Nyelv', 'Időpont', 'Állapot')
+        self.queue_tree = ttk.Treeview(queue_container, columns=queue_columns, show='headings', 
+                                      style='Modern.Treeview', height=8)
+        
+        for col in queue_columns:
+            self.queue_tree.heading(col, text=col)
+        
+        self.queue_tree.column('Esedékes', width=130, anchor='center')
+        self.queue_tree.column('Típus', width=70, anchor='center')
+        self.queue_tree.column('Páciens', width=200)
+        self.queue_tree.column('Email', width=250)
+        self.queue_tree.column('Nyelv', width=60, anchor='center')
+        self.queue_tree.column('Időpont', width=140, anchor='center')
+        self.queue_tree.column('Állapot', width=120, anchor='center')
+        
+        queue_scrollbar = ttk.Scrollbar(queue_container, orient='vertical', command=self.queue_tree.yview)
+        self.queue_tree.configure(yscrollcommand=queue_scrollbar.set)
+        
+        self.queue_tree.pack(side='left', fill='both', expand=True)
+        queue_scrollbar.pack(side='right', fill='y')
+        
+        ttk.Button(queue_section, text="Sor frissítése", command=self.refresh_reminder_queue,
+                  style='Secondary.TButton').pack(anchor='e', padx=15, pady=(0, 10))
+        
+        # Sor betöltése
+        self.refresh_reminder_queue()
     
-    def create_templates_tab(self):
+    def create_templates_tab(self, templates_frame):
         """Email sablonok fül"""
-        templates_frame = ttk.Frame(self.notebook, style='Main.TFrame')
-        self.notebook.add(templates_frame, text="Email sablonok")
         
         # Sablon szerkesztő section
         edit_section = ttk.LabelFrame(templates_frame, text="Sablon szerkesztő", 
@@ -1463,10 +7145,8 @@ class ModernPatientReminderApp:
         ttk.Label(info_frame, text=info_text, style='Modern.TLabel', 
                  justify='left').pack(anchor='w')
     
-    def create_logs_tab(self):
+    def create_logs_tab(self, logs_frame):
         """Naplók fül"""
-        logs_frame = ttk.Frame(self.notebook, style='Main.TFrame')
-        self.notebook.add(logs_frame, text="Naplók")
         
         # Felső panel
         top_frame = ttk.Frame(logs_frame, style='Main.TFrame')
@@ -1474,6 +7154,33 @@ class ModernPatientReminderApp:
         
         ttk.Button(top_frame, text="Naplók frissítése", command=self.refresh_logs,
                   style='Secondary.TButton').pack(side='left')
+        
+        # Keresés a napló üzenetekben (FTS)
+        self.log_search_term = tk.StringVar()
+        ttk.Label(top_frame, text="Keresés:", style='Modern.TLabel').pack(side='left', padx=(20, 5))
+        log_search_entry = ttk.Entry(top_frame, textvariable=self.log_search_term, width=30,
+                                     style='Modern.TEntry')
+        log_search_entry.pack(side='left', padx=5)
+        log_search_entry.bind('<Return>', lambda event: self.refresh_logs())
+        ttk.Button(top_frame, text="Keresés", command=self.refresh_logs,
+                  style='Primary.TButton').pack(side='left', padx=5)
+        
+        # Szűrés szint és páciens email szerint (adatbázis oldalon)
+        self.log_level_filter = tk.StringVar(value='Mind')
+        ttk.Label(top_frame, text="Szint:", style='Modern.TLabel').pack(side='left', padx=(20, 5))
+        level_combo = ttk.Combobox(top_frame, textvariable=self.log_level_filter, width=10,
+                                   values=['Mind', 'INFO', 'WARNING', 'ERROR'], state='readonly',
+                                   style='Modern.TCombobox')
+        level_combo.pack(side='left', padx=5)
+        level_combo.bind('<<ComboboxSelected>>', lambda event: self.refresh_logs())
+        
+        self.log_email_filter = tk.StringVar()
+        ttk.Label(top_frame, text="Páciens email:", style='Modern.TLabel').pack(side='left', padx=(20, 5))
+        email_entry = ttk.Entry(top_frame, textvariable=self.log_email_filter, width=25,
+                                style='Modern.TEntry')
+        email_entry.pack(side='left', padx=5)
+        email_entry.bind('<Return>', lambda event: self.refresh_logs())
+        
         ttk.Button(top_frame, text="Naplók törlése", command=self.clear_logs,
                   style='Danger.TButton').pack(side='right')
         
@@ -1497,13 +7204,15 @@ class ModernPatientReminderApp:
             else:
                 self.logs_tree.column(col, width=200)
         
-        # Scrollbar
+        # Scrollbar (a yscrollcommand-ot az élő napló nézet kezeli)
         logs_scrollbar = ttk.Scrollbar(logs_list_frame, orient='vertical', command=self.logs_tree.yview)
-        self.logs_tree.configure(yscrollcommand=logs_scrollbar.set)
         
         self.logs_tree.pack(side='left', fill='both', expand=True)
         logs_scrollbar.pack(side='right', fill='y')
         
+        # Élő napló követés
+        self.log_view = LiveLogView(self.logs_tree, logs_scrollbar, self.db_manager)
+        
         # Naplók betöltése
         self.refresh_logs()
 
@@ -1523,38 +7232,47 @@ class ModernPatientReminderApp:
             messagebox.showerror("Hiba", f"Beállítások mentési hiba: {str(e)}")
     
     def send_test_email(self):
-        """Teszt email küldése"""
-        try:
-            success, message = self.email_manager.send_test_email()
-            
+        """Teszt email küldése (háttérszálon)"""
+        def on_done(result, task):
+            success, message = result
             if success:
                 messagebox.showinfo("Siker", "Teszt email elküldve!")
             else:
                 messagebox.showerror("Hiba", f"Teszt email hiba: {message}")
-        except Exception as e:
-            messagebox.showerror("Hiba", f"Email küldési hiba: {str(e)}")
+        
+        self.task_runner.submit(
+            "Teszt email", lambda task: self.email_manager.send_test_email(), on_done,
+            lambda error, task: messagebox.showerror("Hiba", f"Email küldési hiba: {str(error)}"),
+            key='test_email'
+        )
     
     def authenticate_google_calendar(self):
-        """Google Calendar authentikáció"""
+        """Google Calendar authentikáció (háttérszálon - a böngészős bejelentkezés alatt a GUI használható)"""
         if not GOOGLE_API_AVAILABLE:
             messagebox.showerror("Hiba", "Google API kliens nincs telepítve!\npip install google-api-python-client google-auth-oauthlib")
             return
         
-        try:
-            if not self.calendar_manager:
-                self.calendar_manager = GoogleCalendarManager()
-            
-            success = self.calendar_manager.authenticate()
+        def authenticate(task):
+            calendar_manager = self.calendar_manager or GoogleCalendarManager()
+            return calendar_manager, calendar_manager.authenticate()
+        
+        def on_done(result, task):
+            calendar_manager, success = result
+            self.calendar_manager = calendar_manager
+            self.automation_manager.calendar_manager = calendar_manager
             if success:
                 messagebox.showinfo("Siker", "Google Calendar authentikáció sikeres!")
                 self.calendar_status.set("Kapcsolódva")
                 # Automatikus szinkronizálás
                 self.sync_calendar()
-            
-        except FileNotFoundError as e:
-            messagebox.showerror("Hiba", str(e))
-        except Exception as e:
-            messagebox.showerror("Hiba", f"Authentikációs hiba: {str(e)}")
+        
+        def on_error(error, task):
+            if isinstance(error, FileNotFoundError):
+                messagebox.showerror("Hiba", str(error))
+            else:
+                messagebox.showerror("Hiba", f"Authentikációs hiba: {str(error)}")
+        
+        self.task_runner.submit("Google authentikáció", authenticate, on_done, on_error, key='google_auth')
     
     def open_google_console(self):
         """Google Cloud Console megnyitása"""
@@ -1573,7 +7291,7 @@ class ModernPatientReminderApp:
         
         try:
             patient_id = self.db_manager.add_patient(name, email, phone, language)
-            self.db_manager.add_log("INFO", f"Új páciens hozzáadva: {name} ({email})")
+            self.db_manager.add_log("INFO", f"Új páciens hozzáadva: {name} ({email})", email, patient_name=name)
             
             # Mezők törlése
             self.new_patient_name.set("")
@@ -1593,15 +7311,11 @@ class ModernPatientReminderApp:
     
     def delete_selected_patient(self):
         """Kijelölt páciens törlése"""
-        selection = self.patients_tree.selection()
-        if not selection:
-            messagebox.showwarning("Figyelmeztetés", "Válasszon ki egy pácienst a törléshez!")
+        patient = self.get_focused_patient("Válasszon ki egy pácienst a törléshez!")
+        if patient is None:
             return
         
-        item = self.patients_tree.item(selection[0])
-        patient_id = item['values'][0]
-        patient_name = item['text']
-        patient_email = item['values'][1]
+        patient_id, patient_name, patient_email = patient[:3]
         
         # Megerősítés
         confirm_message = f"""Biztos törli ezt a pácienst?
@@ -1616,7 +7330,9 @@ Ez a művelet nem vonható vissza!"""
                 success = self.db_manager.delete_patient(patient_id)
                 
                 if success:
-                    self.db_manager.add_log("INFO", f"Páciens törölve: {patient_name} ({patient_email})")
+                    self.db_manager.add_log("INFO", f"Páciens törölve: {patient_name} ({patient_email})",
+                                            patient_email, patient_name=patient_name)
+                    self.patients_view.deselect([patient_id])
                     self.refresh_patients_list()
                     messagebox.showinfo("Siker", "Páciens sikeresen törölve!")
                 else:
@@ -1628,17 +7344,13 @@ Ez a művelet nem vonható vissza!"""
     
     def edit_selected_patient(self):
         """Kijelölt páciens szerkesztése"""
-        selection = self.patients_tree.selection()
-        if not selection:
-            messagebox.showwarning("Figyelmeztetés", "Válasszon ki egy pácienst a szerkesztéshez!")
+        patient = self.get_focused_patient("Válasszon ki egy pácienst a szerkesztéshez!")
+        if patient is None:
             return
         
-        item = self.patients_tree.item(selection[0])
-        patient_id = item['values'][0]
-        patient_name = item['text']
-        patient_email = item['values'][1]
-        patient_phone = item['values'][2]
-        patient_language = item['values'][3].lower()
+        patient_id, patient_name, patient_email = patient[:3]
+        patient_phone = patient[3] or ''
+        patient_language = (patient[4] or 'hu').lower()
         
         # Szerkesztő ablak
         edit_window = tk.Toplevel(self.root)
@@ -1706,20 +7418,11 @@ Ez a művelet nem vonható vissza!"""
                     return
                 
                 # Adatbázis frissítése
-                conn = sqlite3.connect(self.db_manager.db_name)
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    UPDATE patients 
-                    SET name = ?, email = ?, phone = ?, language = ? 
-                    WHERE id = ?
-                ''', (new_name, new_email, new_phone, new_language, patient_id))
-                
-                conn.commit()
-                conn.close()
+                self.db_manager.update_patient(patient_id, new_name, new_email, new_phone, new_language)
                 
                 # Log
-                self.db_manager.add_log("INFO", f"Páciens módosítva: {new_name} (ID: {patient_id})")
+                self.db_manager.add_log("INFO", f"Páciens módosítva: {new_name} (ID: {patient_id})",
+                                        new_email, patient_name=new_name)
                 
                 # Lista frissítése
                 self.refresh_patients_list()
@@ -1743,75 +7446,55 @@ Ez a művelet nem vonható vissza!"""
     
     def filter_patients(self, *args):
         """Páciensek szűrése keresési kifejezés alapján"""
-        search_term = self.search_term.get().lower().strip()
-        
-        # Jelenlegi elemek törlése
-        for item in self.patients_tree.get_children():
-            self.patients_tree.delete(item)
-        
-        # Ha nincs keresési kifejezés, minden pácienst megjelenít
-        if not search_term:
-            for patient in self.all_patients:
-                created_date = patient[5][:10] if len(patient[5]) > 10 else patient[5]
-                self.patients_tree.insert('', 'end', text=patient[1], values=(
-                    patient[0],  # ID
-                    patient[2],  # Email
-                    patient[3] or '',  # Telefon
-                    patient[4].upper(),  # Nyelv
-                    created_date  # Regisztráció dátuma
-                ))
-            return
-        
-        # Szűrt páciensek megjelenítése
-        for patient in self.all_patients:
-            patient_name = patient[1].lower()
-            patient_email = patient[2].lower()
-            
-            if search_term in patient_name or search_term in patient_email:
-                created_date = patient[5][:10] if len(patient[5]) > 10 else patient[5]
-                self.patients_tree.insert('', 'end', text=patient[1], values=(
-                    patient[0],  # ID
-                    patient[2],  # Email
-                    patient[3] or '',  # Telefon
-                    patient[4].upper(),  # Nyelv
-                    created_date  # Regisztráció dátuma
-                ))
+        if hasattr(self, 'patients_view'):
+            self.patients_view.schedule_search(self.search_term.get())
 
     def clear_search(self):
         """Keresés törlése"""
         self.search_term.set("")
 
+    def get_selected_patients(self):
+        """Kijelölt páciensek a 'Páciensek' fülről (üres, ha a fül még nem épült fel)"""
+        if not hasattr(self, 'patients_view'):
+            return []
+        return self.patients_view.get_selected_patients()
+    
+    def get_selected_patient_ids(self):
+        """Kijelölt páciens azonosítók a 'Páciensek' fülről (sorok betöltése nélkül)"""
+        if not hasattr(self, 'patients_view'):
+            return set()
+        return self.patients_view.get_selected_ids()
+    
+    def get_focused_patient(self, missing_message):
+        """Egy páciensre vonatkozó művelet célpontja a 'Páciensek' fülről
+        
+        Több kijelölt sor esetén a fókuszban lévő (utoljára kattintott) páciens.
+        Ha nincs kijelölés, vagy a fókusz nem kijelölt soron van, figyelmeztet
+        és None-t ad vissza.
+        """
+        patient = self.patients_view.get_focused_patient() if hasattr(self, 'patients_view') else None
+        if patient is None:
+            if len(self.get_selected_patient_ids()) > 1:
+                messagebox.showwarning("Figyelmeztetés", 
+                                     "Több páciens van kijelölve! Kattintson arra a páciensre, amelyikre a művelet vonatkozik.")
+            else:
+                messagebox.showwarning("Figyelmeztetés", missing_message)
+        return patient
+    
     def refresh_patients_list(self):
         """Páciensek lista frissítése"""
-        # Jelenlegi elemek törlése
-        for item in self.patients_tree.get_children():
-            self.patients_tree.delete(item)
-        
-        # Páciensek betöltése és tárolása
-        self.all_patients = self.db_manager.get_patients()
+        if not hasattr(self, 'patients_view'):  # A fül még nem épült fel
+            return
         
-        for patient in self.all_patients:
-            # patient: (id, name, email, phone, language, created_at, active)
-            created_date = patient[5][:10] if len(patient[5]) > 10 else patient[5]  # Csak dátum
-            
-            self.patients_tree.insert('', 'end', text=patient[1], values=(
-                patient[0],  # ID
-                patient[2],  # Email
-                patient[3] or '',  # Telefon
-                patient[4].upper(),  # Nyelv
-                created_date  # Regisztráció dátuma
-            ))
+        self.patients_view.refresh()
 
     def send_email_to_patient(self):
         """Email küldése páciensnek"""
-        selection = self.patients_tree.selection()
-        if not selection:
-            messagebox.showwarning("Figyelmeztetés", "Válasszon ki egy pácienst!")
+        patient = self.get_focused_patient("Válasszon ki egy pácienst!")
+        if patient is None:
             return
         
-        item = self.patients_tree.item(selection[0])
-        patient_email = item['values'][1]
-        patient_name = item['text']
+        patient_name, patient_email = patient[1], patient[2]
         
         # Egyszerű email küldő ablak
         email_window = tk.Toplevel(self.root)
@@ -1839,174 +7522,423 @@ Ez a művelet nem vonható vissza!"""
                 messagebox.showerror("Hiba", "Tárgy és üzenet megadása kötelező!")
                 return
             
-            success, message = self.email_manager.send_email(patient_email, subject, body, patient_name)
+            def on_done(result, task):
+                success, message = result
+                if success:
+                    self.db_manager.add_log("INFO", f"Egyedi email elküldve: {patient_name}", patient_email,
+                                            patient_name=patient_name)
+                    self.db_manager.mark_patient_contacted(patient_email)
+                    messagebox.showinfo("Siker", "Email elküldve!")
+                    if email_window.winfo_exists():
+                        email_window.destroy()
+                else:
+                    messagebox.showerror("Hiba", f"Email küldési hiba: {message}")
             
-            if success:
-                messagebox.showinfo("Siker", "Email elküldve!")
-                self.db_manager.add_log("INFO", f"Egyedi email elküldve: {patient_name}", patient_email)
-                email_window.destroy()
-            else:
-                messagebox.showerror("Hiba", f"Email küldési hiba: {message}")
+            self.task_runner.submit(
+                f"Email: {patient_name}",
+                lambda task: self.email_manager.send_email(patient_email, subject, body, patient_name),
+                on_done
+            )
         
         ttk.Button(email_window, text="Email küldése", command=send_custom_email,
                   style='Primary.TButton').pack(pady=10)
     
     def import_excel(self):
-        """Excel fájl importálása"""
+        """Excel / CSV fájlok importálása (több fájl kijelölhető)"""
+        file_paths = filedialog.askopenfilenames(
+            title="Excel vagy CSV fájlok kiválasztása",
+            filetypes=[("Excel és CSV fájlok", "*.xlsx *.xls *.csv"), ("Excel fájlok", "*.xlsx *.xls"),
+                       ("CSV fájlok", "*.csv")]
+        )
+        
+        if file_paths:
+            self.start_patient_import(list(file_paths))
+    
+    def import_folder(self):
+        """Mappa összes Excel / CSV fájljának importálása (pl. orvosonkénti táblázatok)"""
+        folder = filedialog.askdirectory(title="Importálandó mappa kiválasztása")
+        if folder:
+            self.start_patient_import([folder])
+    
+    def start_patient_import(self, paths):
+        """Import indítása háttérszálon; egy fájl adagonként, több fájl párhuzamos beolvasással"""
+        update_existing = messagebox.askyesnocancel(
+            "Import mód", "Frissítse a már meglévő (azonos email című) páciensek adatait?\n\n"
+                          "Igen: név, telefon és nyelv frissítése\nNem: csak az új páciensek importálása"
+        )
+        if update_existing is None:
+            return
+        
+        importer = PatientImporter(self.db_manager, update_existing=update_existing)
+        single_file = len(paths) == 1 and not os.path.isdir(paths[0])
+        title = os.path.basename(paths[0].rstrip('/\\')) if len(paths) == 1 else f"{len(paths)} fájl"
+        
+        def run_import(task):
+            if single_file:
+                return importer.run(paths[0], task.cancel_event,
+                                    lambda rows, text: task.report(done=rows, text=text))
+            return importer.run_many(paths, cancel_event=task.cancel_event,
+                                     progress=lambda done, total, text: task.report(done=done, total=total, text=text))
+        
+        def on_done(result, task):
+            self.refresh_patients_list()
+            summary = PatientImporter.format_summary(result)
+            self.db_manager.add_log("INFO", f"Import ({title}): {summary}")
+            
+            summary = summary.replace(', ', '\n')
+            failed_files = [os.path.basename(path) for path, file_result in result.get('files', {}).items()
+                            if file_result['failed']]
+            if failed_files:
+                summary += "\n\nNem olvasható fájlok:\n" + "\n".join(failed_files)
+                for path, file_result in result['files'].items():
+                    if file_result['failed']:
+                        self.db_manager.add_log("ERROR", f"Import hiba ({os.path.basename(path)}): {file_result['failed']}")
+            if task.is_cancelled():
+                summary = "Import megszakítva!\n\n" + summary
+            if result['report_path']:
+                summary += f"\n\nHibás sorok listája:\n{result['report_path']}"
+            messagebox.showinfo("Import befejezve", summary)
+        
+        def on_error(error, task):
+            self.refresh_patients_list()
+            messagebox.showerror("Hiba", f"Import hiba: {str(error)}")
+        
+        self.task_runner.submit(f"Import: {title}", run_import, on_done, on_error, key='patient_import')
+    
+    def open_export_dialog(self):
+        """Export ablak: tábla, dátum tartomány és oszlopok kiválasztása"""
+        export_window = tk.Toplevel(self.root)
+        export_window.title("Adatok exportálása")
+        export_window.geometry("420x520")
+        export_window.configure(bg=self.colors['bg_main'])
+        export_window.transient(self.root)
+        
+        table_labels = {'Páciensek': 'patients', 'Naptár események': 'calendar_events', 'Naplók': 'logs'}
+        table_var = tk.StringVar(value='Páciensek')
+        date_from_var = tk.StringVar()
+        date_to_var = tk.StringVar()
+        
+        ttk.Label(export_window, text="Tábla:", style='Modern.TLabel').pack(anchor='w', padx=15, pady=(15, 0))
+        table_combo = ttk.Combobox(export_window, textvariable=table_var, values=list(table_labels),
+                                   style='Modern.TCombobox', state="readonly")
+        table_combo.pack(fill='x', padx=15, pady=5)
+        
+        date_frame = ttk.Frame(export_window, style='Main.TFrame')
+        date_frame.pack(fill='x', padx=15, pady=10)
+        ttk.Label(date_frame, text="Dátum (ÉÉÉÉ-HH-NN):", style='Modern.TLabel').pack(side='left')
+        ttk.Entry(date_frame, textvariable=date_from_var, width=12, style='Modern.TEntry').pack(side='left', padx=5)
+        ttk.Label(date_frame, text="-", style='Modern.TLabel').pack(side='left')
+        ttk.Entry(date_frame, textvariable=date_to_var, width=12, style='Modern.TEntry').pack(side='left', padx=5)
+        
+        ttk.Label(export_window, text="Oszlopok:", style='Modern.TLabel').pack(anchor='w', padx=15)
+        columns_listbox = tk.Listbox(export_window, selectmode='multiple', height=12, exportselection=False,
+                                     font=('Segoe UI', 10), bg=self.colors['bg_card'])
+        columns_listbox.pack(fill='both', expand=True, padx=15, pady=5)
+        
+        def load_columns(event=None):
+            columns_listbox.delete(0, tk.END)
+            for name, _ in DatabaseManager.EXPORT_TABLES[table_labels[table_var.get()]]['columns']:
+                columns_listbox.insert(tk.END, name)
+            columns_listbox.select_set(0, tk.END)
+        
+        table_combo.bind('<<ComboboxSelected>>', load_columns)
+        load_columns()
+        
+        def start_export():
+            table = table_labels[table_var.get()]
+            columns = [columns_listbox.get(index) for index in columns_listbox.curselection()]
+            if not columns:
+                messagebox.showwarning("Figyelmeztetés", "Válasszon ki legalább egy oszlopot!", parent=export_window)
+                return
+            
+            file_path = filedialog.asksaveasfilename(
+                parent=export_window, title="Export mentése", defaultextension=".csv",
+                initialfile=f"{table}_{datetime.now().strftime('%Y%m%d')}",
+                filetypes=[("CSV", "*.csv"), ("Excel", "*.xlsx"), ("Parquet", "*.parquet")]
+            )
+            if not file_path:
+                return
+            
+            exporter = DataExporter(self.db_manager)
+            date_from = date_from_var.get().strip() or None
+            date_to = date_to_var.get().strip() or None
+            
+            def on_done(rows, task):
+                self.db_manager.add_log("INFO", f"Export ({table}): {rows} sor -> {os.path.basename(file_path)}")
+                suffix = " (megszakítva)" if task.is_cancelled() else ""
+                messagebox.showinfo("Export befejezve", f"{rows} sor exportálva{suffix}:\n{file_path}")
+            
+            self.task_runner.submit(
+                f"Export: {os.path.basename(file_path)}",
+                lambda task: exporter.export(table, file_path, columns, date_from, date_to, task.cancel_event,
+                                             lambda rows, text: task.report(done=rows, text=text)),
+                on_done,
+                lambda error, task: messagebox.showerror("Hiba", f"Export hiba: {str(error)}")
+            )
+            export_window.destroy()
+        
+        ttk.Button(export_window, text="Exportálás", command=start_export,
+                  style='Primary.TButton').pack(pady=15)
+    
+    def sync_calendar(self):
+        """Google Calendar szinkronizálás (háttérszálon)"""
+        if not self.calendar_manager:
+            messagebox.showerror("Hiba", "Google Calendar nincs beállítva!")
+            return
+        
+        def on_done(result, task):
+            summary = IcsCalendar.format_summary(result)
+            self.db_manager.add_log("INFO", f"Calendar szinkronizálás: {summary}")
+            self.refresh_calendar_events()
+            self.refresh_reminder_queue()
+            if task.is_cancelled():
+                messagebox.showinfo("Megszakítva", f"Szinkronizálás megszakítva!\n{summary}")
+            else:
+                messagebox.showinfo("Siker", f"Szinkronizálás befejezve!\n{summary}")
+        
+        self.task_runner.submit(
+            "Naptár szinkronizálás", self._sync_calendar_events, on_done,
+            lambda error, task: messagebox.showerror("Hiba", f"Szinkronizálási hiba: {str(error)}"),
+            key='sync_calendar'
+        )
+    
+    def _sync_calendar_events(self, task):
+        """Google Calendar események letöltése és mentése (háttérszál)
+        
+        Az ismétlődő időpontok sorozatként érkeznek és tárolódnak (szabály +
+        kivételek); az előfordulások csak a lekérdezett ablakokra bontódnak ki.
+        """
+        task.report(text="Események letöltése...")
+        events = self.calendar_manager.get_upcoming_events(days_ahead=30)
+        calendar = IcsCalendar(self.db_manager, id_prefix='')
+        
+        def converted_events():
+            for event in events:
+                try:
+                    yield calendar.from_google(event)
+                except (ValueError, KeyError) as e:
+                    print(f"Esemény szinkronizálási hiba: {str(e)}")
+        
+        result = calendar.import_events(
+            converted_events(), task.cancel_event,
+            lambda done, text: task.report(done=done, total=len(events), text=text)
+        )
+        task.report(done=len(events), total=len(events))
+        return result
+    
+    def import_ics(self):
+        """ICS (iCalendar) fájl importja háttérszálon, pl. praxisszoftver exportjából"""
         file_path = filedialog.askopenfilename(
-            title="Excel fájl kiválasztása",
-            filetypes=[("Excel fájlok", "*.xlsx *.xls")]
+            title="ICS fájl kiválasztása",
+            filetypes=[("iCalendar fájlok", "*.ics"), ("Minden fájl", "*.*")]
         )
+        if not file_path:
+            return
+        
+        calendar = IcsCalendar(self.db_manager)
+        title = os.path.basename(file_path)
+        
+        def on_done(result, task):
+            summary = IcsCalendar.format_summary(result)
+            self.db_manager.add_log("INFO", f"ICS import ({title}): {summary}")
+            self.refresh_calendar_events()
+            self.refresh_reminder_queue()
+            if task.is_cancelled():
+                summary = "Import megszakítva!\n\n" + summary
+            messagebox.showinfo("ICS import befejezve", summary.replace(', ', '\n'))
         
-        if not file_path:
-            return
+        def on_error(error, task):
+            self.refresh_calendar_events()
+            messagebox.showerror("Hiba", f"ICS import hiba: {str(error)}")
         
-        try:
-            # Excel fájl beolvasása
-            df = pd.read_excel(file_path)
-            
-            # Oszlopok ellenőrzése
-            required_columns = ['név', 'email']
-            missing_columns = [col for col in required_columns if col.lower() not in [c.lower() for c in df.columns]]
+        self.task_runner.submit(
+            f"ICS import: {title}",
+            lambda task: calendar.import_file(file_path, task.cancel_event,
+                                              lambda done, text: task.report(done=done, text=text)),
+            on_done, on_error, key='ics_import'
+        )
+    
+    def open_ics_export_dialog(self):
+        """ICS export ablak: egy nap összes időpontja vagy egy páciens időpontjai"""
+        focused = self.patients_view.get_focused_patient() if hasattr(self, 'patients_view') else None
+        view_day = self.events_view.page_start if hasattr(self, 'events_view') else datetime.now().date()
+        
+        export_window = tk.Toplevel(self.root)
+        export_window.title("ICS export")
+        export_window.geometry("380x220")
+        export_window.configure(bg=self.colors['bg_main'])
+        export_window.transient(self.root)
+        
+        mode_var = tk.StringVar(value='Páciens' if focused else 'Nap')
+        day_var = tk.StringVar(value=view_day.strftime('%Y-%m-%d'))
+        email_var = tk.StringVar(value=focused[2] if focused else '')
+        
+        ttk.Label(export_window, text="Export típusa:", style='Modern.TLabel').pack(anchor='w', padx=15, pady=(15, 0))
+        ttk.Combobox(export_window, textvariable=mode_var, values=['Nap', 'Páciens'],
+                     style='Modern.TCombobox', state="readonly").pack(fill='x', padx=15, pady=5)
+        
+        value_frame = ttk.Frame(export_window, style='Main.TFrame')
+        value_frame.pack(fill='x', padx=15, pady=5)
+        ttk.Label(value_frame, text="Nap (ÉÉÉÉ-HH-NN):", style='Modern.TLabel').grid(row=0, column=0, sticky='w')
+        ttk.Entry(value_frame, textvariable=day_var, width=14, style='Modern.TEntry').grid(row=0, column=1, padx=5, pady=2)
+        ttk.Label(value_frame, text="Páciens email:", style='Modern.TLabel').grid(row=1, column=0, sticky='w')
+        ttk.Entry(value_frame, textvariable=email_var, width=28, style='Modern.TEntry').grid(row=1, column=1, padx=5, pady=2)
+        
+        def start_export():
+            calendar = IcsCalendar(self.db_manager)
+            if mode_var.get() == 'Nap':
+                try:
+                    day = datetime.strptime(day_var.get().strip(), '%Y-%m-%d').date()
+                except ValueError:
+                    messagebox.showerror("Hiba", "Hibás dátum formátum! Használja: ÉÉÉÉ-HH-NN", parent=export_window)
+                    return
+                initial_file = f"naptar_{day.strftime('%Y%m%d')}.ics"
+                write_ics = lambda: calendar.export_day(day, file_path)
+            else:
+                email = email_var.get().strip()
+                if not email:
+                    messagebox.showwarning("Figyelmeztetés", "Adja meg a páciens email címét!", parent=export_window)
+                    return
+                initial_file = f"{email.split('@')[0]}.ics"
+                write_ics = lambda: calendar.export_patient(email, file_path)
             
-            if missing_columns:
-                messagebox.showerror("Hiba", f"Hiányzó oszlopok: {', '.join(missing_columns)}")
+            file_path = filedialog.asksaveasfilename(
+                parent=export_window, title="ICS mentése", defaultextension=".ics",
+                initialfile=initial_file, filetypes=[("iCalendar", "*.ics")]
+            )
+            if not file_path:
                 return
             
-            # Oszlopok normalizálása (kis betűs)
-            df.columns = df.columns.str.lower()
+            def on_done(count, task):
+                self.db_manager.add_log("INFO", f"ICS export: {count} esemény -> {os.path.basename(file_path)}")
+                messagebox.showinfo("ICS export befejezve", f"{count} esemény exportálva:\n{file_path}")
             
-            # Páciensek importálása
-            imported_count = 0
-            error_count = 0
+            self.task_runner.submit(
+                f"ICS export: {os.path.basename(file_path)}", lambda task: write_ics(), on_done,
+                lambda error, task: messagebox.showerror("Hiba", f"ICS export hiba: {str(error)}")
+            )
+            export_window.destroy()
+        
+        ttk.Button(export_window, text="Exportálás", command=start_export,
+                  style='Primary.TButton').pack(pady=15)
+    
+    def show_calendar_conflicts(self):
+        """Ütközési jelentés a megjelenített oldal hónapjára (háttérben, a sorozatok kibontása miatt)"""
+        view_day = self.events_view.page_start if hasattr(self, 'events_view') else datetime.now().date()
+        month_start = view_day.replace(day=1)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        
+        def on_done(pairs, task):
+            report_window = tk.Toplevel(self.root)
+            report_window.title(f"Ütközések - {month_start.strftime('%Y-%m')}")
+            report_window.geometry("900x450")
+            report_window.configure(bg=self.colors['bg_main'])
+            report_window.transient(self.root)
             
-            for index, row in df.iterrows():
-                try:
-                    name = str(row['név']).strip()
-                    email = str(row['email']).strip()
-                    phone = str(row.get('telefon', '')).strip()
-                    language = str(row.get('nyelv', 'hu')).strip()
-                    
-                    if name and email and '@' in email:
-                        self.db_manager.add_patient(name, email, phone, language)
-                        imported_count += 1
-                    else:
-                        error_count += 1
-                
-                except Exception as e:
-                    error_count += 1
-                    print(f"Import hiba {index}. sor: {str(e)}")
+            ttk.Label(report_window, text=f"{len(pairs)} ütköző időpontpár ({month_start.strftime('%Y-%m')})",
+                     style='Status.TLabel').pack(anchor='w', padx=15, pady=(15, 5))
             
-            self.refresh_patients_list()
-            self.db_manager.add_log("INFO", f"Excel import: {imported_count} sikeres, {error_count} hiba")
+            columns = ('Dátum', 'Első időpont', 'Első esemény', 'Második időpont', 'Második esemény')
+            tree = ttk.Treeview(report_window, columns=columns, show='headings', style='Modern.Treeview')
+            for column in columns:
+                tree.heading(column, text=column)
+                tree.column(column, width=120 if 'időpont' in column or column == 'Dátum' else 220)
+            scrollbar = ttk.Scrollbar(report_window, orient='vertical', command=tree.yview)
+            tree.configure(yscrollcommand=scrollbar.set)
+            tree.pack(side='left', fill='both', expand=True, padx=(15, 0), pady=(0, 15))
+            scrollbar.pack(side='right', fill='y', padx=(0, 15), pady=(0, 15))
             
-            messagebox.showinfo("Import befejezve", 
-                              f"Importálva: {imported_count} páciens\nHibák: {error_count}")
+            for first, second in pairs:
+                tree.insert('', 'end', values=(
+                    second[1][:10],
+                    f"{first[1][11:16]}–{first[2][11:16]}", f"{first[4]} ({first[3] or 'Ismeretlen'})",
+                    f"{second[1][11:16]}–{second[2][11:16]}", f"{second[4]} ({second[3] or 'Ismeretlen'})"
+                ))
         
-        except Exception as e:
-            messagebox.showerror("Hiba", f"Excel import hiba: {str(e)}")
+        self.task_runner.submit(
+            f"Ütközések: {month_start.strftime('%Y-%m')}",
+            lambda task: self.appointment_index.conflicts(f"{month_start.isoformat()} 00:00:00",
+                                                          f"{next_month.isoformat()} 00:00:00"),
+            on_done,
+            lambda error, task: messagebox.showerror("Hiba", f"Ütközés ellenőrzési hiba: {str(error)}"),
+            key='calendar-conflicts'
+        )
     
-    def sync_calendar(self):
-        """Google Calendar szinkronizálás"""
+    def jump_to_calendar_date(self):
+        """Naptár oldal megjelenítése a megadott dátumtól"""
         try:
-            if not self.calendar_manager:
-                messagebox.showerror("Hiba", "Google Calendar nincs beállítva!")
-                return
+            day = datetime.strptime(self.calendar_jump_date.get().strip(), '%Y-%m-%d').date()
+        except ValueError:
+            messagebox.showerror("Hiba", "Hibás dátum formátum! Használja: ÉÉÉÉ-HH-NN")
+            return
+        self.events_view.show_page(day)
+    
+    def search_calendar(self):
+        """Naptár események keresése (cím, leírás); dupla kattintás a találat napjára ugrik"""
+        query = self.calendar_search_term.get().strip()
+        if not query:
+            return
+        
+        def on_done(events, task):
+            results_window = tk.Toplevel(self.root)
+            results_window.title(f"Keresés: {query}")
+            results_window.geometry("900x450")
+            results_window.configure(bg=self.colors['bg_main'])
+            results_window.transient(self.root)
             
-            events = self.calendar_manager.get_upcoming_events(days_ahead=30)
-            synced_count = 0
+            ttk.Label(results_window, text=f"{len(events)} találat", style='Status.TLabel').pack(anchor='w', padx=15, pady=(15, 5))
             
+            columns = ('Dátum', 'Idő', 'Esemény', 'Páciens Email', 'Leírás')
+            tree = ttk.Treeview(results_window, columns=columns, show='headings', style='Modern.Treeview')
+            for column in columns:
+                tree.heading(column, text=column)
+                tree.column(column, width=100 if column in ('Dátum', 'Idő') else 220)
+            scrollbar = ttk.Scrollbar(results_window, orient='vertical', command=tree.yview)
+            tree.configure(yscrollcommand=scrollbar.set)
+            tree.pack(side='left', fill='both', expand=True, padx=(15, 0), pady=(0, 15))
+            scrollbar.pack(side='right', fill='y', padx=(0, 15), pady=(0, 15))
+            
+            # event: (id, start_time, event_title, patient_email, event_description)
             for event in events:
-                try:
-                    # Esemény adatok kinyerése
-                    event_id = event.get('id', '')
-                    summary = event.get('summary', 'Ismeretlen esemény')
-                    description = event.get('description', '')
-                    
-                    # Időpont feldolgozás
-                    start = event.get('start', {})
-                    end = event.get('end', {})
-                    
-                    start_time_str = start.get('dateTime', start.get('date'))
-                    end_time_str = end.get('dateTime', end.get('date'))
-                    
-                    if start_time_str and end_time_str:
-                        # ISO formátum konvertálása
-                        if 'T' in start_time_str:
-                            start_time = datetime.fromisoformat(start_time_str.replace('Z', '+00:00')).replace(tzinfo=None)
-                            end_time = datetime.fromisoformat(end_time_str.replace('Z', '+00:00')).replace(tzinfo=None)
-                        else:
-                            start_time = datetime.strptime(start_time_str, '%Y-%m-%d')
-                            end_time = datetime.strptime(end_time_str, '%Y-%m-%d')
-                        
-                        # Páciens email keresése
-                        patient_email = self.calendar_manager.parse_event_for_patient(event)
-                        
-                        # Esemény mentése adatbázisba
-                        success = self.db_manager.add_calendar_event(
-                            event_id, patient_email, summary, description, 
-                            start_time.strftime('%Y-%m-%d %H:%M:%S'),
-                            end_time.strftime('%Y-%m-%d %H:%M:%S')
-                        )
-                        
-                        if success:
-                            synced_count += 1
-                
-                except Exception as e:
-                    print(f"Esemény szinkronizálási hiba: {str(e)}")
-                    continue
+                tree.insert('', 'end', iid=str(event[0]), values=(
+                    event[1][:10], event[1][11:16], event[2], event[3] or 'Ismeretlen', event[4] or ''
+                ))
             
-            self.db_manager.add_log("INFO", f"Calendar szinkronizálás: {synced_count} esemény")
-            self.refresh_calendar_events()
-            messagebox.showinfo("Siker", f"Szinkronizálás befejezve!\n{synced_count} esemény frissítve.")
+            def show_event(event=None):
+                focus = tree.focus()
+                if not focus:
+                    return
+                day = datetime.strptime(tree.set(focus, 'Dátum'), '%Y-%m-%d').date()
+                self.events_view.show_page(day)
+                results_window.destroy()
             
-        except Exception as e:
-            messagebox.showerror("Hiba", f"Szinkronizálási hiba: {str(e)}")
+            tree.bind('<Double-1>', show_event)
+            tree.bind('<Return>', show_event)
+        
+        self.task_runner.submit(
+            f"Naptár keresés: {query}",
+            lambda task: self.db_manager.search_calendar_events(query, self.CALENDAR_SEARCH_LIMIT),
+            on_done,
+            lambda error, task: messagebox.showerror("Hiba", f"Naptár keresési hiba: {str(error)}"),
+            key='calendar-search', show_row=False
+        )
     
     def refresh_calendar_events(self):
-        """Naptár események frissítése"""
-        # Jelenlegi elemek törlése
-        for item in self.events_tree.get_children():
-            self.events_tree.delete(item)
-        
-        # Események betöltése
-        events = self.db_manager.get_calendar_events(days_ahead=30)
+        """Naptár események frissítése (csak a legutóbbi frissítés óta változott sorok)"""
+        if not hasattr(self, 'events_view'):  # A fül még nem épült fel
+            return
         
-        for event in events:
-            # event: (id, google_event_id, patient_email, event_title, event_description, start_time, end_time, created_at, reminder_sent, is_new_appointment, new_appointment_notified)
-            try:
-                start_time = datetime.strptime(event[5], '%Y-%m-%d %H:%M:%S')
-                event_date = start_time.strftime('%Y-%m-%d')
-                event_time = start_time.strftime('%H:%M')
-                
-                reminder_status = "Elküldve" if event[8] else "Nincs"
-                
-                self.events_tree.insert('', 'end', values=(
-                    event[0],          # ID (elrejtett)
-                    event_date,        # Dátum
-                    event_time,        # Idő
-                    event[2] or 'Ismeretlen',  # Páciens Email
-                    event[3],          # Esemény
-                    event[4] or '',    # Leírás
-                    reminder_status    # Emlékeztető
-                ))
-            except Exception as e:
-                print(f"Esemény megjelenítési hiba: {str(e)}")
-                continue
+        self.events_view.refresh()
     
     def add_manual_calendar_event(self):
         """Manuális naptár esemény hozzáadása"""
         # Ellenőrizzük, hogy van-e kijelölt páciens
-        selection = self.patients_tree.selection()
-        if not selection:
-            messagebox.showwarning("Figyelmeztetés", 
-                                "Először jelöljön ki egy pácienst a 'Páciensek' fülön, majd próbálja újra!")
+        patient = self.get_focused_patient("Először jelöljön ki egy pácienst a 'Páciensek' fülön, majd próbálja újra!")
+        if patient is None:
             return
         
         # Kijelölt páciens adatainak lekérése
-        item = self.patients_tree.item(selection[0])
-        selected_patient_name = item['text']
-        selected_patient_email = item['values'][1]
+        selected_patient_name, selected_patient_email = patient[1], patient[2]
         
         # Új ablak létrehozása
         event_window = tk.Toplevel(self.root)
@@ -2041,7 +7973,8 @@ Ez a művelet nem vonható vissza!"""
         data_frame.pack(fill='both', expand=True, padx=20, pady=20)
         
         # Változók
-        event_title = tk.StringVar(value=f"Időpont - {selected_patient_name}")
+        # Titkosított páciens adatoknál a név nem kerül az (adatbázisban nyílt) esemény címbe
+        event_title = tk.StringVar(value="Időpont" if self.db_manager.pii is not None else f"Időpont - {selected_patient_name}")
         event_description = tk.StringVar()
         event_date = tk.StringVar(value=datetime.now().strftime("%Y-%m-%d"))
         event_time = tk.StringVar(value="10:00")
@@ -2064,22 +7997,76 @@ Ez a művelet nem vonható vissza!"""
         create_event_row(data_frame, "Kezdés ideje (HH:MM):", event_time)
         create_event_row(data_frame, "Időtartam (perc):", duration_minutes)
         
-        def save_event():
-            """Esemény mentése"""
+        # Ütközés figyelmeztetés (gépelés közben frissül)
+        conflict_var = tk.StringVar()
+        ttk.Label(data_frame, textvariable=conflict_var, style='Modern.TLabel',
+                  foreground=self.colors['danger'], wraplength=420, justify='left').pack(fill='x', padx=15, pady=8)
+        
+        # Ütközés ellenőrzés háttérszálon (sorozat kibontás, index építés), gépelés közben késleltetve
+        check_state = {'after_id': None, 'seq': 0, 'range': None, 'conflicts': []}
+        
+        def event_range():
+            """A megadott időpont ('YYYY-MM-DD HH:MM:SS' kezdés, vége); hibás mezők esetén None"""
             try:
-                title = event_title.get().strip()
-                description = event_description.get().strip()
-                date = event_date.get().strip()
-                time = event_time.get().strip()
-                duration = int(duration_minutes.get())
-                
-                if not title or not date or not time:
-                    messagebox.showerror("Hiba", "Minden kötelező mező kitöltendő!")
+                start_datetime = datetime.strptime(f"{event_date.get().strip()} {event_time.get().strip()}", "%Y-%m-%d %H:%M")
+                end_datetime = start_datetime + timedelta(minutes=int(duration_minutes.get()))
+            except ValueError:
+                return None
+            return start_datetime.strftime('%Y-%m-%d %H:%M:%S'), end_datetime.strftime('%Y-%m-%d %H:%M:%S')
+        
+        def show_conflicts(conflicts):
+            if not conflicts:
+                conflict_var.set('')
+                return
+            lines = [f"{start_time[11:16]}–{end_time[11:16]} {title} ({email or 'Ismeretlen'})"
+                     for _, start_time, end_time, email, title in conflicts[:3]]
+            if len(conflicts) > 3:
+                lines.append(f"... és még {len(conflicts) - 3} esemény")
+            conflict_var.set("⚠ Ütközik ezzel:\n" + "\n".join(lines))
+        
+        def check_conflicts(on_result=None):
+            """Ütközések lekérdezése; csak a legutoljára indított ellenőrzés eredménye érvényes"""
+            check_state['after_id'] = None
+            check_state['seq'] += 1
+            seq = check_state['seq']
+            requested_range = event_range()
+            if requested_range is None:
+                check_state.update(range=None, conflicts=[])
+                show_conflicts([])
+                return
+            
+            def on_done(conflicts, task):
+                if seq != check_state['seq'] or not event_window.winfo_exists():
+                    return
+                check_state.update(range=requested_range, conflicts=conflicts)
+                show_conflicts(conflicts)
+                if on_result:
+                    on_result(conflicts)
+            
+            def on_error(error, task):
+                if seq == check_state['seq'] and event_window.winfo_exists():
+                    conflict_var.set(f"Ütközés ellenőrzési hiba: {str(error)}")
+            
+            self.task_runner.submit("Ütközés ellenőrzés", lambda task: self.appointment_index.overlaps(*requested_range),
+                                    on_done, on_error, show_row=False)
+        
+        def schedule_check(*_):
+            if check_state['after_id'] is not None:
+                event_window.after_cancel(check_state['after_id'])
+            check_state['after_id'] = event_window.after(AppointmentIntervalIndex.CHECK_DEBOUNCE_MS, check_conflicts)
+        
+        for variable in (event_date, event_time, duration_minutes):
+            variable.trace_add('write', schedule_check)
+        check_conflicts()
+        
+        def store_event(title, description, start_datetime, end_datetime, conflicts):
+            """Ütközés megerősítése után az esemény mentése"""
+            try:
+                if conflicts and not messagebox.askyesno(
+                        "Időpont ütközés",
+                        f"Az időpont {len(conflicts)} meglévő eseménnyel ütközik:\n\n{conflict_var.get()}\n\nMégis menti?",
+                        parent=event_window):
                     return
-                
-                # Dátum és idő összeállítása
-                start_datetime = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
-                end_datetime = start_datetime + timedelta(minutes=duration)
                 
                 # Egyedi Google Event ID generálása
                 import uuid
@@ -2094,12 +8081,44 @@ Ez a művelet nem vonható vissza!"""
                 )
                 
                 if success:
-                    self.db_manager.add_log("INFO", f"Manuális esemény hozzáadva: {title} - {selected_patient_email}")
+                    self.db_manager.add_log("INFO", f"Manuális esemény hozzáadva: {title} - {selected_patient_email}",
+                                            selected_patient_email, patient_name=selected_patient_name)
                     self.refresh_calendar_events()
                     messagebox.showinfo("Siker", "Esemény sikeresen hozzáadva!")
                     event_window.destroy()
                 else:
                     messagebox.showerror("Hiba", "Esemény mentése sikertelen!")
+            
+            except Exception as e:
+                messagebox.showerror("Hiba", f"Esemény mentési hiba: {str(e)}")
+        
+        def save_event():
+            """Esemény mentése (az ütközés ellenőrzés eredménye után)"""
+            try:
+                title = event_title.get().strip()
+                description = event_description.get().strip()
+                date = event_date.get().strip()
+                time = event_time.get().strip()
+                duration = int(duration_minutes.get())
+                
+                if not title or not date or not time:
+                    messagebox.showerror("Hiba", "Minden kötelező mező kitöltendő!")
+                    return
+                
+                # Dátum és idő összeállítása
+                start_datetime = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+                end_datetime = start_datetime + timedelta(minutes=duration)
+                
+                def on_result(conflicts):
+                    store_event(title, description, start_datetime, end_datetime, conflicts)
+                
+                # Az aktuális mezőkre már kész eredmény felhasználható, különben friss ellenőrzés
+                if check_state['after_id'] is None and check_state['range'] == event_range():
+                    on_result(check_state['conflicts'])
+                else:
+                    if check_state['after_id'] is not None:
+                        event_window.after_cancel(check_state['after_id'])
+                    check_conflicts(on_result)
                     
             except ValueError as e:
                 messagebox.showerror("Hiba", f"Hibás dátum/idő formátum: {str(e)}")
@@ -2143,7 +8162,7 @@ FIGYELEM: Ez a művelet nem vonható vissza!"""
                 success = self.db_manager.delete_calendar_event(event_id)
                 
                 if success:
-                    self.db_manager.add_log("INFO", f"Naptár esemény törölve: {event_title} - {patient_email}")
+                    self.db_manager.add_log("INFO", f"Naptár esemény törölve: {event_title} - {patient_email}", patient_email)
                     self.refresh_calendar_events()
                     messagebox.showinfo("Siker", "Esemény sikeresen törölve!")
                 else:
@@ -2155,41 +8174,29 @@ FIGYELEM: Ez a művelet nem vonható vissza!"""
     
     def send_calendar_reminders(self):
         """Naptár események alapján emlékeztetők küldése"""
-        try:
-            reminders = self.db_manager.get_tomorrows_reminders()
-            sent_count = 0
-            
-            for event in reminders:
-                try:
-                    patient_email = event[2]
-                    if patient_email:
-                        patient = self.db_manager.get_patient_by_email(patient_email)
-                        
-                        if patient:
-                            start_time = datetime.strptime(event[5], '%Y-%m-%d %H:%M:%S')
-                            appointment_date = start_time.strftime("%Y-%m-%d")
-                            appointment_time = start_time.strftime("%H:%M")
-                            
-                            success, message = self.email_manager.send_appointment_reminder(
-                                patient_email, patient[1], appointment_date, appointment_time
-                            )
-                            
-                            if success:
-                                self.db_manager.mark_reminder_sent(event[0])
-                                self.db_manager.add_log("INFO", f"Naptár emlékeztető elküldve: {patient[1]}", patient_email)
-                                sent_count += 1
-                            else:
-                                self.db_manager.add_log("ERROR", f"Emlékeztető hiba: {message}", patient_email)
-                
-                except Exception as e:
-                    print(f"Emlékeztető küldési hiba: {str(e)}")
-                    continue
-            
+        self.start_reminder_task("Naptár emlékeztető", "Naptár emlékeztetők")
+    
+    def start_reminder_task(self, log_label, title):
+        """Mai esedékes emlékeztetők küldése háttérszálon, folyamatjelzővel"""
+        end_of_today = datetime.now().replace(hour=23, minute=59, second=59, microsecond=0)
+        
+        def send(task):
+            task.report(done=0, total=self.db_manager.count_due_reminders(end_of_today))
+            return self.automation_manager.process_reminders(
+                log_label, due_before=end_of_today, cancel_event=task.cancel_event, progress=task.advance
+            )
+        
+        def on_done(sent_count, task):
             self.refresh_calendar_events()
-            messagebox.showinfo("Befejezve", f"{sent_count} emlékeztető elküldve!")
-            
-        except Exception as e:
-            messagebox.showerror("Hiba", f"Emlékeztető küldési hiba: {str(e)}")
+            self.refresh_reminder_queue()
+            suffix = " (megszakítva)" if task.is_cancelled() else ""
+            messagebox.showinfo("Befejezve", f"{sent_count} emlékeztető elküldve{suffix}!")
+        
+        self.task_runner.submit(
+            title, send, on_done,
+            lambda error, task: messagebox.showerror("Hiba", f"Emlékeztető küldési hiba: {str(error)}"),
+            key='reminders'
+        )
     
     def send_immediate_message(self):
         """Azonnali üzenet küldése"""
@@ -2207,87 +8214,173 @@ FIGYELEM: Ez a művelet nem vonható vissza!"""
             
             # Ellenőrzés selected mód esetén
             if recipients_mode == 'selected':
-                selections = self.patients_tree.selection()
-                if not selections:
+                selected_ids = self.get_selected_patient_ids()
+                if not selected_ids:
                     messagebox.showwarning("Figyelmeztetés", 
                                          "1. Menjen a 'Páciensek' fülre\n" + 
                                          "2. Jelölje ki a kívánt pácienseket (Ctrl+klikk)\n" +
                                          "3. Térjen vissza ide")
                     return
             
-            # Megerősítő üzenet személyre szabása
-            if recipients_mode == 'all':
-                patients_count = len(self.db_manager.get_patients())
-                confirm_msg = f"Biztos elküldi az üzenetet?\n\nCímzettek: MINDEN páciens ({patients_count} db)\nTárgy: {subject}"
+            # Címzett szűrő összeállítása
+            if recipients_mode == 'selected':
+                selector = {'patient_ids': sorted(selected_ids)}
+                recipients_label = "Kijelölt páciensek"
+            elif recipients_mode == 'filter':
+                selector = self.get_recipient_selector()
+                if selector is None:
+                    return
+                recipients_label = "Szűrő szerinti páciensek"
             else:
-                selected_count = len(self.patients_tree.selection())
-                confirm_msg = f"Biztos elküldi az üzenetet?\n\nCímzettek: Kijelölt páciensek ({selected_count} db)\nTárgy: {subject}"
+                selector = None
+                recipients_label = "MINDEN páciens"
+            
+            # Megerősítő üzenet személyre szabása (a darabszám SQL-ből, páciensek betöltése nélkül)
+            recipients_count = self.db_manager.count_recipients(selector)
+            if recipients_count == 0:
+                messagebox.showwarning("Figyelmeztetés", "Nincs a feltételeknek megfelelő címzett.")
+                return
+            confirm_msg = f"Biztos elküldi az üzenetet?\n\nCímzettek: {recipients_label} ({recipients_count} db)\nTárgy: {subject}"
             
             if messagebox.askyesno("Megerősítés", confirm_msg):
-                sent_count = 0
-                error_count = 0
+                # Kampány: a címzettek pillanatképe mentésre kerül, a küldés háttérben,
+                # szüneteltethetően és újraindítás után is folytatható módon fut
+                campaign_name = self.campaign_name.get().strip() or f"{subject} ({datetime.now().strftime('%Y-%m-%d %H:%M')})"
+                campaign_id = self.db_manager.create_campaign(campaign_name, subject, body, selector)
+                self.campaign_manager.start(campaign_id)
+                self.db_manager.add_log("INFO", f"Kampány indítva: {campaign_name} (#{campaign_id})")
                 
-                if recipients_mode == 'all':
-                    # Minden páciensnek küldés
-                    patients = self.db_manager.get_patients()
-                    
-                    for patient in patients:
-                        try:
-                            success, message = self.email_manager.send_email(
-                                patient[2], subject, body, patient[1]
-                            )
-                            
-                            if success:
-                                sent_count += 1
-                                self.db_manager.add_log("INFO", f"Azonnali üzenet elküldve: {patient[1]}", patient[2])
-                            else:
-                                error_count += 1
-                                self.db_manager.add_log("ERROR", f"Üzenet hiba: {message}", patient[2])
-                        
-                        except Exception as e:
-                            error_count += 1
-                            self.db_manager.add_log("ERROR", f"Email küldési hiba {patient[1]}: {str(e)}")
-                
-                else:  # selected
-                    # Kijelölt pácienseknek küldés
-                    selections = self.patients_tree.selection()
-                    
-                    for selection in selections:
-                        try:
-                            item = self.patients_tree.item(selection)
-                            patient_email = item['values'][1]
-                            patient_name = item['text']
-                            
-                            success, message = self.email_manager.send_email(
-                                patient_email, subject, body, patient_name
-                            )
-                            
-                            if success:
-                                sent_count += 1
-                                self.db_manager.add_log("INFO", f"Azonnali üzenet elküldve: {patient_name}", patient_email)
-                            else:
-                                error_count += 1
-                                self.db_manager.add_log("ERROR", f"Üzenet hiba: {message}", patient_email)
-                        
-                        except Exception as e:
-                            error_count += 1
-                            self.db_manager.add_log("ERROR", f"Email küldési hiba: {str(e)}")
-                
-                # Eredmény megjelenítése
-                result_msg = f"Küldés befejezve!\n\nSikeres: {sent_count}\nHibák: {error_count}"
-                if error_count > 0:
-                    result_msg += "\n\nA hibákat a 'Naplók' fülön tekintheti meg."
-                
-                messagebox.showinfo("Befejezve", result_msg)
-                
-                # Mezők törlése siker esetén
-                if sent_count > 0:
-                    self.clear_message()
+                self.clear_message()
+                self.refresh_campaigns()
+                messagebox.showinfo("Kampány indítva", 
+                                  "Az üzenetek küldése a háttérben folyik.\n\n"
+                                  "Az állapotot a 'Kampányok' listában követheti, ahol "
+                                  "szüneteltetheti vagy megszakíthatja a küldést.")
                 
         except Exception as e:
             messagebox.showerror("Hiba", f"Üzenet küldési hiba: {str(e)}")
             self.db_manager.add_log("ERROR", f"Azonnali üzenet küldési hiba: {str(e)}")
     
+    def get_recipient_selector(self):
+        """Címzett szűrő a 'filter' mód mezőiből (hibás dátumnál figyelmeztetés, None)"""
+        selector = {}
+        if self.recipient_language.get():
+            selector['language'] = self.recipient_language.get()
+        
+        date_fields = [
+            ('appointment_from', self.recipient_appointment_from),
+            ('appointment_to', self.recipient_appointment_to),
+            ('last_contacted_before', self.recipient_last_contacted_before),
+        ]
+        for key, variable in date_fields:
+            value = variable.get().strip()
+            if not value:
+                continue
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                messagebox.showerror("Hiba", f"Érvénytelen dátum: {value}\n(Formátum: ÉÉÉÉ-HH-NN)")
+                return None
+            selector[key] = value
+        
+        return selector
+    
+    def show_recipient_count(self):
+        """Szűrőnek megfelelő címzettek számának megjelenítése"""
+        selector = self.get_recipient_selector()
+        if selector is None:
+            return
+        count = self.db_manager.count_recipients(selector)
+        messagebox.showinfo("Címzettek", f"A szűrőnek {count} címzett felel meg.")
+    
+    def refresh_campaigns(self):
+        """Kampányok listájának frissítése (a kijelölés megmarad)"""
+        if not hasattr(self, 'campaigns_tree'):  # A fül még nem épült fel
+            return
+        
+        seen = set()
+        for campaign in self.db_manager.get_campaigns():
+            # campaign: (id, name, subject, body, status, total, sent_count, failed_count, created_at, started_at, finished_at)
+            iid = str(campaign[0])
+            seen.add(iid)
+            values = (
+                str(campaign[8])[:16],
+                campaign[2],
+                CampaignManager.STATUS_LABELS.get(campaign[4], campaign[4]),
+                campaign[6],
+                campaign[7],
+                campaign[5]
+            )
+            if self.campaigns_tree.exists(iid):
+                if tuple(str(value) for value in self.campaigns_tree.item(iid, 'values')) != tuple(str(value) for value in values):
+                    self.campaigns_tree.item(iid, values=values)
+            else:
+                self.campaigns_tree.insert('', 'end', iid=iid, values=values)
+        
+        for iid in self.campaigns_tree.get_children():
+            if iid not in seen:
+                self.campaigns_tree.delete(iid)
+    
+    def poll_campaigns(self):
+        """Kampány állapotok időszakos frissítése, amíg a fül látható"""
+        if self.campaigns_tree.winfo_ismapped():
+            self.refresh_campaigns()
+        self.root.after(2000, self.poll_campaigns)
+    
+    def get_selected_campaign_id(self):
+        """Kijelölt kampány azonosítója (vagy None, figyelmeztetéssel)"""
+        selection = self.campaigns_tree.selection()
+        if not selection:
+            messagebox.showwarning("Figyelmeztetés", "Válasszon ki egy kampányt!")
+            return None
+        return int(selection[0])
+    
+    def pause_campaign(self):
+        """Kijelölt kampány szüneteltetése"""
+        campaign_id = self.get_selected_campaign_id()
+        if campaign_id is None:
+            return
+        
+        campaign = self.db_manager.get_campaign(campaign_id)
+        if campaign[4] != 'running':
+            messagebox.showinfo("Információ", "Csak futó kampány szüneteltethető.")
+            return
+        
+        self.campaign_manager.pause(campaign_id)
+        self.refresh_campaigns()
+    
+    def resume_campaign(self):
+        """Szüneteltetett kampány folytatása"""
+        campaign_id = self.get_selected_campaign_id()
+        if campaign_id is None:
+            return
+        
+        campaign = self.db_manager.get_campaign(campaign_id)
+        if campaign[4] not in ('paused', 'running'):
+            messagebox.showinfo("Információ", "Csak szüneteltetett kampány folytatható.")
+            return
+        
+        if not self.campaign_manager.resume(campaign_id):
+            messagebox.showinfo("Információ", "A kampány már fut.")
+        self.refresh_campaigns()
+    
+    def cancel_campaign(self):
+        """Kijelölt kampány megszakítása"""
+        campaign_id = self.get_selected_campaign_id()
+        if campaign_id is None:
+            return
+        
+        campaign = self.db_manager.get_campaign(campaign_id)
+        if campaign[4] in ('completed', 'cancelled'):
+            messagebox.showinfo("Információ", "A kampány már lezárult.")
+            return
+        
+        pending = campaign[5] - campaign[6] - campaign[7]
+        if messagebox.askyesno("Megerősítés", f"Biztos megszakítja a kampányt?\n\n"
+                                              f"{pending} címzett nem kapja meg az üzenetet."):
+            self.campaign_manager.cancel(campaign_id)
+            self.refresh_campaigns()
+    
     def preview_message(self):
         """Üzenet előnézete"""
         subject = self.message_subject.get().strip()
@@ -2332,6 +8425,7 @@ FIGYELEM: Ez a művelet nem vonható vissza!"""
     
     def clear_message(self):
         """Üzenet mezők törlése"""
+        self.campaign_name.set("")
         self.message_subject.set("")
         self.message_body.delete('1.0', tk.END)
     
@@ -2345,27 +8439,26 @@ FIGYELEM: Ez a művelet nem vonható vissza!"""
             # Listbox törlése
             self.selected_patients_listbox.delete(0, tk.END)
             
-            # Ellenőrzés, hogy létezik-e a patients_tree
-            if not hasattr(self, 'patients_tree'):
+            # Ellenőrzés, hogy létezik-e a páciens lista
+            if not hasattr(self, 'patients_view'):
                 self.selected_patients_listbox.insert(tk.END, "Páciensek lista még nem elérhető")
                 return
             
             # Kijelölt páciensek lekérése a páciensek fülről
-            selections = self.patients_tree.selection()
+            selected_patients = self.patients_view.get_selected_patients()
             
-            if not selections:
+            if not selected_patients:
                 self.selected_patients_listbox.insert(tk.END, "Nincs kijelölt páciens! Menjen a 'Páciensek' fülre!")
                 self.selected_patients_listbox.insert(tk.END, "Jelölje ki a kívánt pácienseket! Kattintson a 'Kijelölés frissítése' gombra!")
                 return
             
             # Kijelölt páciensek megjelenítése
-            self.selected_patients_listbox.insert(tk.END, f"{len(selections)} páciens kijelölve:")
+            self.selected_patients_listbox.insert(tk.END, f"{len(selected_patients)} páciens kijelölve:")
             self.selected_patients_listbox.insert(tk.END, "")
             
-            for selection in selections:
-                item = self.patients_tree.item(selection)
-                patient_name = item['text']
-                patient_email = item['values'][1] if len(item['values']) > 1 else 'Nincs email'
+            for patient in selected_patients:
+                patient_name = patient[1]
+                patient_email = patient[2] or 'Nincs email'
                 
                 # Formázott megjelenítés
                 display_text = f"{patient_name}"
@@ -2481,77 +8574,59 @@ Kellemes ünnepeket!
     
     def send_immediate_reminders(self):
         """Azonnali emlékeztetők küldése"""
-        try:
-            reminders = self.db_manager.get_tomorrows_reminders()
-            sent_count = 0
-            
-            for event in reminders:
-                try:
-                    patient_email = event[2]
-                    if patient_email:
-                        patient = self.db_manager.get_patient_by_email(patient_email)
-                        
-                        if patient:
-                            start_time = datetime.strptime(event[5], '%Y-%m-%d %H:%M:%S')
-                            appointment_date = start_time.strftime("%Y-%m-%d")
-                            appointment_time = start_time.strftime("%H:%M")
-                            
-                            success, message = self.email_manager.send_appointment_reminder(
-                                patient_email, patient[1], appointment_date, appointment_time
-                            )
-                            
-                            if success:
-                                self.db_manager.mark_reminder_sent(event[0])
-                                self.db_manager.add_log("INFO", f"Azonnali emlékeztető elküldve: {patient[1]}", patient_email)
-                                sent_count += 1
-                            else:
-                                self.db_manager.add_log("ERROR", f"Emlékeztető hiba: {message}", patient_email)
-                
-                except Exception as e:
-                    print(f"Emlékeztető küldési hiba: {str(e)}")
-                    continue
-            
-            messagebox.showinfo("Befejezve", f"{sent_count} azonnali emlékeztető elküldve!")
-            
-        except Exception as e:
-            messagebox.showerror("Hiba", f"Azonnali emlékeztető hiba: {str(e)}")
+        self.start_reminder_task("Azonnali emlékeztető", "Azonnali emlékeztetők")
     
     def send_new_appointment_notifications(self):
-        """Mai új időpontok értesítése"""
-        try:
-            new_appointments = self.db_manager.get_todays_new_appointments()
-            sent_count = 0
-            
-            for event in new_appointments:
-                try:
-                    patient_email = event[2]
-                    if patient_email:
-                        patient = self.db_manager.get_patient_by_email(patient_email)
-                        
-                        if patient:
-                            start_time = datetime.strptime(event[5], '%Y-%m-%d %H:%M:%S')
-                            appointment_date = start_time.strftime("%Y-%m-%d")
-                            appointment_time = start_time.strftime("%H:%M")
-                            
-                            success, message = self.email_manager.send_new_appointment_notification(
-                                patient_email, patient[1], appointment_date, appointment_time
-                            )
-                            
-                            if success:
-                                self.db_manager.mark_new_appointment_notified(event[0])
-                                self.db_manager.add_log("INFO", f"Új időpont értesítés elküldve: {patient[1]}", patient_email)
-                                sent_count += 1
-                            else:
-                                self.db_manager.add_log("ERROR", f"Új időpont értesítési hiba: {message}", patient_email)
-                
-                except Exception as e:
-                    print(f"Új időpont értesítési hiba: {str(e)}")
-                    continue
+        """Mai új időpontok értesítése (háttérszálon)"""
+        def send(task):
+            return self.automation_manager.process_new_appointment_notifications(
+                cancel_event=task.cancel_event,
+                progress=lambda done, total: task.report(done=done, total=total)
+            )
+        
+        def on_done(sent_count, task):
+            if sent_count is None:
+                messagebox.showwarning("Figyelmeztetés", "Az új időpont értesítéseket jelenleg egy másik példány küldi!")
+                return
             
             messagebox.showinfo("Befejezve", f"{sent_count} új időpont értesítés elküldve!")
-            
+        
+        self.task_runner.submit(
+            "Új időpont értesítések", send, on_done,
+            lambda error, task: messagebox.showerror("Hiba", f"Új időpont értesítési hiba: {str(error)}"),
+            key='new_appointments'
+        )
+    
+    def save_delivery_window(self):
+        """Küldési ablak mentése"""
+        try:
+            self.config_manager.set_delivery_window_end(self.delivery_window_end.get())
+            messagebox.showinfo("Siker", "Küldési ablak mentve!")
+        except ValueError:
+            messagebox.showerror("Hiba", "Hibás időformátum! Használja a HH:MM formátumot (pl. 14:00).")
         except Exception as e:
-            messagebox.showerror("Hiba", f"Új időpont értesítési hiba: {str(e)}")
+            messagebox.showerror("Hiba", f"Küldési ablak mentési hiba: {str(e)}")
+    
+    def refresh_reminder_queue(self):
+        """Sorban álló emlékeztetők megjelenítése"""
+        if not hasattr(self, 'queue_tree'):  # A fül még nem épült fel
+            return
+        
+        for item in self.queue_tree.get_children():
+            self.queue_tree.delete(item)
+        
+        for entry in self.db_manager.get_reminder_queue():
+            # entry: (event_id, due_at, patient_email, patient_name, language, appointment_date, appointment_time, claimed_by, offset_key)
+            status = "Küldés alatt" if entry[7] else "Várakozik"
+            self.queue_tree.insert('', 'end', iid=f"{entry[0]}:{entry[8]}", values=(
+                entry[1][:16],              # Esedékes
+                entry[8],                   # Típus (offset)
+                entry[3],                   # Páciens
+                entry[2],                   # Email
+                (entry[4] or 'hu').upper(), # Nyelv
+                f"{entry[5]} {entry[6]}",   # Időpont
+                status                      # Állapot
+            ))
     
     # Template management
     def load_template(self):
@@ -2615,30 +8690,16 @@ Megerősítjük, hogy ({appointment_date}) {appointment_time}-kor időpontja van
     
     # Logs management
     def refresh_logs(self):
-        """Naplók frissítése"""
-        # Jelenlegi elemek törlése
-        for item in self.logs_tree.get_children():
-            self.logs_tree.delete(item)
-        
-        # Naplók betöltése
-        logs = self.db_manager.get_logs(200)  # Utolsó 200 napló
+        """Naplók újratöltése az aktuális szűrőkkel (az új bejegyzések automatikusan megjelennek)"""
+        if not hasattr(self, 'log_view'):  # A fül még nem épült fel
+            return
         
-        for log in logs:
-            # Szín beállítása a log szint szerint
-            tag = ''
-            if log[1] == 'ERROR':
-                tag = 'error'
-            elif log[1] == 'WARNING':
-                tag = 'warning'
-            elif log[1] == 'INFO':
-                tag = 'info'
-            
-            self.logs_tree.insert('', 'end', values=log, tags=(tag,))
-        
-        # Tag színek beállítása
-        self.logs_tree.tag_configure('error', foreground='red')
-        self.logs_tree.tag_configure('warning', foreground='orange')
-        self.logs_tree.tag_configure('info', foreground='blue')
+        level = self.log_level_filter.get()
+        self.log_view.set_filters(
+            level=None if level == 'Mind' else level,
+            patient_email=self.log_email_filter.get().strip(),
+            search=self.log_search_term.get().strip()
+        )
     
     def clear_logs(self):
         """Naplók törlése"""
@@ -2657,18 +8718,199 @@ Megerősítjük, hogy ({appointment_date}) {appointment_time}-kor időpontja van
                 messagebox.showerror("Hiba", f"Napló törlési hiba: {str(e)}")
     
     def on_closing(self):
-        """Alkalmazás bezárása"""
-        if messagebox.askokcancel("Kilépés", "Biztos kilép az alkalmazásból?"):
-            # Automatizálás leállítása
-            if self.automation_manager.running:
-                self.automation_manager.stop_automation()
+        """Alkalmazás bezárása
+        
+        A leállítás (új munka tiltása, folyamatban lévő küldések kivárása,
+        el nem küldöttek visszaadása) háttérszálon fut, hogy az ablak ne
+        fagyjon le; közben egy folyamatjelző ablak látszik, amelyet a főszál
+        root.after-rel figyel, és a végén bezárja az alkalmazást.
+        """
+        if self.closing or not messagebox.askokcancel("Kilépés", "Biztos kilép az alkalmazásból?"):
+            return
+        self.closing = True
+        
+        timeout = ShutdownCoordinator.DEFAULT_TIMEOUT
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title("Kilépés")
+        progress_window.geometry("420x130")
+        progress_window.configure(bg=self.colors['bg_main'])
+        progress_window.transient(self.root)
+        progress_window.protocol('WM_DELETE_WINDOW', lambda: None)  # Bezárás csak a leállítás végén
+        
+        status = tk.StringVar(value="Folyamatban lévő küldések befejezése...")
+        ttk.Label(progress_window, textvariable=status, style='Modern.TLabel').pack(anchor='w', padx=20, pady=(20, 10))
+        progress = ttk.Progressbar(progress_window, mode='determinate', maximum=timeout, length=380)
+        progress.pack(padx=20)
+        progress_window.grab_set()
+        
+        def run_shutdown():
+            try:
+                self.shutdown_coordinator.shutdown(timeout)
+            except Exception as e:
+                print(f"Leállítási hiba: {str(e)}")
+        
+        started = time.monotonic()
+        shutdown_thread = threading.Thread(target=run_shutdown, daemon=True)
+        shutdown_thread.start()
+        
+        def check_shutdown():
+            if shutdown_thread.is_alive():
+                elapsed = time.monotonic() - started
+                progress.configure(value=min(elapsed, timeout))
+                status.set(f"Folyamatban lévő küldések befejezése... (legfeljebb {max(0, int(timeout - elapsed))} mp)")
+                self.root.after(100, check_shutdown)
+                return
             
             self.db_manager.add_log("INFO", "Alkalmazás bezárva")
             self.root.destroy()
+        
+        self.root.after(100, check_shutdown)
+
+
+def run_service():
+    """Fej nélküli szolgáltatás mód (pl. szerveren futó démon)
+    
+    Az automatizálást GUI nélkül futtatja; SIGINT/SIGTERM hatására
+    ugyanazt a leállítási protokollt használja, mint a GUI bezárása.
+    """
+    db_manager = DatabaseManager()
+    config_manager = ConfigManager()
+    db_manager.set_pii_encryption(config_manager.get_bool('security', 'encrypt_pii'))
+    db_manager.set_reminder_offsets(config_manager.get_reminder_offsets())
+    email_manager = EmailManager(config_manager)
+    automation_manager = AutomationManager(db_manager, config_manager, email_manager, None)
+    
+    campaign_manager = CampaignManager(db_manager, config_manager, email_manager)
+    config_manager.start_watching()
+    
+    shutdown_coordinator = ShutdownCoordinator(db_manager)
+    shutdown_coordinator.register(automation_manager)
+    shutdown_coordinator.register(campaign_manager)
+    
+    stop_requested = threading.Event()
+    
+    def handle_signal(signum, frame):
+        stop_requested.set()
+    
+    signal.signal(signal.SIGINT, handle_signal)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, handle_signal)
+    
+    automation_manager.start_automation()
+    campaign_manager.resume_interrupted()
+    db_manager.add_log("INFO", "Szolgáltatás mód elindítva")
+    print("Szolgáltatás mód elindítva (leállítás: Ctrl+C)")
+    
+    while not stop_requested.wait(1):
+        pass
+    
+    print("Leállítás folyamatban...")
+    shutdown_coordinator.shutdown()
+    db_manager.add_log("INFO", "Szolgáltatás mód leállítva")
+
+
+def run_import(paths, update_existing=True):
+    """Fej nélküli páciens import (parancssorból); több fájl / mappa párhuzamos beolvasással"""
+    db_manager = DatabaseManager()
+    db_manager.set_reminder_offsets(ConfigManager().get_reminder_offsets())
+    importer = PatientImporter(db_manager, update_existing=update_existing)
+    label = ', '.join(os.path.basename(path.rstrip('/\\')) for path in paths)
+    
+    try:
+        if len(paths) == 1 and not os.path.isdir(paths[0]):
+            result = importer.run(paths[0], progress=lambda rows, text: print(text))
+        else:
+            result = importer.run_many(paths, progress=lambda done, total, text: print(f"[{done}/{total}] {text}"))
+    except Exception as e:
+        db_manager.add_log("ERROR", f"Import hiba ({label}): {str(e)}")
+        print(f"Import hiba: {str(e)}")
+        sys.exit(1)
+    
+    for path, file_result in result.get('files', {}).items():
+        if file_result['failed']:
+            db_manager.add_log("ERROR", f"Import hiba ({os.path.basename(path)}): {file_result['failed']}")
+            print(f"{os.path.basename(path)}: HIBA - {file_result['failed']}")
+        else:
+            print(f"{os.path.basename(path)}: {PatientImporter.format_summary(file_result)}")
+    
+    summary = PatientImporter.format_summary(result)
+    db_manager.add_log("INFO", f"Import ({label}): {summary}")
+    print(summary)
+    if result['report_path']:
+        print(f"Hibás sorok listája: {result['report_path']}")
+
+
+def run_export(table, file_path, columns=None, date_from=None, date_to=None):
+    """Fej nélküli export (parancssorból, pl. éjszakai riport)"""
+    db_manager = DatabaseManager()
+    
+    try:
+        rows = DataExporter(db_manager).export(table, file_path, columns, date_from, date_to)
+    except Exception as e:
+        print(f"Export hiba: {str(e)}")
+        sys.exit(1)
+    
+    db_manager.add_log("INFO", f"Export ({table}): {rows} sor -> {os.path.basename(file_path)}")
+    print(f"{rows} sor exportálva: {file_path}")
+
+
+def run_ics_import(file_path):
+    """Fej nélküli ICS import (parancssorból, pl. éjszakai praxisszoftver export betöltése)"""
+    db_manager = DatabaseManager()
+    db_manager.set_reminder_offsets(ConfigManager().get_reminder_offsets())
+    
+    try:
+        result = IcsCalendar(db_manager).import_file(file_path, progress=lambda done, text: print(text))
+    except Exception as e:
+        db_manager.add_log("ERROR", f"ICS import hiba ({os.path.basename(file_path)}): {str(e)}")
+        print(f"ICS import hiba: {str(e)}")
+        sys.exit(1)
+    
+    summary = IcsCalendar.format_summary(result)
+    db_manager.add_log("INFO", f"ICS import ({os.path.basename(file_path)}): {summary}")
+    print(summary)
 
 
 def main():
     """Főfüggvény"""
+    parser = argparse.ArgumentParser(description="Páciens Email Emlékeztető Rendszer v2.0")
+    parser.add_argument('--service', action='store_true',
+                        help="Futtatás GUI nélkül, szolgáltatás módban (csak automatizálás)")
+    parser.add_argument('--import-patients', metavar='FÁJL', nargs='+',
+                        help="Páciensek importálása (xlsx / xls / csv fájlok vagy mappák) GUI nélkül, "
+                             "pl. éjszakai szinkronhoz")
+    parser.add_argument('--no-update', action='store_true',
+                        help="Importnál a meglévő páciensek adatait ne frissítse (csak új páciensek)")
+    parser.add_argument('--import-ics', metavar='FÁJL',
+                        help="Naptár események importálása ICS (iCalendar) fájlból GUI nélkül")
+    parser.add_argument('--export', metavar='TÁBLA', choices=list(DatabaseManager.EXPORT_TABLES),
+                        help="Tábla exportálása GUI nélkül (patients, calendar_events, logs)")
+    parser.add_argument('--output', metavar='FÁJL',
+                        help="Export célfájl; a formátum a kiterjesztésből (.csv, .xlsx, .parquet)")
+    parser.add_argument('--columns', help="Exportált oszlopok vesszővel elválasztva (alapértelmezés: mind)")
+    parser.add_argument('--date-from', metavar='ÉÉÉÉ-HH-NN', help="Export dátum szűrő kezdete")
+    parser.add_argument('--date-to', metavar='ÉÉÉÉ-HH-NN', help="Export dátum szűrő vége (a nap is beleértve)")
+    args = parser.parse_args()
+    
+    if args.service:
+        run_service()
+        return
+    
+    if args.import_patients:
+        run_import(args.import_patients, update_existing=not args.no_update)
+        return
+    
+    if args.import_ics:
+        run_ics_import(args.import_ics)
+        return
+    
+    if args.export:
+        if not args.output:
+            parser.error("--export mellé --output megadása kötelező")
+        columns = [column.strip() for column in args.columns.split(',')] if args.columns else None
+        run_export(args.export, args.output, columns, args.date_from, args.date_to)
+        return
+    
     # Szükséges könyvtárak ellenőrzése
     required_packages = [
         'tkinter', 'sqlite3', 'json', 'smtplib', 'schedule', 
@@ -2677,20 +8919,10 @@ def main():
     
     missing_packages = []
     
-    try:
-        import pandas
-    except ImportError:
-        missing_packages.append('pandas')
-    
-    try:
-        from cryptography.fernet import Fernet
-    except ImportError:
-        missing_packages.append('cryptography')
-    
-    try:
-        import schedule
-    except ImportError:
-        missing_packages.append('schedule')
+    # Csak elérhetőség ellenőrzés - a pandas betöltése lassú, az Excel importkor töltődik be
+    for package in ('pandas', 'cryptography', 'schedule'):
+        if importlib.util.find_spec(package) is None:
+            missing_packages.append(package)
     
     if missing_packages:
         print("FIGYELEM: Hiányzó Python csomagok!")
@@ -2702,8 +8934,10 @@ def main():
         print()
     
     # GUI indítása
+    startup_timer = StartupTimer(STARTUP_STARTED)
+    startup_timer.mark("importok")
     root = tk.Tk()
-    app = ModernPatientReminderApp(root)
+    app = ModernPatientReminderApp(root, startup_timer)
     
     # Alkalmazás indítási napló
     app.db_manager.add_log("INFO", "Páciens Email Emlékeztető Rendszer v2.0 elindítva")
@@ -2712,8 +8946,7 @@ def main():
         root.mainloop()
     except KeyboardInterrupt:
         print("\nAlkalmazás megszakítva...")
-        if app.automation_manager.running:
-            app.automation_manager.stop_automation()
+        app.shutdown_coordinator.shutdown()
 
 
 if __name__ == "__main__":
@@ -2768,13 +9001,25 @@ HASZNÁLATI ÚTMUTATÓ:
    - Opcionálisan állítsa be a Google Calendar integrációt
 
 2. Páciensek kezelése:
-   - Adjon hozzá pácienseket egyenként vagy Excel importtal
+   - Adjon hozzá pácienseket egyenként vagy Excel / CSV importtal
    - Excel formátum: név, email, telefon (opcionális), nyelv (opcionális)
+   - Az import email cím szerint frissít, az ismételt import nem duplikál
+   - Parancssorból (pl. éjszakai szinkron): python patient_reminder_app.py --import-patients paciensek.xlsx
+   - Export (CSV / XLSX / Parquet): "Exportálás" gomb, vagy parancssorból
+     (Parquet exporthoz opcionális csomag: pip install pyarrow):
+     python patient_reminder_app.py --export calendar_events --output idopontok.parquet --date-from 2024-01-01
 
 3. Google Calendar integráció:
    - Authentikáljon a Google fiókjával
    - A rendszer automatikusan szinkronizálja a következő 30 nap eseményeit
    - A "Naptár" fülön láthatja az összes időpontot és a pácienseket
+   - Google fiók nélkül: "ICS import" gomb (pl. praxisszoftver exportja);
+     parancssorból: --import-ics naptar.ics
+   - Az ismétlődő időpontok (pl. heti gyógytorna) sorozatként tárolódnak, az egyes
+     alkalmak csak a megnézett napokra / hetekre és az emlékeztetőkhöz jönnek létre
+   - "ICS export": egy nap vagy egy páciens időpontjai .ics fájlba
+   - Új esemény felvételekor az ablak azonnal jelzi, ha az időpont ütközik egy
+     meglévővel; "Ütközések": a megjelenített hónap összes ütköző időpontpárja
 
 4. Automatizálás:
    - Engedélyezze az automatikus emlékeztetőket
@@ -2790,6 +9035,12 @@ BIZTONSÁGI MEGJEGYZÉSEK:
 ========================
 
 - A jelszavak titkosítva vannak tárolva
+- A security.encrypt_pii beállítással a páciens adatai (név, email,
+  telefon) is titkosítva tárolódnak; az email keresés vak indexszel működik
+- Titkosított módban a napló nem tartalmaz páciens nevet / email címet
+  (a páciens szerinti szűrés vak indexszel működik). A naptár események
+  (cím, leírás, páciens email) és az emlékeztető sor email címe a naptár
+  szinkronhoz nyílt szövegként maradnak az adatbázisban
 - Az alkalmazás GDPR kompatibilis adatkezelést használ
 - Rendszeres biztonsági mentések ajánlottak az adatbázisról
 - Ne ossza meg a credentials.json és config.json fájlokat
@@ -0,0 +1,130 @@
+"""Emlékeztető és új időpont értesítés foglalások (claim) és feladat lease-ek tesztjei
+
+Több példányt ugyanarra az adatbázisra nyitott külön DatabaseManager
+objektumok szimulálnak.
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patient_reminder_app import DatabaseManager
+
+
+def _fmt(moment):
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class ClaimTestCase(unittest.TestCase):
+    EVENT_COUNT = 40
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'claims.db')
+        self.db = DatabaseManager(self.db_path)
+        self.db.add_patient('Teszt Anna', 'anna@example.com', '', 'hu')
+        
+        start = (datetime.now() + timedelta(days=2)).replace(hour=10, minute=0, second=0, microsecond=0)
+        for index in range(self.EVENT_COUNT):
+            begin = start + timedelta(minutes=30 * index)
+            self.db.add_calendar_event(f'evt{index}', 'anna@example.com', 'Időpont', '',
+                                       _fmt(begin), _fmt(begin + timedelta(minutes=30)), is_new=True)
+        
+        # Minden emlékeztető most esedékes (a napszaktól független teszt)
+        now = datetime.now()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('UPDATE event_reminders SET due_at = ?, due_until = ?',
+                     (_fmt(now - timedelta(hours=1)), _fmt(now + timedelta(hours=1))))
+        conn.commit()
+        conn.close()
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def _expire(self, sql):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(sql, (_fmt(datetime.now() - timedelta(minutes=1)),))
+        conn.commit()
+        conn.close()
+    
+    def test_two_workers_claim_each_reminder_once(self):
+        claimed = {'a': [], 'b': []}
+        barrier = threading.Barrier(2)
+        
+        def worker(owner):
+            db = DatabaseManager(self.db_path)
+            barrier.wait()
+            while True:
+                reminders = db.claim_due_reminders(owner, limit=3, claim_seconds=600)
+                if not reminders:
+                    break
+                claimed[owner].extend((row[0], row[1]) for row in reminders)
+        
+        threads = [threading.Thread(target=worker, args=(owner,)) for owner in claimed]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        everything = claimed['a'] + claimed['b']
+        self.assertEqual(len(everything), self.EVENT_COUNT)
+        self.assertEqual(len(set(everything)), self.EVENT_COUNT)
+    
+    def test_two_workers_claim_each_new_appointment_once(self):
+        event_ids = [row[0] for row in self.db.get_todays_new_appointments()]
+        self.assertEqual(len(event_ids), self.EVENT_COUNT)
+        claimed = {'a': [], 'b': []}
+        barrier = threading.Barrier(2)
+        
+        def worker(owner):
+            db = DatabaseManager(self.db_path)
+            barrier.wait()
+            for event_id in event_ids:
+                if db.claim_new_appointment(event_id, owner, 600):
+                    claimed[owner].append(event_id)
+        
+        threads = [threading.Thread(target=worker, args=(owner,)) for owner in claimed]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(sorted(claimed['a'] + claimed['b']), sorted(event_ids))
+    
+    def test_notified_appointment_cannot_be_claimed(self):
+        event_id = self.db.get_todays_new_appointments()[0][0]
+        self.assertTrue(self.db.claim_new_appointment(event_id, 'a', 600))
+        self.db.mark_new_appointment_notified(event_id)
+        self._expire('UPDATE calendar_events SET notify_claimed_until = ?')
+        self.assertFalse(self.db.claim_new_appointment(event_id, 'b', 600))
+    
+    def test_expired_reminder_claim_is_taken_over(self):
+        first = self.db.claim_due_reminders('a', limit=self.EVENT_COUNT, claim_seconds=600)
+        self.assertEqual(len(first), self.EVENT_COUNT)
+        self.assertEqual(self.db.claim_due_reminders('b', limit=self.EVENT_COUNT), [])
+        
+        self._expire('UPDATE event_reminders SET claimed_until = ?')
+        second = self.db.claim_due_reminders('b', limit=self.EVENT_COUNT, claim_seconds=600)
+        self.assertEqual(len(second), self.EVENT_COUNT)
+    
+    def test_expired_job_lease_is_taken_over(self):
+        self.assertTrue(self.db.acquire_job_lease('job', 'a', 600))
+        self.assertFalse(self.db.acquire_job_lease('job', 'b', 600))
+        # A tulajdonos megújíthatja
+        self.assertTrue(self.db.acquire_job_lease('job', 'a', 600))
+        
+        self._expire('UPDATE job_locks SET expires_at = ?')
+        self.assertTrue(self.db.acquire_job_lease('job', 'b', 600))
+        # A lejárt lease régi tulajdonosa már nem újíthat, és nem is oldhatja fel
+        self.assertFalse(self.db.acquire_job_lease('job', 'a', 600))
+        self.db.release_job_lease('job', 'a')
+        self.assertFalse(self.db.acquire_job_lease('job', 'a', 600))
+
+
+if __name__ == '__main__':
+    unittest.main()